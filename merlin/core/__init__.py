@@ -27,7 +27,12 @@ from .base import AbstractComputationProcess
 from .generators import CircuitGenerator, CircuitType, StateGenerator, StatePattern
 from .layer import QuantumLayer
 from .photonicbackend import PhotonicBackend
-from .process import ComputationProcess, ComputationProcessFactory
+from .process import (
+    ComputationProcess,
+    ComputationProcessFactory,
+    MonteCarloComputationProcess,
+)
+from .sharding import BatchShardExecutor
 
 __all__ = [
     "QuantumLayer",
@@ -37,6 +42,8 @@ __all__ = [
     "AbstractComputationProcess",
     "ComputationProcess",
     "ComputationProcessFactory",
+    "MonteCarloComputationProcess",
+    "BatchShardExecutor",
     "CircuitType",
     "StatePattern",
     "CircuitGenerator",
@@ -37,9 +37,14 @@ import torch.nn as nn
 from ..core.generators import CircuitType, StatePattern
 from ..core.photonicbackend import PhotonicBackend as Experiment
 from ..core.process import ComputationProcessFactory
+from ..core.sharding import BatchShardExecutor
+from ..pcvl_pytorch.compiled import CircuitProgram, SLOSProgram
+from ..pcvl_pytorch.constraints import PhotonCountConstraint
+from ..pcvl_pytorch.fock_keys import FockStateKeys
 from ..sampling.autodiff import AutoDiffProcess
-from ..sampling.mappers import OutputMapper
-from ..sampling.strategies import OutputMappingStrategy
+from ..sampling.mappers import LexGroupingMapper, ModGroupingMapper, OutputMapper
+from ..sampling.sparse import sparsify_distribution
+from ..sampling.strategies import OutputMappingStrategy, observable_size
 from .ansatz import Ansatz, AnsatzFactory
 
 
@@ -52,10 +57,49 @@ class QuantumLayer(nn.Module):
     2. Direct parameters - for custom circuits (backward compatible)
 
     Args:
+        use_alias_tables (bool): If True, multinomial shots are drawn from Walker alias
+            tables cached per distribution, so that sampling the same distribution
+            again, as repeated forward passes with frozen parameters do in eval mode,
+            only costs O(1) per shot (see ``SamplingProcess``).
         index_photons (List[Tuple[int, int]], optional): List of tuples (min_mode, max_mode)
             constraining where each photon can be placed. The first_integer is the lowest
             index layer a photon can take and the second_integer is the highest index.
             If None, photons can be placed in any mode from 0 to m-1.
+        sparse_threshold (float, optional): If set, the distribution is truncated to a sparse
+            COO tensor keeping only probabilities above this value before sampling and
+            output mapping.
+        sparse_mass (float, optional): If set, the distribution is truncated to a sparse
+            COO tensor keeping the most probable states holding this fraction of the mass.
+        threshold_detection (bool): If True, the layer outputs the distribution of click
+            patterns of threshold (non photon-number resolving) detectors instead of Fock
+            states.
+        max_occupation (int or list[int], optional): Maximum number of photons in every
+            mode (or in each mode). States above the cap are not simulated and the output
+            distribution is renormalized; the probability they held after the last forward
+            pass is available as ``truncated_mass``.
+        constraints (list[PhotonCountConstraint], optional): Heralding and post-selection
+            constraints on the outputs (see ``merlin.pcvl_pytorch.herald``). They are
+            enforced at every layer of the simulation graph, the distribution is
+            renormalized over accepted outputs and ``truncated_mass`` holds the rejected
+            probability.
+        light_cone (bool): If True, every photon of the simulation is restricted to the
+            modes its input mode is connected to in the circuit, which shrinks the output
+            space of shallow or block-structured circuits (unreachable states, of zero
+            probability, are not part of the output).
+        watched_modes (list[int], optional): If set, only the marginal distribution of
+            these output modes is computed, over their occupation patterns with at most
+            n photons (``computation_process.simulation_graph.keys``). The simulation
+            size depends on the number of watched and input modes, not on the circuit
+            size. Requires ``no_bunching=False``.
+        num_threads (int): Number of CPU threads a single simulation runs on, large SLOS
+            layers being partitioned into independent ranges of output states. Useful
+            for large simulations with small batches.
+        output_mapping_strategy (OutputMappingStrategy): With ``OCCUPATIONS`` or
+            ``CORRELATIONS``, the layer outputs the mean photon number of every mode
+            (followed by the second moments <n_i n_j>, i <= j) computed in polynomial
+            time from the unitary, without building the SLOS graph. These are exact
+            expectations over the full output state: ``no_bunching``, sampling and
+            the output space restrictions above are not applied.
     """
 
     def __init__(
@@ -76,17 +120,42 @@ class QuantumLayer(nn.Module):
         dtype: torch.dtype | None = None,
         shots: int = 0,
         sampling_method: str = "multinomial",
+        use_alias_tables: bool = False,
         no_bunching: bool = True,
         # New parameter for constrained photon placement
         index_photons: list[tuple[int, int]] | None = None,
+        # Sparse truncation of the output distribution
+        sparse_threshold: float | None = None,
+        sparse_mass: float | None = None,
+        # Non photon-number resolving detectors
+        threshold_detection: bool = False,
+        # Cap on the number of photons per mode
+        max_occupation: int | list[int] | None = None,
+        # Heralding and post-selection of the outputs
+        constraints: list[PhotonCountConstraint] | None = None,
+        # Restrict every photon to the light cone of its input mode
+        light_cone: bool = False,
+        # Only simulate the marginal distribution of these output modes
+        watched_modes: list[int] | None = None,
+        # Threads of a single simulation
+        num_threads: int = 1,
     ):
         super().__init__()
 
+        self.sparse_threshold = sparse_threshold
+        self.sparse_mass = sparse_mass
+
         self.device = device
         self.dtype = dtype or torch.float32
         self.input_size = input_size
         self.no_bunching = no_bunching
         self.index_photons = index_photons
+        self.threshold_detection = threshold_detection
+        self.max_occupation = max_occupation
+        self.constraints = constraints
+        self.light_cone = light_cone
+        self.watched_modes = watched_modes
+        self.num_threads = num_threads
 
         # Determine construction mode
         if ansatz is not None:
@@ -105,9 +174,18 @@ class QuantumLayer(nn.Module):
             raise ValueError("Either 'ansatz' or 'circuit' must be provided")
 
         # Setup sampling
-        self.autodiff_process = AutoDiffProcess(sampling_method)
+        self.autodiff_process = AutoDiffProcess(sampling_method, use_alias_tables)
         self.shots = shots
         self.sampling_method = sampling_method
+        self.use_alias_tables = use_alias_tables
+
+        # torch.compile options and compiled simulations, see compile()
+        self._compile_kwargs: dict | None = None
+        self._compiled_simulations: dict = {}
+        # Worker processes of the batch-sharded simulation and their (num_workers,
+        # threads_per_worker), see shard_batches()
+        self._shard_executor: BatchShardExecutor | None = None
+        self._shard_config: tuple[int, int] | None = None
 
     def _init_from_ansatz(
         self,
@@ -120,8 +198,19 @@ class QuantumLayer(nn.Module):
         self.auto_generation_mode = True
 
         # For ansatz mode, we need to create a new computation process with correct device
-        if self.index_photons is not None or self.device != ansatz.device:
-            # Create a new computation process with index_photons support or correct device
+        if (
+            self.index_photons is not None
+            or self.threshold_detection
+            or self.max_occupation is not None
+            or self.constraints
+            or self.light_cone
+            or self.watched_modes is not None
+            or self.num_threads != 1
+            or self.device != ansatz.device
+            or self.dtype != ansatz.dtype
+        ):
+            # Create a new computation process with index_photons support or correct
+            # device and dtype
             self.computation_process = ComputationProcessFactory.create(
                 circuit=ansatz.circuit,
                 input_state=ansatz.input_state,
@@ -132,6 +221,12 @@ class QuantumLayer(nn.Module):
                 dtype=self.dtype,
                 no_bunching=self.no_bunching,
                 index_photons=self.index_photons,
+                threshold_detection=self.threshold_detection,
+                max_occupation=self.max_occupation,
+                constraints=self.constraints,
+                light_cone=self.light_cone,
+                watched_modes=self.watched_modes,
+                num_threads=self.num_threads,
             )
         else:
             # Use the ansatz's computation process as before
@@ -208,6 +303,12 @@ class QuantumLayer(nn.Module):
             dtype=self.dtype,
             no_bunching=self.no_bunching,
             index_photons=self.index_photons,
+            threshold_detection=self.threshold_detection,
+            max_occupation=self.max_occupation,
+            constraints=self.constraints,
+            light_cone=self.light_cone,
+            watched_modes=self.watched_modes,
+            num_threads=self.num_threads,
         )
 
         # Setup parameters
@@ -328,14 +429,14 @@ class QuantumLayer(nn.Module):
         output_mapping_strategy: OutputMappingStrategy,
     ):
         """Setup output mapping for ansatz-based construction."""
-        # Get distribution size
-        dummy_params = self._create_dummy_parameters()
-        distribution = self.computation_process.compute(dummy_params)
-        dist_size = distribution.shape[-1]
+        dist_size = self._distribution_size(output_mapping_strategy)
 
         # Determine output size
         if output_size is None:
-            if output_mapping_strategy == OutputMappingStrategy.NONE:
+            if (
+                output_mapping_strategy == OutputMappingStrategy.NONE
+                or self.observables
+            ):
                 self.output_size = dist_size
             else:
                 raise ValueError(
@@ -365,18 +466,20 @@ class QuantumLayer(nn.Module):
                 dtype=self.dtype, device=self.device
             )
 
+        self._setup_fused_readout()
+
     def _setup_output_mapping_from_custom(
         self, output_size: int | None, output_mapping_strategy: OutputMappingStrategy
     ):
         """Setup output mapping for custom circuit construction."""
-        # Get distribution size
-        dummy_params = self._create_dummy_parameters()
-        distribution = self.computation_process.compute(dummy_params)
-        dist_size = distribution.shape[-1]
+        dist_size = self._distribution_size(output_mapping_strategy)
 
         # Determine output size
         if output_size is None:
-            if output_mapping_strategy == OutputMappingStrategy.NONE:
+            if (
+                output_mapping_strategy == OutputMappingStrategy.NONE
+                or self.observables
+            ):
                 self.output_size = dist_size
             else:
                 raise ValueError(
@@ -396,6 +499,43 @@ class QuantumLayer(nn.Module):
                 dtype=self.dtype, device=self.device
             )
 
+        self._setup_fused_readout()
+
+    def _distribution_size(self, output_mapping_strategy: OutputMappingStrategy) -> int:
+        """Size of the quantum output fed to the output mapping.
+
+        Observable strategies are sized from the number of modes, so that the SLOS
+        graph is never built for them.
+        """
+        features = observable_size(output_mapping_strategy, self.computation_process.m)
+        self.observables = features is not None
+        self.observable_correlations = (
+            output_mapping_strategy == OutputMappingStrategy.CORRELATIONS
+        )
+        if self.observables:
+            return features
+
+        dummy_params = self._create_dummy_parameters()
+        distribution = self.computation_process.compute(dummy_params)
+        return distribution.shape[-1]
+
+    def _setup_fused_readout(self):
+        """Compile grouping output mappings into the simulation readout.
+
+        Grouping strategies are plain sums over buckets of the distribution, so the
+        bucket of every final Fock state is precomputed once and the grouping is
+        applied by the SLOS graph in the same pass that squares the amplitudes.
+        """
+        self.readout_size = None
+        self.register_buffer("readout_indices", None, persistent=False)
+        if isinstance(self.output_mapping, (LexGroupingMapper, ModGroupingMapper)):
+            self.readout_indices = (
+                self.computation_process.simulation_graph.compose_readout_indices(
+                    self.output_mapping.group_indices
+                )
+            )
+            self.readout_size = self.output_mapping.output_size
+
     def _create_dummy_parameters(self) -> list[torch.Tensor]:
         """Create dummy parameters for initialization."""
         params = list(self.thetas)
@@ -476,17 +616,24 @@ class QuantumLayer(nn.Module):
         *input_parameters: torch.Tensor,
         apply_sampling: bool | None = None,
         shots: int | None = None,
+        input_state: torch.Tensor | None = None,
     ) -> torch.Tensor:
-        """Forward pass through the quantum layer."""
+        """Forward pass through the quantum layer.
+
+        Args:
+            *input_parameters: Input features, one tensor per input parameter group
+            apply_sampling: Whether to apply shot noise to the distribution
+            shots: Number of shots, defaults to the layer configuration
+            input_state: Optional input occupations of every sample, of shape
+                [batch_size x m], replacing the input state of the layer. All states
+                must hold the same number of photons as the layer input state.
+
+        Returns:
+            The mapped output of every sample
+        """
         # Prepare parameters
         params = self.prepare_parameters(list(input_parameters))
 
-        # Get quantum output
-        if type(self.computation_process.input_state) is dict:
-            distribution = self.computation_process.compute_superposition_state(params)
-        else:
-            distribution = self.computation_process.compute(params)
-
         # Handle sampling
         needs_gradient = (
             self.training
@@ -497,6 +644,45 @@ class QuantumLayer(nn.Module):
             needs_gradient, apply_sampling or False, shots or self.shots
         )
 
+        # Get quantum output
+        if self.observables:
+            if input_state is not None:
+                raise ValueError(
+                    "Per-sample input states are not supported for observable outputs"
+                )
+            # Exact expectations: neither sparsification nor shot noise applies
+            return self.computation_process.compute_observables(
+                params, correlations=self.observable_correlations
+            )
+        # Grouping is fused into the simulation readout, unless the full distribution
+        # is needed for sparsification or sampling
+        fused = (
+            self.readout_indices is not None
+            and self.sparse_threshold is None
+            and self.sparse_mass is None
+            and not (apply_sampling and shots > 0)
+        )
+        if input_state is not None:
+            distribution = self.computation_process.compute_batch_inputs(
+                params,
+                input_state,
+                self.readout_indices if fused else None,
+                self.readout_size if fused else None,
+            )
+            if fused:
+                return distribution
+        elif type(self.computation_process.input_state) is dict:
+            distribution = self.computation_process.compute_superposition_state(params)
+        elif fused:
+            return self._simulate(params, fused_readout=True)
+        else:
+            distribution = self._simulate(params)
+
+        if self.sparse_threshold is not None or self.sparse_mass is not None:
+            distribution = sparsify_distribution(
+                distribution, self.sparse_threshold, self.sparse_mass
+            )
+
         if apply_sampling and shots > 0:
             distribution = self.autodiff_process.sampling_noise.pcvl_sampler(
                 distribution, shots
@@ -505,7 +691,176 @@ class QuantumLayer(nn.Module):
         # Apply output mapping
         return self.output_mapping(distribution)
 
-    def set_sampling_config(self, shots: int | None = None, method: str | None = None):
+    def _simulate(
+        self, params: list[torch.Tensor], fused_readout: bool = False
+    ) -> torch.Tensor:
+        """Output distribution of the layer input state, grouped by the fused readout
+        if requested, with the compiled simulation when the layer is compiled."""
+        readout = (self.readout_indices, self.readout_size) if fused_readout else ()
+        if self._shard_executor is not None:
+            converter = self.computation_process.converter
+            if self._shard_executor.dtype != converter.tensor_fdtype or (
+                self._shard_executor.device != torch.device(converter.device or "cpu")
+            ):
+                raise ValueError(
+                    "The sharded simulation was started for another dtype or device, "
+                    "call shard_batches again after moving the layer"
+                )
+            distribution = self._shard_executor(params, fused_readout)
+            if not (params and params[0].dim() > 1):
+                distribution = distribution.squeeze(0)
+            return distribution
+        if self._compile_kwargs is None:
+            return self.computation_process.compute(params, *readout)
+
+        process = self.computation_process
+        key = (str(process.converter.device), fused_readout)
+        simulation = self._compiled_simulations.get(key)
+        if simulation is None:
+            circuit_program = CircuitProgram(process.converter)
+            # superposition input states never reach the compiled path
+            slos_program = SLOSProgram(
+                process.simulation_graph,
+                process.input_state,  # type: ignore[arg-type]
+                *readout,
+            )
+
+            def simulate(*parameters):
+                return slos_program(*circuit_program(*parameters))
+
+            simulation = torch.compile(simulate, **self._compile_kwargs)
+            self._compiled_simulations[key] = simulation
+
+        distribution = simulation(*params)
+        if not (params and params[0].dim() > 1):
+            distribution = distribution.squeeze(0)
+        return distribution
+
+    # Unlike nn.Module.compile, which compiles the whole forward pass in place, only
+    # the simulation is compiled, and options are keyword-only as in torch.compile
+    def compile(self, **compile_kwargs) -> QuantumLayer:  # type: ignore[override]
+        """Run the simulation of the forward pass as a ``torch.compile`` program.
+
+        The unitary conversion and the SLOS simulation of the layer configuration are
+        captured as traceable programs (see ``CircuitProgram`` and ``SLOSProgram``),
+        compiled on the first forward pass and cached per device and readout. Per-sample
+        input states, superposition input states and observable outputs keep the eager
+        path, and compiled passes do not update ``truncated_mass``.
+
+        Args:
+            **compile_kwargs: Options of ``torch.compile`` (e.g. ``mode`` or
+                ``backend``)
+
+        Returns:
+            The layer itself
+
+        Raises:
+            ValueError: For low-precision layers and marginal layers
+        """
+        if self.dtype in (torch.float16, torch.bfloat16):
+            raise ValueError("Low-precision layers cannot be compiled")
+        if self.watched_modes is not None:
+            raise ValueError("Marginal layers cannot be compiled")
+        self._compile_kwargs = compile_kwargs
+        self._compiled_simulations = {}
+        return self
+
+    def shard_batches(
+        self, num_workers: int, threads_per_worker: int = 1
+    ) -> QuantumLayer:
+        """Shard the simulation of every batch across worker processes.
+
+        Workers are started with the circuit converter and the SLOS graph of the layer
+        configuration (see ``BatchShardExecutor``), and every forward pass splits its
+        batch into one shard per worker. Gradients of the distributions are computed
+        by the workers, and ``to`` restarts them with the moved configuration. Per-sample input states, superposition input states and
+        observable outputs keep the in-process simulation, and sharded passes do not
+        update ``truncated_mass``.
+
+        Args:
+            num_workers: Number of worker processes, 0 to stop sharding
+            threads_per_worker: Number of torch threads of every worker
+
+        Returns:
+            The layer itself
+
+        Raises:
+            ValueError: For layers that are not simulated in float32 or float64 on CPU,
+                marginal layers and superposition input states
+        """
+        if self._shard_executor is not None:
+            self._shard_executor.close()
+            self._shard_executor = None
+        self._shard_config = None
+        if num_workers == 0:
+            return self
+        if self.dtype in (torch.float16, torch.bfloat16):
+            raise ValueError("Low-precision layers cannot be sharded")
+        if self.watched_modes is not None:
+            raise ValueError("Marginal layers cannot be sharded")
+        process = self.computation_process
+        if isinstance(process.input_state, dict):
+            raise ValueError("Superposition input states cannot be sharded")
+        if torch.device(process.converter.device or "cpu").type != "cpu":
+            raise ValueError("Batch sharding runs on CPU worker processes")
+
+        graph = process.simulation_graph
+        self._shard_executor = BatchShardExecutor(
+            process.converter,
+            graph,
+            process.input_state,
+            num_workers,
+            threads_per_worker,
+            readout=(
+                None
+                if self.readout_indices is None
+                else (self.readout_indices, self.readout_size)
+            ),
+            real=(
+                process.converter.is_real
+                and process.converter.tensor_fdtype == graph.dtype
+            ),
+        )
+        self._shard_config = (num_workers, threads_per_worker)
+        return self
+
+    def compute_amplitudes(
+        self, *input_parameters: torch.Tensor, normalized: bool = True
+    ) -> tuple[FockStateKeys, torch.Tensor]:
+        """Complex output amplitudes of the circuit, before detection.
+
+        Args:
+            *input_parameters: Input features, as for ``forward``
+            normalized: If True, return the probability amplitudes <out|U|in>; else
+                the raw SLOS coefficients, as perceval's SLOS backend stores them
+
+        Returns:
+            Output Fock states in perceval order and the amplitude of every state
+            ([len(keys)] or [batch_size x len(keys)]), differentiable w.r.t. the
+            layer parameters. ``merlin.pcvl_pytorch.to_state_vector`` converts a single
+            amplitude vector to a perceval ``StateVector``.
+        """
+        params = self.prepare_parameters(list(input_parameters))
+        return self.computation_process.compute_amplitudes(
+            params, normalized=normalized
+        )
+
+    @property
+    def truncated_mass(self) -> torch.Tensor | None:
+        """Probability of the outputs that were not simulated in the last forward pass.
+
+        These are the states pruned by ``max_occupation``, or the bunched states when
+        ``no_bunching`` is set, per sample of the batch (None if nothing was truncated).
+        """
+        graph = self.computation_process._simulation_graph
+        return None if graph is None else graph.truncated_mass
+
+    def set_sampling_config(
+        self,
+        shots: int | None = None,
+        method: str | None = None,
+        use_alias_tables: bool | None = None,
+    ):
         """Update sampling configuration."""
         if shots is not None:
             if not isinstance(shots, int) or shots < 0:
@@ -518,21 +873,45 @@ class QuantumLayer(nn.Module):
                     f"Invalid sampling method: {method}. Valid options are: {valid_methods}"
                 )
             self.sampling_method = method
+        if use_alias_tables is not None:
+            self.use_alias_tables = use_alias_tables
+            self.autodiff_process.sampling_noise.use_alias_tables = use_alias_tables
 
     def to(self, *args, **kwargs):
         super().to(*args, **kwargs)
-        # Manually move any additional tensors
-        device = kwargs.get("device", None)
-        if device is None and len(args) > 0:
-            device = args[0]
+        # Manually move any additional tensors, with the device and dtype arguments
+        # of nn.Module.to
+        device = kwargs.get("device")
+        dtype = kwargs.get("dtype")
+        for arg in args:
+            if isinstance(arg, torch.dtype):
+                dtype = arg
+            elif isinstance(arg, torch.Tensor):
+                device, dtype = arg.device, arg.dtype
+            else:
+                device = arg
+        if dtype is not None and not dtype.is_floating_point:
+            dtype = None
+        if device is None and dtype is None:
+            return self
+
+        process = self.computation_process
         if device is not None:
             self.device = device
-            self.computation_process.simulation_graph = (
-                self.computation_process.simulation_graph.to(self.dtype, device)
-            )
-            self.computation_process.converter = self.computation_process.converter.to(
-                self.dtype, device
+            process.device = device
+        if dtype is not None:
+            self.dtype = dtype
+            process.dtype = dtype
+        target_device = torch.device(self.device or process.converter.device or "cpu")
+        if process._simulation_graph is not None:
+            process.simulation_graph = process.simulation_graph.to(
+                self.dtype, target_device
             )
+        process.converter = process.converter.to(self.dtype, target_device)
+        # compiled and sharded simulations hold programs of the previous configuration
+        self._compiled_simulations = {}
+        if self._shard_config is not None:
+            self.shard_batches(*self._shard_config)
         return self
 
     def get_index_photons_info(self) -> dict:
@@ -24,10 +24,24 @@
 Quantum computation processes and factories.
 """
 
+import math
+
 import perceval as pcvl
 import torch
 
-from ..pcvl_pytorch import CircuitConverter, build_slos_distribution_computegraph
+from ..pcvl_pytorch import (
+    CircuitConverter,
+    CliffordSampler,
+    FockStateKeys,
+    MarginalComputeGraph,
+    build_slos_distribution_computegraph,
+    estimate_output_probabilities,
+    mode_correlations,
+    mode_occupations,
+    photon_light_cones,
+    top_k_states,
+)
+from ..sampling.sparse import sparsify_distribution
 from .base import AbstractComputationProcess
 
 
@@ -46,6 +60,13 @@ class ComputationProcess(AbstractComputationProcess):
         no_bunching: bool = None,
         output_map_func=None,
         index_photons=None,
+        threshold_detection: bool = False,
+        max_occupation: int | list[int] | None = None,
+        constraints=None,
+        light_cone: bool = False,
+        watched_modes: list[int] | None = None,
+        num_threads: int = 1,
+        keep_keys: bool = True,
     ):
         self.circuit = circuit
         self.input_state = input_state
@@ -57,6 +78,15 @@ class ComputationProcess(AbstractComputationProcess):
         self.no_bunching = no_bunching
         self.output_map_func = output_map_func
         self.index_photons = index_photons
+        self.threshold_detection = threshold_detection
+        self.max_occupation = max_occupation
+        self.constraints = constraints
+        self.light_cone = light_cone
+        self.watched_modes = watched_modes
+        self.num_threads = num_threads
+        # Output keys are packed ranks, 8 bytes per state; graphs whose outputs are
+        # only used as tensors can skip them
+        self.keep_keys = keep_keys
 
         # Extract circuit parameters for graph building
         if isinstance(input_state, dict):
@@ -85,32 +115,385 @@ class ComputationProcess(AbstractComputationProcess):
             self.circuit, parameter_specs, dtype=self.dtype, device=self.device
         )
 
-        # Build simulation graph with correct parameters
-        self.simulation_graph = build_slos_distribution_computegraph(
+        # The simulation graph enumerates the whole output space: it is only built
+        # when a distribution is requested, so that shot sampling alone stays cheap
+        self._simulation_graph = None
+        self._shot_sampler = None
+
+    @property
+    def simulation_graph(self):
+        """SLOS computation graph, built on first access."""
+        if self._simulation_graph is None:
+            self._simulation_graph = self._build_simulation_graph()
+        return self._simulation_graph
+
+    @simulation_graph.setter
+    def simulation_graph(self, graph):
+        self._simulation_graph = graph
+
+    def _simulation_unitary(self, parameters: list[torch.Tensor]) -> torch.Tensor:
+        """Unitary for the SLOS graph, built as a real tensor for real-orthogonal
+        circuits so that the simulation runs in real arithmetic."""
+        real = (
+            self.converter.is_real
+            and self.watched_modes is None
+            and self.converter.tensor_fdtype == self.simulation_graph.dtype
+        )
+        return self.converter.to_tensor(*parameters, real=real)
+
+    def _build_simulation_graph(self):
+        """Build the SLOS simulation graph for the process configuration."""
+        if self.watched_modes is not None:
+            return self._build_marginal_graph()
+        return build_slos_distribution_computegraph(
             m=self.m,  # Number of modes
             n_photons=self.n_photons,  # Total number of photons
             output_map_func=self.output_map_func,
             no_bunching=self.no_bunching,
-            keep_keys=True,  # Usually want to keep keys for output interpretation
+            keep_keys=self.keep_keys,
             device=self.device,
             dtype=self.dtype,
             index_photons=self.index_photons,
+            threshold_detection=self.threshold_detection,
+            max_occupation=self.max_occupation,
+            constraints=self.constraints,
+            photon_modes=self.photon_light_cones() if self.light_cone else None,
+            num_threads=self.num_threads,
+        )
+
+    def _build_marginal_graph(self) -> MarginalComputeGraph:
+        """Build the graph of the marginal distribution of the watched modes."""
+        if (
+            self.no_bunching
+            or self.output_map_func is not None
+            or self.index_photons is not None
+            or self.threshold_detection
+            or self.max_occupation is not None
+            or self.constraints
+            or self.light_cone
+            or isinstance(self.input_state, dict)
+        ):
+            raise ValueError(
+                "Marginal distributions are computed on the full bunched output: "
+                "watched_modes cannot be combined with no_bunching, superposition "
+                "inputs, output mappings or output space restrictions"
+            )
+        return MarginalComputeGraph(
+            self.m,
+            self.n_photons,
+            self.watched_modes,
+            device=self.device,
+            dtype=self.dtype,
         )
 
-    def compute(self, parameters: list[torch.Tensor]) -> torch.Tensor:
-        """Compute quantum output distribution."""
+    def photon_light_cones(self) -> list[tuple[int, ...]]:
+        """Modes every photon layer of the simulation may reach, from the circuit
+        connectivity."""
+        if isinstance(self.input_state, dict):
+            input_states = list(self.input_state.keys())
+        else:
+            input_states = [self.input_state]
+        return photon_light_cones(self.circuit, input_states)
+
+    def state_space_reduction(self) -> dict:
+        """Compare the simulated output space with the unrestricted one.
+
+        Returns:
+            Dictionary with the reachable modes of every photon layer (``photon_modes``),
+            the number of output states without restriction (``full_states``) and the
+            number of output states of the simulation graph (``reduced_states``).
+        """
+        if self.watched_modes is not None:
+            raise ValueError(
+                "The state space reduction is not defined for marginals, whose graph "
+                "does not simulate the circuit modes"
+            )
+        if self.no_bunching:
+            full_states = math.comb(self.m, self.n_photons)
+        else:
+            full_states = math.comb(self.m + self.n_photons - 1, self.n_photons)
+        return {
+            "photon_modes": self.simulation_graph.photon_modes,
+            "full_states": full_states,
+            "reduced_states": self.simulation_graph.norm_factor_output.shape[0],
+        }
+
+    def compute(
+        self,
+        parameters: list[torch.Tensor],
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+    ) -> torch.Tensor:
+        """Compute quantum output distribution.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            readout_indices: Optional bucket index of every final Fock state (see
+                ``SLOSComputeGraph.compose_readout_indices``). When given, the output
+                grouping is fused into the simulation readout.
+            readout_size: Number of buckets of the fused readout.
+        """
         # Generate unitary matrix from parameters
-        unitary = self.converter.to_tensor(*parameters)
+        unitary = self._simulation_unitary(parameters)
 
         # Compute output distribution using the input state
         if isinstance(self.input_state, dict):
             input_state = list(self.input_state.keys())[0]
         else:
             input_state = self.input_state
-        keys, distribution = self.simulation_graph.compute(unitary, input_state)
+        keys, distribution = self.simulation_graph.compute(
+            unitary, input_state, readout_indices, readout_size
+        )
 
         return distribution
 
+    def compute_amplitudes(
+        self, parameters: list[torch.Tensor], normalized: bool = True
+    ) -> tuple[FockStateKeys, torch.Tensor]:
+        """Compute the complex output amplitudes, in perceval's output state order.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            normalized: If True, return the probability amplitudes <out|U|in>; else
+                the raw SLOS coefficients, as perceval's SLOS backend stores them.
+
+        Returns:
+            Output states and complex amplitudes (see
+            ``SLOSComputeGraph.compute_amplitudes``).
+        """
+        if isinstance(self.input_state, dict) or self.watched_modes is not None:
+            raise ValueError(
+                "Amplitudes are not defined for superposition states or marginals"
+            )
+        unitary = self._simulation_unitary(parameters)
+        return self.simulation_graph.compute_amplitudes(
+            unitary, self.input_state, normalized=normalized
+        )
+
+    def compute_batch_inputs(
+        self,
+        parameters: list[torch.Tensor],
+        input_states: torch.Tensor,
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+    ) -> torch.Tensor:
+        """Compute the output distributions of a batch with one input state per sample.
+
+        Samples are grouped by input state (the order in which photons are injected in
+        the SLOS layers) and every group runs one batched SLOS pass. All input states
+        must hold the photon number of the process, so that they share the output space.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            input_states: Input occupations of every sample, of shape [batch_size x m].
+            readout_indices: Optional bucket index of every final Fock state, to fuse an
+                output grouping into the readout (see ``compute``).
+            readout_size: Number of buckets of the fused readout.
+
+        Returns:
+            Output distributions of shape [batch_size x output_size], in sample order.
+        """
+        if isinstance(self.input_state, dict) or self.light_cone:
+            raise ValueError(
+                "Per-sample input states are not supported for superposition states "
+                "or light cones, which depend on the input state"
+            )
+        if input_states.dim() != 2 or input_states.shape[1] != self.m:
+            raise ValueError(
+                f"input_states must have shape [batch_size x {self.m}], "
+                f"got {tuple(input_states.shape)}"
+            )
+        input_states = input_states.to(torch.long)
+        if torch.any(input_states.sum(dim=1) != self.n_photons):
+            raise ValueError(f"Every input state must hold {self.n_photons} photons")
+
+        batch_size = input_states.shape[0]
+        unitary = self._simulation_unitary(parameters)
+        if unitary.dim() == 2:
+            unitary = unitary.expand(batch_size, -1, -1)
+        elif unitary.shape[0] != batch_size:
+            raise ValueError(
+                f"Got {batch_size} input states for a batch of {unitary.shape[0]} "
+                "parameters"
+            )
+
+        states, groups = torch.unique(input_states, dim=0, return_inverse=True)
+        graph = self.simulation_graph
+        samples, distributions, truncated = [], [], []
+        for group, state in enumerate(states.tolist()):
+            members = torch.nonzero(groups == group).squeeze(1)
+            _, distribution = graph.compute(
+                unitary[members.to(unitary.device)],
+                state,
+                readout_indices,
+                readout_size,
+            )
+            samples.append(members)
+            distributions.append(distribution)
+            truncated.append(graph.truncated_mass)
+
+        order = torch.argsort(torch.cat(samples)).to(distributions[0].device)
+        if all(mass is not None for mass in truncated):
+            graph.truncated_mass = torch.cat(truncated)[order]
+        return torch.cat(distributions)[order]
+
+    def compute_approximate(
+        self,
+        parameters: list[torch.Tensor],
+        threshold: float | None = None,
+        budget: int | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Compute an approximate output distribution, pruning small partial amplitudes.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            threshold: Minimum partial probability of a state propagated to the next
+                photon layer.
+            budget: Maximum number of states propagated per photon layer.
+
+        Returns:
+            Approximate distribution and a bound on its L1 error
+            (see ``SLOSComputeGraph.compute_approximate``).
+        """
+        if isinstance(self.input_state, dict) or self.watched_modes is not None:
+            raise ValueError(
+                "Approximate computation is not supported for superposition states "
+                "or marginals"
+            )
+        unitary = self.converter.to_tensor(*parameters)
+        _, distribution, error_bound = self.simulation_graph.compute_approximate(
+            unitary, self.input_state, threshold=threshold, budget=budget
+        )
+        return distribution, error_bound
+
+    def compute_sectors(
+        self,
+        parameters: list[torch.Tensor],
+        efficiency: float | torch.Tensor,
+        sectors: list[int] | None = None,
+    ) -> dict[int, torch.Tensor]:
+        """Compute the output distribution of every detected photon number under loss.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            efficiency: Transmission of every output mode, a float or a tensor [m].
+            sectors: Detected photon numbers, defaults to all of n, n-1, ..., 0.
+
+        Returns:
+            Distribution of every sector, indexed like
+            ``simulation_graph.compute_sectors`` keys.
+        """
+        if isinstance(self.input_state, dict) or self.watched_modes is not None:
+            raise ValueError(
+                "Photon-number sectors are not supported for superposition states "
+                "or marginals"
+            )
+        unitary = self.converter.to_tensor(*parameters)
+        sector_outputs = self.simulation_graph.compute_sectors(
+            unitary, self.input_state, efficiency, sectors
+        )
+        return {k: distribution for k, (_, distribution) in sector_outputs.items()}
+
+    def compute_sparse(
+        self,
+        parameters: list[torch.Tensor],
+        threshold: float | None = None,
+        mass: float | None = None,
+    ) -> torch.Tensor:
+        """Compute the output distribution as a sparse COO tensor.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            threshold: Only keep probabilities strictly above this value.
+            mass: Only keep the most probable states holding this fraction of the mass.
+
+        Returns:
+            Sparse distribution, indexed like ``simulation_graph.mapped_keys``.
+        """
+        return sparsify_distribution(self.compute(parameters), threshold, mass)
+
+    def sample(
+        self,
+        parameters: list[torch.Tensor],
+        shots: int,
+        generator: torch.Generator | None = None,
+    ) -> tuple[list[tuple[int, ...]], torch.Tensor]:
+        """Draw output Fock states without computing the output distribution.
+
+        Shots are drawn photon by photon with the Clifford & Clifford algorithm, so the
+        cost does not depend on the size of the output space and no SLOS graph is built.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            shots: Number of shots drawn for every sample of the batch.
+            generator: Optional random generator for reproducibility.
+
+        Returns:
+            Observed output states and their counts ([len(keys)] or [batch_size x len(keys)]).
+        """
+        if isinstance(self.input_state, dict):
+            raise ValueError("Shot sampling is not supported for superposition states")
+        if self._shot_sampler is None:
+            self._shot_sampler = CliffordSampler(
+                self.m, self.input_state, no_bunching=bool(self.no_bunching)
+            )
+        unitary = self.converter.to_tensor(*parameters)
+        return self._shot_sampler.sample(unitary, shots, generator=generator)
+
+    def top_k(
+        self,
+        parameters: list[torch.Tensor],
+        k: int,
+        beam_width: int = 4096,
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Find the k most probable output states without building the SLOS graph.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            k: Number of states to return.
+            beam_width: Maximum number of partial states kept at every photon layer.
+
+        Returns:
+            States, probabilities and amplitude error bound (see ``top_k_states``).
+        """
+        if isinstance(self.input_state, dict):
+            raise ValueError("Top-k search is not supported for superposition states")
+        unitary = self.converter.to_tensor(*parameters)
+        return top_k_states(
+            unitary,
+            self.input_state,
+            k,
+            beam_width=beam_width,
+            no_bunching=bool(self.no_bunching),
+        )
+
+    def compute_observables(
+        self, parameters: list[torch.Tensor], correlations: bool = False
+    ) -> torch.Tensor:
+        """Compute mode-occupation expectations without building the SLOS graph.
+
+        The moments are those of the full output state: ``no_bunching`` and the other
+        output space restrictions of the process are not applied.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            correlations: If True, the second moments <n_i n_j> (i <= j, row-major upper
+                triangle) are appended to the mean occupations.
+
+        Returns:
+            Tensor of shape [m] (or [m + m(m+1)/2] with correlations), with a leading
+            batch dimension for batched parameters.
+        """
+        if isinstance(self.input_state, dict):
+            raise ValueError("Observables are not supported for superposition states")
+        unitary = self.converter.to_tensor(*parameters)
+        means = mode_occupations(unitary, self.input_state)
+        if not correlations:
+            return means
+        rows, cols = torch.triu_indices(self.m, self.m, device=unitary.device)
+        second = mode_correlations(unitary, self.input_state)[..., rows, cols]
+        return torch.cat([means, second], dim=-1)
+
     def compute_superposition_state(
         self, parameters: list[torch.Tensor]
     ) -> torch.Tensor:
@@ -165,7 +548,7 @@ class ComputationProcess(AbstractComputationProcess):
     def compute_with_keys(self, parameters: list[torch.Tensor]):
         """Compute quantum output distribution and return both keys and probabilities."""
         # Generate unitary matrix from parameters
-        unitary = self.converter.to_tensor(*parameters)
+        unitary = self._simulation_unitary(parameters)
 
         # Compute output distribution using the input state
         keys, distribution = self.simulation_graph.compute(unitary, self.input_state)
@@ -173,6 +556,144 @@ class ComputationProcess(AbstractComputationProcess):
         return keys, distribution
 
 
+class MonteCarloComputationProcess(ComputationProcess):
+    """Estimates selected output probabilities instead of simulating the full output space.
+
+    Probabilities of the requested output states are estimated with Gurvits' randomized
+    permanent estimator, and observables (functions of the output state) with photon
+    trajectories drawn by the Clifford & Clifford sampler. Every estimate comes with its
+    standard error; the sample budget trades accuracy for time.
+    """
+
+    def __init__(
+        self,
+        *args,
+        output_states: list[tuple[int, ...]] | None = None,
+        samples: int = 10000,
+        chunk_size: int = 1024,
+        **kwargs,
+    ):
+        r"""
+        Args:
+            \*args: Positional arguments of ``ComputationProcess``.
+            output_states: Output states estimated by ``compute``.
+            samples: Number of random sign vectors per probability estimate.
+            chunk_size: Number of sign vectors processed at once.
+            \*\*kwargs: Keyword arguments of ``ComputationProcess``.
+        """
+        super().__init__(*args, **kwargs)
+        if isinstance(self.input_state, dict):
+            raise ValueError(
+                "Monte Carlo estimation is not supported for superposition states"
+            )
+        self.output_states = output_states
+        self.samples = samples
+        self.chunk_size = chunk_size
+        self.standard_errors: torch.Tensor | None = None
+
+    def compute(
+        self,
+        parameters: list[torch.Tensor],
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+    ) -> torch.Tensor:
+        """Estimate the probabilities of ``output_states``.
+
+        The standard errors of the last estimates, before any grouping, are kept in
+        ``standard_errors``.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            readout_indices: Optional bucket index of every output state. When given,
+                the estimates are summed into ``readout_size`` buckets.
+            readout_size: Number of buckets, required with ``readout_indices``.
+
+        Returns:
+            Probability estimates ([len(output_states)] or [batch_size x len(output_states)]),
+            or grouped estimates ([readout_size] or [batch_size x readout_size]).
+        """
+        if readout_indices is not None and readout_size is None:
+            raise ValueError("readout_size must be given along with readout_indices")
+        estimates, self.standard_errors = self.estimate(parameters)
+        if readout_indices is None:
+            return estimates
+        grouped = estimates.new_zeros((*estimates.shape[:-1], readout_size))
+        return grouped.index_add(
+            -1, readout_indices.to(estimates.device, torch.long), estimates
+        )
+
+    def estimate(
+        self,
+        parameters: list[torch.Tensor],
+        output_states: list[tuple[int, ...]] | None = None,
+        samples: int | None = None,
+        generator: torch.Generator | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Estimate output probabilities with Gurvits' permanent estimator.
+
+        Probabilities are not renormalized over collision-free states in no-bunching
+        mode, since the collision-free mass is not known.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            output_states: Output states to estimate, defaults to ``output_states``.
+            samples: Number of random sign vectors, defaults to ``samples``.
+            generator: Optional random generator for reproducibility.
+
+        Returns:
+            Unbiased probability estimates, differentiable w.r.t. the parameters, and
+            their standard errors.
+        """
+        if output_states is None:
+            output_states = self.output_states
+        if output_states is None:
+            raise ValueError("No output states to estimate")
+        unitary = self.converter.to_tensor(*parameters)
+        # superposition input states are rejected in __init__
+        return estimate_output_probabilities(
+            unitary,
+            self.input_state,  # type: ignore[arg-type]
+            output_states,
+            samples=self.samples if samples is None else samples,
+            generator=generator,
+            chunk_size=self.chunk_size,
+        )
+
+    def estimate_observable(
+        self,
+        parameters: list[torch.Tensor],
+        observable,
+        n_outcomes: int,
+        shots: int,
+        generator: torch.Generator | None = None,
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Estimate the outcome distribution of an observable from sampled trajectories.
+
+        Args:
+            parameters: Parameter tensors, in the order of the converter input specs.
+            observable: Function mapping an output state (tuple) to an outcome index in
+                ``range(n_outcomes)``, e.g. the bucket of an output grouping.
+            n_outcomes: Number of outcomes of the observable.
+            shots: Number of trajectories drawn for every sample of the batch.
+            generator: Optional random generator for reproducibility.
+
+        Returns:
+            Outcome frequencies and their binomial standard errors
+            ([n_outcomes] or [batch_size x n_outcomes]).
+        """
+        keys, counts = self.sample(parameters, shots, generator=generator)
+        outcomes = torch.tensor(
+            [observable(key) for key in keys], dtype=torch.long, device=counts.device
+        )
+        grouped = counts.new_zeros((*counts.shape[:-1], n_outcomes)).index_add_(
+            -1, outcomes, counts
+        )
+        total = grouped.sum(dim=-1, keepdim=True).clamp(min=1)
+        frequencies = grouped / total
+        standard_errors = (frequencies * (1 - frequencies) / total).sqrt()
+        return frequencies, standard_errors
+
+
 class ComputationProcessFactory:
     """Factory for creating computation processes."""
 
@@ -0,0 +1,317 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Batch sharding of the simulation of a layer across worker processes.
+
+Every worker holds a copy of the circuit converter and of the SLOS graph of the
+layer, whose tensors are moved to shared memory when the workers are started, and runs
+the same unitary conversion and graph kernels as the in-process simulation. At every
+step, parameters shared by all samples are sent
+once, per-sample parameters are split into contiguous shards, and workers return the
+distributions of their shard. Gradients cross the process boundary through a custom
+autograd function: every worker keeps the autograd graph of each call that needs
+gradients, keyed by a call id, and backpropagates the gradient of its shard of that
+call's output. Graphs are freed after the backward pass of their call, or when the
+call's autograd node is released without one.
+"""
+
+from __future__ import annotations
+
+import itertools
+import traceback
+
+import torch
+import torch.multiprocessing as mp
+
+from ..pcvl_pytorch.locirc_to_tensor import CircuitConverter
+from ..pcvl_pytorch.slos_torchscript import SLOSComputeGraph
+
+
+def _shard_worker(
+    converter, graph, input_state, readouts, real, num_threads, requests, results
+):
+    """Serve forward, backward and release requests until a None request is
+    received."""
+    torch.set_num_threads(num_threads)
+    # autograd graph (leaves, distribution) of every call awaiting its backward
+    graphs: dict[int, tuple[list[torch.Tensor], torch.Tensor]] = {}
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        kind, call_id, payload = request
+        if kind == "release":
+            graphs.pop(call_id, None)
+            continue
+        try:
+            if kind == "forward":
+                params, broadcast, batch_size, fused_readout, needs_grad = payload
+                leaves = [param.requires_grad_(needs_grad) for param in params]
+                with torch.set_grad_enabled(needs_grad):
+                    inputs = [
+                        leaf.expand(batch_size, -1) if is_broadcast else leaf
+                        for leaf, is_broadcast in zip(leaves, broadcast, strict=True)
+                    ]
+                    unitary = converter.to_tensor(*inputs, real=real)
+                    _, distribution = graph.compute(
+                        unitary, input_state, *readouts[fused_readout]
+                    )
+                if needs_grad:
+                    graphs[call_id] = (leaves, distribution)
+                results.put(("ok", distribution.detach()))
+            else:
+                leaves, distribution = graphs.pop(call_id)
+                grads = torch.autograd.grad(
+                    distribution, leaves, grad_outputs=payload, allow_unused=True
+                )
+                results.put(("ok", list(grads)))
+        except Exception:
+            results.put(("error", traceback.format_exc()))
+
+
+class _ShardCall:
+    """Workers and shard sizes of one sharded call.
+
+    Held by the autograd context of the call, so that the graphs kept by the workers
+    are released when the context is, if the backward pass never ran.
+    """
+
+    def __init__(
+        self,
+        executor: BatchShardExecutor,
+        call_id: int,
+        active: list[int],
+        shard_sizes: list[int],
+    ):
+        self.executor = executor
+        self.call_id = call_id
+        self.active = active
+        self.shard_sizes = shard_sizes
+        self.needs_release = False
+
+    def __del__(self):
+        if self.needs_release:
+            self.executor._release(self)
+
+
+class _ShardedSimulation(torch.autograd.Function):
+    """Autograd boundary of a sharded simulation."""
+
+    @staticmethod
+    def forward(ctx, executor, broadcast, batch_size, fused_readout, *params):
+        needs_grad = any(ctx.needs_input_grad[4:])
+        call, distribution = executor._forward(
+            params, broadcast, batch_size, fused_readout, needs_grad
+        )
+        ctx.call = call
+        ctx.broadcast = broadcast
+        return distribution
+
+    @staticmethod
+    def backward(ctx, grad_output):
+        grads = ctx.call.executor._backward(ctx.call, grad_output, ctx.broadcast)
+        return (None, None, None, None, *grads)
+
+
+class BatchShardExecutor:
+    """Run the simulation of a layer configuration on a pool of worker processes.
+
+    The batch of every call is split into contiguous shards, one per worker, so that
+    throughput scales with the number of processes when a single process saturates
+    (e.g. across CPU sockets). Workers run ``CircuitConverter.to_tensor`` and
+    ``SLOSComputeGraph.compute`` as the in-process simulation does, and support
+    backpropagation of the distributions to the parameters.
+
+    Args:
+        converter: Unitary converter of the layer circuit
+        graph: SLOS graph of the layer
+        input_state: Input state of the layer
+        num_workers: Number of worker processes
+        threads_per_worker: Number of torch intra-op threads of every worker
+        readout: Readout indices and size of the fused readout, if any
+        real: Whether the graph runs on the real part of the unitary, for
+            real-orthogonal circuits
+
+    Raises:
+        ValueError: If the number of workers is not positive
+    """
+
+    def __init__(
+        self,
+        converter: CircuitConverter,
+        graph: SLOSComputeGraph,
+        input_state: list[int],
+        num_workers: int,
+        threads_per_worker: int = 1,
+        readout: tuple[torch.Tensor, int] | None = None,
+        real: bool = False,
+    ):
+        if num_workers < 1:
+            raise ValueError(f"num_workers must be positive, got {num_workers}")
+        readouts: dict[bool, tuple] = {False: ()}
+        if readout is not None:
+            readouts[True] = readout
+        context = mp.get_context("spawn")
+        self.num_workers = num_workers
+        self.dtype = converter.tensor_fdtype
+        self.device = torch.device(converter.device or "cpu")
+        self._call_ids = itertools.count()
+        self._requests = [context.Queue() for _ in range(num_workers)]
+        self._results = [context.Queue() for _ in range(num_workers)]
+        self._workers = [
+            context.Process(
+                target=_shard_worker,
+                args=(
+                    converter,
+                    graph,
+                    input_state,
+                    readouts,
+                    real,
+                    threads_per_worker,
+                    requests,
+                    results,
+                ),
+                daemon=True,
+            )
+            for requests, results in zip(self._requests, self._results, strict=True)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __call__(
+        self, params: list[torch.Tensor], fused_readout: bool = False
+    ) -> torch.Tensor:
+        """Compute the output distributions of a batch of parameters.
+
+        Args:
+            params: Parameter tensors, in the order of the converter input specs.
+                Tensors of shape (num_params,), or expanded from one, are shared by all
+                samples and sent once to every worker.
+            fused_readout: Whether to return the distribution grouped by the fused
+                readout
+
+        Returns:
+            Output distributions of shape (batch_size, output_size)
+        """
+        broadcast = tuple(param.dim() == 1 or param.stride(0) == 0 for param in params)
+        batch_sizes = [
+            param.shape[0]
+            for param, is_broadcast in zip(params, broadcast, strict=True)
+            if not is_broadcast
+        ]
+        if not batch_sizes:
+            batch_size = params[0].shape[0] if params and params[0].dim() > 1 else 1
+        else:
+            batch_size = batch_sizes[0]
+        # parameters shared by all samples enter the autograd boundary as one row
+        params = [
+            param[0] if is_broadcast and param.dim() > 1 else param
+            for param, is_broadcast in zip(params, broadcast, strict=True)
+        ]
+        if not torch.is_grad_enabled():
+            # the workers only keep a graph for inputs that require grad
+            params = [param.detach() for param in params]
+        return _ShardedSimulation.apply(
+            self, broadcast, batch_size, fused_readout, *params
+        )
+
+    def _exchange(self, active: list[int], messages: list) -> list:
+        """Send one request per active worker and gather their results."""
+        for worker, message in zip(active, messages, strict=True):
+            self._requests[worker].put(message)
+        outputs, errors = [], []
+        for worker in active:
+            status, output = self._results[worker].get()
+            if status == "error":
+                errors.append(output)
+            outputs.append(output)
+        if errors:
+            raise RuntimeError(f"Batch shard worker failed:\n{errors[0]}")
+        return outputs
+
+    def _forward(self, params, broadcast, batch_size, fused_readout, needs_grad):
+        shards = torch.arange(batch_size).tensor_split(self.num_workers)
+        active = [i for i, shard in enumerate(shards) if shard.numel() > 0]
+        call = _ShardCall(
+            self, next(self._call_ids), active, [shards[i].numel() for i in active]
+        )
+        messages = []
+        start = 0
+        for size in call.shard_sizes:
+            # copies, so that moving them to shared memory leaves the originals alone
+            shard_params = [
+                param.detach().clone()
+                if is_broadcast
+                else param.detach()[start : start + size].clone()
+                for param, is_broadcast in zip(params, broadcast, strict=True)
+            ]
+            messages.append((
+                "forward",
+                call.call_id,
+                (shard_params, broadcast, size, fused_readout, needs_grad),
+            ))
+            start += size
+        # workers that succeed keep their graph even if another one fails
+        call.needs_release = needs_grad
+        outputs = self._exchange(active, messages)
+        return call, torch.cat(outputs)
+
+    def _backward(self, call: _ShardCall, grad_output, broadcast):
+        grad_shards = grad_output.contiguous().split(call.shard_sizes)
+        call.needs_release = False
+        outputs = self._exchange(
+            call.active,
+            [("backward", call.call_id, grad) for grad in grad_shards],
+        )
+        grads: list[torch.Tensor | None] = []
+        for index, is_broadcast in enumerate(broadcast):
+            shard_grads = [output[index] for output in outputs]
+            if any(grad is None for grad in shard_grads):
+                grads.append(None)
+            elif is_broadcast:
+                grads.append(torch.stack(shard_grads).sum(dim=0))
+            else:
+                grads.append(torch.cat(shard_grads))
+        return grads
+
+    def _release(self, call: _ShardCall):
+        """Free the graphs kept by the workers for a call without backward pass."""
+        for worker in call.active:
+            if worker < len(self._requests):
+                self._requests[worker].put(("release", call.call_id, None))
+
+    def close(self):
+        """Stop the worker processes."""
+        for requests, worker in zip(self._requests, self._workers, strict=True):
+            if worker.is_alive():
+                requests.put(None)
+        for worker in self._workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+        self._requests = []
+
+    def __del__(self):
+        if getattr(self, "_workers", None):
+            self.close()
@@ -20,7 +20,41 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from .clifford_sampler import CliffordSampler
+from .compiled import CircuitProgram, SLOSProgram
+from .constraints import PhotonCountConstraint, herald
+from .distributed import DistributedSLOSGraph
+from .fock_keys import FockStateKeys, to_state_vector
+from .light_cone import mode_light_cones, photon_light_cones
 from .locirc_to_tensor import CircuitConverter
+from .loss import PhotonLossChannel
+from .marginals import MarginalComputeGraph, compress_unwatched_modes
+from .monte_carlo import estimate_output_probabilities, estimate_permanent
+from .observables import mode_correlations, mode_occupations
+from .permanent import permanent
 from .slos_torchscript import build_slos_distribution_computegraph
+from .top_k import top_k_states
 
-__all__ = ["build_slos_distribution_computegraph", "CircuitConverter"]
+__all__ = [
+    "build_slos_distribution_computegraph",
+    "CircuitConverter",
+    "CircuitProgram",
+    "CliffordSampler",
+    "compress_unwatched_modes",
+    "DistributedSLOSGraph",
+    "estimate_output_probabilities",
+    "estimate_permanent",
+    "FockStateKeys",
+    "herald",
+    "MarginalComputeGraph",
+    "mode_correlations",
+    "mode_light_cones",
+    "mode_occupations",
+    "PhotonCountConstraint",
+    "PhotonLossChannel",
+    "SLOSProgram",
+    "permanent",
+    "photon_light_cones",
+    "to_state_vector",
+    "top_k_states",
+]
@@ -0,0 +1,237 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Exact boson sampling with the Clifford & Clifford algorithm.
+
+Output Fock states are drawn photon by photon: after a uniformly random permutation of
+the input photons, the k-th output mode is drawn from the marginal distribution of the
+first k photons, which only involves permanents of (k-1)x(k-1) submatrices (Laplace
+expansion, "algorithm B" of Clifford & Clifford, 2018). The k-th step evaluates k
+permanents of (k-1)x(k-1) minors with Glynn's formula, about k^3 2^k operations, so
+a shot costs O(n^3 2^n + m n^2) for n photons. This never requires the output
+probability vector: the cost does not grow with the number of output states, which
+pays off when the output space is much larger than 2^n.
+
+The implementation is batched over unitaries and vectorized over shots, in chunks
+sized to keep the permanent evaluations within a memory budget.
+
+``QuantumLayer`` does not use this sampler: its shot noise is drawn from the SLOS
+output distribution, which it computes anyway. It is reached through
+``ComputationProcess.sample``.
+"""
+
+import torch
+
+from .permanent import permanent
+
+
+class CliffordSampler:
+    """
+    Shot sampler for a fixed input Fock state, reusable for any number of unitaries.
+
+    Args:
+        m (int): Number of modes in the circuit
+        input_state (list[int]): Input Fock state, one photon count per mode
+        no_bunching (bool): If True, samples with more than one photon in a mode are
+            discarded (post-selection on collision-free outputs, as in SLOS no-bunching mode)
+        memory_budget (int): Approximate number of bytes of the intermediate tensors of
+            the permanent evaluations, which sets the number of shots propagated at once
+        chunk_size (int, optional): Maximum number of shots propagated at once, on top
+            of the memory budget
+    """
+
+    def __init__(
+        self,
+        m: int,
+        input_state: list[int],
+        no_bunching: bool = False,
+        memory_budget: int = 2**28,
+        chunk_size: int | None = None,
+    ):
+        if len(input_state) != m:
+            raise ValueError(
+                f"Input state must have {m} modes, got {len(input_state)} modes"
+            )
+        if any(n < 0 for n in input_state) or sum(input_state) == 0:
+            raise ValueError("Photon numbers cannot be negative or all zeros")
+        if memory_budget <= 0:
+            raise ValueError(f"memory_budget must be positive, got {memory_budget}")
+        if chunk_size is not None and chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+        self.m = m
+        self.input_state = list(input_state)
+        self.n_photons = sum(input_state)
+        self.no_bunching = no_bunching
+        self.memory_budget = memory_budget
+        self.chunk_size = chunk_size
+        # mode of every input photon, photons in the same mode are repeated
+        self.input_modes = [
+            i for i, count in enumerate(input_state) for _ in range(count)
+        ]
+
+        # columns kept when removing column j from a k-column matrix, for every k
+        self._minor_columns = [
+            torch.tensor(
+                [[c for c in range(k) if c != j] for j in range(k)], dtype=torch.long
+            )
+            for k in range(self.n_photons + 1)
+        ]
+
+    def _shots_per_chunk(self, batch_size: int, itemsize: int) -> int:
+        """Number of shots propagated at once for a batch of unitaries.
+
+        The largest intermediate tensor is built at the last photon, with the Glynn
+        row sums of the n minors of size n-1: [b, shots, n, 2^(n-2), n-1] complex
+        values.
+        """
+        n = self.n_photons
+        elements = max(n * 2 ** max(n - 2, 0) * max(n - 1, 1), self.m)
+        shots = max(1, self.memory_budget // (batch_size * elements * itemsize))
+        if self.chunk_size is not None:
+            shots = min(shots, self.chunk_size)
+        return shots
+
+    def _sample_modes(
+        self,
+        columns: torch.Tensor,
+        shots: int,
+        generator: torch.Generator | None,
+    ) -> torch.Tensor:
+        """
+        Draw the output mode of every photon for a chunk of shots.
+
+        Args:
+            columns: Input columns of the unitaries [batch_size, m, n]
+            shots: Number of shots in this chunk
+
+        Returns:
+            Output modes [batch_size, shots, n]
+        """
+        batch_size, m, n = columns.shape
+        device = columns.device
+
+        # uniformly random photon order for every shot
+        order = torch.rand(
+            (batch_size, shots, n), generator=generator, device=device
+        ).argsort(dim=-1)
+        permuted = columns.unsqueeze(1).expand(batch_size, shots, m, n)
+        permuted = permuted.gather(-1, order.unsqueeze(-2).expand(-1, -1, m, -1))
+
+        modes = torch.empty((batch_size, shots, 0), dtype=torch.long, device=device)
+        for k in range(1, n + 1):
+            if k == 1:
+                weights = permuted[..., 0].abs() ** 2
+            else:
+                # rows already drawn, restricted to the first k photons [b, s, k-1, k]
+                drawn = permuted[..., :k].gather(
+                    -2, modes.unsqueeze(-1).expand(-1, -1, -1, k)
+                )
+                # minors with column l removed [b, s, k, k-1, k-1]
+                minor_columns = self._minor_columns[k].to(device)
+                minors = drawn[..., minor_columns].movedim(-3, -2)
+                minor_permanents = permanent(minors)
+                # Laplace expansion of Perm(drawn + row i) along the new row
+                amplitudes = (
+                    permuted[..., :k] @ minor_permanents.unsqueeze(-1)
+                ).squeeze(-1)
+                weights = amplitudes.real**2 + amplitudes.imag**2
+
+            next_modes = torch.multinomial(
+                weights.reshape(-1, m), 1, generator=generator
+            ).reshape(batch_size, shots, 1)
+            modes = torch.cat([modes, next_modes], dim=-1)
+
+        return modes
+
+    def sample(
+        self,
+        unitary: torch.Tensor,
+        shots: int,
+        generator: torch.Generator | None = None,
+    ) -> tuple[list[tuple[int, ...]], torch.Tensor]:
+        """
+        Draw output Fock states for a single unitary or a batch of unitaries.
+
+        Args:
+            unitary (torch.Tensor): Unitary [m x m] or batch of unitaries [b x m x m]
+            shots (int): Number of shots drawn for every unitary
+            generator (torch.Generator, optional): Random generator for reproducibility
+
+        Returns:
+            Tuple[List[Tuple[int, ...]], torch.Tensor]:
+                - Output Fock states observed in at least one shot of the batch
+                - Counts of every observed state, [len(keys)] or [b x len(keys)]. In
+                  no-bunching mode, rejected shots are not counted.
+        """
+        if shots < 0:
+            raise ValueError(f"shots must be a non-negative integer, got {shots}")
+
+        if len(unitary.shape) == 2:
+            is_batched = False
+            unitary = unitary.unsqueeze(0)
+        else:
+            is_batched = True
+
+        batch_size, m, m2 = unitary.shape
+        if m != m2 or m != self.m:
+            raise ValueError(
+                f"Unitary matrix must be square with dimension {self.m}x{self.m}"
+            )
+        device = unitary.device
+
+        columns = unitary[..., self.input_modes]
+        chunk_size = self._shots_per_chunk(batch_size, columns.element_size())
+        chunks = [torch.zeros((batch_size, 0, m), dtype=torch.long, device=device)]
+        for start in range(0, shots, chunk_size):
+            chunk = min(chunk_size, shots - start)
+            with torch.no_grad():
+                modes = self._sample_modes(columns, chunk, generator)
+            chunks.append(
+                torch.zeros(
+                    (batch_size, chunk, m), dtype=torch.long, device=device
+                ).scatter_add_(-1, modes, torch.ones_like(modes))
+            )
+        occupations = torch.cat(chunks, dim=1)
+
+        batch_index = torch.arange(batch_size, device=device).repeat_interleave(
+            occupations.shape[1]
+        )
+        occupations = occupations.reshape(-1, m)
+        if self.no_bunching:
+            kept = (occupations <= 1).all(dim=-1)
+            occupations = occupations[kept]
+            batch_index = batch_index[kept]
+
+        states, inverse = torch.unique(occupations, dim=0, return_inverse=True)
+        counts = torch.zeros(
+            (batch_size, states.shape[0]), dtype=torch.long, device=device
+        )
+        counts.index_put_(
+            (batch_index, inverse), torch.ones_like(inverse), accumulate=True
+        )
+
+        keys = [tuple(state) for state in states.tolist()]
+        if not is_batched:
+            counts = counts.squeeze(0)
+        return keys, counts
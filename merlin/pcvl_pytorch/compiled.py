@@ -0,0 +1,291 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Traceable programs of the unitary conversion and of the SLOS simulation.
+
+``CircuitConverter`` and ``SLOSComputeGraph`` dispatch on component types, read
+tensor sizes with ``.item()`` and handle many configurations at every call, which
+breaks ``torch.compile`` graphs. The programs below capture one configuration (the
+circuit, the input state and the readout) as fixed index tensors and sizes, and run
+with real and imaginary planes only, as inductor does not generate code for complex
+operators. They compose into a function of the circuit parameters that
+``torch.compile`` traces as a single graph.
+"""
+
+from __future__ import annotations
+
+import torch
+from perceval.components import BS, PS, BSConvention
+
+from .slos_torchscript import SLOSComputeGraph
+
+# Beam splitter matrices before the theta and phase factors, as (real, imag) pairs
+_BS_BASES = {
+    BSConvention.Rx: ((1.0, 0.0), (0.0, 1.0), (0.0, 1.0), (1.0, 0.0)),
+    BSConvention.Ry: ((1.0, 0.0), (-1.0, 0.0), (1.0, 0.0), (1.0, 0.0)),
+    BSConvention.H: ((1.0, 0.0), (1.0, 0.0), (1.0, 0.0), (-1.0, 0.0)),
+}
+
+
+def _complex_matmul(
+    a_real: torch.Tensor,
+    a_imag: torch.Tensor,
+    b_real: torch.Tensor,
+    b_imag: torch.Tensor,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Product of two complex matrices given as real and imaginary planes."""
+    return a_real @ b_real - a_imag @ b_imag, a_real @ b_imag + a_imag @ b_real
+
+
+class CircuitProgram:
+    """Traceable unitary builder of a ``CircuitConverter`` configuration.
+
+    Precompiled tensors of the converter are stored as real and imaginary planes, and
+    parameterized components read their parameters at fixed positions, so that
+    building the unitary runs no Python logic depending on tensor values.
+
+    Args:
+        converter: Converter whose circuit and dtype are captured
+
+    Raises:
+        ValueError: If a phase shifter has a random error (``max_error``)
+        NotImplementedError: If a beam splitter convention is not supported
+    """
+
+    def __init__(self, converter):
+        self.m = converter.circuit.m
+        self.nb_input_tensor = converter.nb_input_tensor
+        self.dtype = converter.tensor_fdtype
+        self.device = converter.device
+        self.steps = []
+        for r, c in converter.list_rct:
+            if isinstance(c, torch.Tensor):
+                c = c.to(dtype=converter.tensor_cdtype, device=self.device)
+                step = ("matrix", (c.real.contiguous(), c.imag.contiguous()))
+            elif isinstance(c, PS):
+                if c._max_error:
+                    raise ValueError(
+                        "Phase shifters with a random error cannot be compiled"
+                    )
+                step = ("phase", self._value(converter, c.param("phi")))
+            elif isinstance(c, BS):
+                if c._convention not in _BS_BASES:
+                    raise NotImplementedError(
+                        f"BS convention : {c._convention.name} not supported."
+                    )
+                values = [
+                    self._value(converter, param)
+                    for param in c.get_parameters(all_params=True)
+                ]
+                step = ("beam_splitter", (values, _BS_BASES[c._convention]))
+            else:
+                raise TypeError(f"{c} type not supported for compilation")
+            self.steps.append((r[0], r[-1] + 1, *step))
+
+    def _value(self, converter, param):
+        """Position (tensor_id, idx_in_tensor) of a variable parameter, or the tensor
+        of a fixed one."""
+        if param.is_variable:
+            return converter.param_mapping[param.name]
+        return torch.tensor(float(param), dtype=self.dtype, device=self.device)
+
+    @staticmethod
+    def _read(params: list[torch.Tensor], value) -> torch.Tensor:
+        if isinstance(value, tuple):
+            tensor_id, idx_in_tensor = value
+            return params[tensor_id][:, idx_in_tensor]
+        return value
+
+    def __call__(
+        self, *input_params: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        r"""Build the unitary of the circuit.
+
+        Args:
+            \*input_params: Parameter tensors of shape (num_params,) or
+                (batch_size, num_params), in the order of the converter input specs
+
+        Returns:
+            Real and imaginary planes of the unitary, of shape (batch_size, m, m)
+            (batch_size is 1 for unbatched parameters)
+        """
+        if len(input_params) != self.nb_input_tensor:
+            raise ValueError(
+                f"Expected {self.nb_input_tensor} input tensors, but got "
+                f"{len(input_params)}."
+            )
+        params = [
+            param.to(self.dtype).reshape(-1, param.shape[-1]) for param in input_params
+        ]
+        batch_size = params[0].shape[0] if params else 1
+
+        eye = torch.eye(self.m, dtype=self.dtype, device=self.device)
+        u_real = eye.expand(batch_size, -1, -1)
+        u_imag = torch.zeros_like(u_real)
+        for start, stop, kind, data in self.steps:
+            rows_real, rows_imag = u_real[:, start:stop], u_imag[:, start:stop]
+            if kind == "phase":
+                phase = self._read(params, data).reshape(-1, 1, 1)
+                cos, sin = torch.cos(phase), torch.sin(phase)
+                new_real = cos * rows_real - sin * rows_imag
+                new_imag = cos * rows_imag + sin * rows_real
+            else:
+                if kind == "matrix":
+                    block_real, block_imag = data
+                else:
+                    block_real, block_imag = self._beam_splitter(params, *data)
+                new_real, new_imag = _complex_matmul(
+                    block_real, block_imag, rows_real, rows_imag
+                )
+            u_real = torch.cat(
+                (u_real[:, :start], new_real.expand_as(rows_real), u_real[:, stop:]),
+                dim=1,
+            )
+            u_imag = torch.cat(
+                (u_imag[:, :start], new_imag.expand_as(rows_imag), u_imag[:, stop:]),
+                dim=1,
+            )
+        return u_real, u_imag
+
+    def _beam_splitter(self, params, values, base):
+        """Real and imaginary planes of a beam splitter, of shape (batch_size, 2, 2)."""
+        theta, phi_tl, phi_bl, phi_tr, phi_br = (
+            self._read(params, value) for value in values
+        )
+        cos_theta = torch.cos(theta / 2)
+        sin_theta = torch.sin(theta / 2)
+        amplitudes = (cos_theta, sin_theta, sin_theta, cos_theta)
+        phases = (phi_tl + phi_tr, phi_tr + phi_bl, phi_tl + phi_br, phi_bl + phi_br)
+        elements_real, elements_imag = [], []
+        for (b_real, b_imag), amplitude, phase in zip(
+            base, amplitudes, phases, strict=True
+        ):
+            cos, sin = amplitude * torch.cos(phase), amplitude * torch.sin(phase)
+            elements_real.append(b_real * cos - b_imag * sin)
+            elements_imag.append(b_real * sin + b_imag * cos)
+        elements_real = torch.broadcast_tensors(*elements_real)
+        elements_imag = torch.broadcast_tensors(*elements_imag)
+        return (
+            torch.stack(elements_real, dim=-1).reshape(-1, 2, 2),
+            torch.stack(elements_imag, dim=-1).reshape(-1, 2, 2),
+        )
+
+
+class SLOSProgram:
+    """Traceable SLOS simulation of one input state on a built computation graph.
+
+    The photon injected by every layer, the size of every layer and the
+    normalization of the readout only depend on the input state, and are fixed when
+    the program is built.
+
+    Args:
+        graph: SLOS computation graph (float32 or float64)
+        input_state: Input state of the simulation
+        readout_indices: Optional bucket index of every final Fock state (see
+            ``SLOSComputeGraph.compose_readout_indices``)
+        readout_size: Number of buckets, required with ``readout_indices``
+
+    Raises:
+        ValueError: For low-precision graphs, or an invalid input state
+    """
+
+    def __init__(
+        self,
+        graph: SLOSComputeGraph,
+        input_state: list[int],
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+    ):
+        if graph.low_precision:
+            raise ValueError("SLOS programs require a float32 or float64 graph")
+        if readout_indices is not None and readout_size is None:
+            raise ValueError("readout_size must be given along with readout_indices")
+        device = graph.device
+        identity = torch.eye(graph.m, dtype=graph.complex_dtype)
+        _, _, idx_n = graph._prepare_inputs(identity, input_state)
+        self.norm_factor_input = float(graph.norm_factor_input)
+        self.dtype = graph.dtype
+
+        self.layers = []
+        for (sources, destinations, modes), p in zip(
+            graph.vectorized_operations, idx_n, strict=True
+        ):
+            if sources.shape[0] == 0:
+                continue
+            # element (mode, p) of the unitary, in the flattened [m x m] matrix
+            self.layers.append((
+                sources.to(device),
+                destinations.to(device),
+                (modes * graph.m + p).to(device),
+                int(destinations.max().item()) + 1,
+            ))
+
+        self.norm_factor_output = graph.norm_factor_output.to(
+            dtype=self.dtype, device=device
+        )
+        if readout_indices is None and graph.has_output_mapping:
+            readout_indices = graph.target_indices
+            readout_size = graph.total_mapped_keys
+        self.readout_indices = (
+            None if readout_indices is None else readout_indices.to(device)
+        )
+        self.readout_size = readout_size
+        self.renormalize = bool(
+            graph.output_map_func is not None
+            or graph.no_bunching
+            or graph.max_occupation is not None
+            or graph.constraints
+        )
+
+    def __call__(self, u_real: torch.Tensor, u_imag: torch.Tensor) -> torch.Tensor:
+        """Compute the output distribution.
+
+        Args:
+            u_real: Real plane of the unitaries, of shape (batch_size, m, m)
+            u_imag: Imaginary plane of the unitaries, of shape (batch_size, m, m)
+
+        Returns:
+            Output distribution of shape (batch_size, num_outputs)
+        """
+        batch_size = u_real.shape[0]
+        u_real = u_real.reshape(batch_size, -1)
+        u_imag = u_imag.reshape(batch_size, -1)
+        a_real = torch.ones((batch_size, 1), dtype=u_real.dtype, device=u_real.device)
+        a_imag = torch.zeros_like(a_real)
+        for sources, destinations, elements, next_size in self.layers:
+            e_real, e_imag = u_real[:, elements], u_imag[:, elements]
+            s_real, s_imag = a_real[:, sources], a_imag[:, sources]
+            zeros = a_real.new_zeros((batch_size, next_size))
+            a_real = zeros.index_add(1, destinations, e_real * s_real - e_imag * s_imag)
+            a_imag = zeros.index_add(1, destinations, e_real * s_imag + e_imag * s_real)
+
+        probabilities = (a_real.square() + a_imag.square()) * self.norm_factor_output
+        if self.readout_indices is not None:
+            probabilities = probabilities.new_zeros((
+                batch_size,
+                self.readout_size,
+            )).index_add(1, self.readout_indices, probabilities)
+        if self.renormalize:
+            sum_probs = probabilities.sum(dim=1, keepdim=True)
+            return probabilities / torch.where(sum_probs > 0, sum_probs, 1.0)
+        return probabilities / self.norm_factor_input
@@ -0,0 +1,108 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Declarative post-selection constraints on output photon counts.
+
+Constraints are enforced by the SLOS graph builder at every photon layer: a partial
+state is dropped as soon as no way of placing the remaining photons can satisfy a
+constraint, so heralded and post-selected graphs shrink at every layer rather than
+only at the last one.
+"""
+
+from dataclasses import dataclass
+
+import torch
+
+
+@dataclass(frozen=True)
+class PhotonCountConstraint:
+    """Post-selection on the number of photons detected in a group of modes.
+
+    Args:
+        modes: Modes of the group
+        min_photons: Minimum number of photons in the group
+        max_photons: Maximum number of photons in the group (no maximum if None)
+        parity: Required parity of the number of photons in the group (0 for even,
+            1 for odd), or None
+    """
+
+    modes: tuple[int, ...]
+    min_photons: int = 0
+    max_photons: int | None = None
+    parity: int | None = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "modes", tuple(self.modes))
+        if self.parity not in (None, 0, 1):
+            raise ValueError(f"parity must be 0, 1 or None, got {self.parity}")
+
+    def is_reachable(
+        self, count: torch.Tensor, min_added: int, max_added: torch.Tensor
+    ) -> torch.Tensor:
+        """Whether a final count in [count + min_added, count + max_added] satisfies
+        the constraint, for every count of a batch of partial states."""
+        low = (count + min_added).clamp(min=self.min_photons)
+        high = count + max_added
+        if self.max_photons is not None:
+            high = high.clamp(max=self.max_photons)
+        reachable = low <= high
+        if self.parity is not None:
+            reachable &= (low % 2 == self.parity) | (low < high)
+        return reachable
+
+
+def herald(pattern: dict[int, int]) -> list[PhotonCountConstraint]:
+    """Constraints requiring an exact number of photons in heralded modes.
+
+    Args:
+        pattern: Number of photons detected in every heralded mode
+
+    Returns:
+        One constraint per heralded mode
+    """
+    return [
+        PhotonCountConstraint((mode,), min_photons=count, max_photons=count)
+        for mode, count in pattern.items()
+    ]
+
+
+def _constraint_bounds(
+    constraints: list[PhotonCountConstraint],
+    photon_modes: list[tuple[int, ...]],
+) -> list[list[tuple[int, int]]]:
+    """For every layer and constraint, the minimum and maximum numbers of photons the
+    photons of the following layers can add to the group of the constraint."""
+    n_photons = len(photon_modes)
+    bounds = []
+    for layer in range(n_photons):
+        layer_bounds = []
+        for constraint in constraints:
+            group = set(constraint.modes)
+            min_added = max_added = 0
+            for modes in photon_modes[layer + 1 :]:
+                reachable = set(modes)
+                max_added += bool(reachable & group)
+                min_added += reachable <= group
+            layer_bounds.append((min_added, max_added))
+        bounds.append(layer_bounds)
+    return bounds
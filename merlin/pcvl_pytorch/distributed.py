@@ -0,0 +1,701 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+SLOS simulation with the state space distributed across processes.
+
+Near the simulability threshold the last layers of the SLOS graph no longer fit in
+the memory of a single process. ``DistributedSLOSGraph`` partitions the states of
+every layer across the ranks of a ``torch.distributed`` process group, without ever
+building the whole graph: every rank owns a contiguous range of the combinatorial
+ranks of each layer (see ``fock_keys``), enumerates the states of its range, and
+derives the operations producing them by removing one photon from each state. The
+sources of these operations are looked up on the ranks owning them, which gives the
+amplitude exchange of the layer: during a computation, each rank receives the source
+amplitudes it needs with one all-to-all exchange per layer, and the final
+distribution is reduced or gathered across ranks. Building and computing only run
+indexing, collectives and the usual layer kernel on the share of the rank.
+
+All collectives of a computation go through ``torch.distributed.nn.functional`` and
+are differentiable. They run on any backend supporting all-to-all, including gloo,
+so that the distributed mode can be tested with several processes on one machine.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+import torch
+import torch.distributed as dist
+import torch.distributed.nn.functional as dist_fn
+
+from .constraints import PhotonCountConstraint, _constraint_bounds
+from .fock_keys import FockStateKeys, _count_table, fock_state_rank, fock_state_unrank
+from .slos_torchscript import (
+    LOW_PRECISION_DTYPES,
+    _get_complex_dtype_for_float,
+    _photon_input_modes,
+    _reachable_states,
+    layer_compute_vectorized,
+)
+
+# blocks of ranks counted per process to balance the layers
+_BLOCKS_PER_RANK = 64
+
+
+@dataclass
+class _LayerPlan:
+    """Operations and amplitude exchange of one rank for one layer."""
+
+    sources: torch.Tensor
+    destinations: torch.Tensor
+    modes: torch.Tensor
+    size: int
+    # None when the previous layer is replicated on every rank
+    send_indices: torch.Tensor | None
+    send_counts: list[int] | None
+    recv_counts: list[int] | None
+
+
+class DistributedSLOSGraph:
+    """
+    SLOS computation distributed across a process group.
+
+    Every rank builds a ``DistributedSLOSGraph`` with the same arguments, as it would
+    build a ``SLOSComputeGraph``. In every layer, the states are ordered by
+    decreasing combinatorial rank and split into one contiguous range per rank,
+    balanced on the number of states. A rank enumerates and stores the operations
+    producing its own states only, with their sources remapped into the buffer
+    received from the other ranks, and the indices of the owned amplitudes each peer
+    needs. Neither the graph structure nor the final states are ever held whole by a
+    rank, except for the output keys returned by gathered computations, which are
+    gathered on first use.
+
+    The outputs follow the order of ``SLOSComputeGraph``, except when photons are
+    restricted to subsets of modes (``index_photons`` or ``photon_modes``), where
+    the final states are ordered by decreasing rank.
+
+    The unitary must be the same on every rank. Outputs are identical on every rank,
+    except with ``gather=False`` where each rank returns the probabilities of its own
+    final states (``local_range``). The backward pass of the collectives sums the
+    gradients of all ranks, so that averaging the parameter gradients over ranks, as
+    ``DistributedDataParallel`` does, gives the gradient of a loss computed by every
+    rank.
+
+    Args:
+        m (int): Number of modes in the circuit
+        n_photons (int): Number of photons
+        output_map_func (callable, optional): Function that maps output states
+        no_bunching (bool): If True, only no-bunching states are simulated
+        keep_keys (bool): If True, output state keys are returned
+        device: Device of the operations and final tensors
+        dtype: Float dtype of the distributions (float32 or float64)
+        index_photons: Lowest and highest mode every photon layer can reach
+        threshold_detection (bool): If True, outputs are click patterns
+        max_occupation (int or list[int], optional): Maximum number of photons in
+            every mode (or in each mode, for a list)
+        constraints (list[PhotonCountConstraint], optional): Post-selection
+            constraints
+        photon_modes (list[list[int]], optional): Modes every photon layer may reach
+        group: Process group, defaults to the default group
+        chunk_size (int): Number of states enumerated at once when building the layers
+
+    Raises:
+        RuntimeError: If ``torch.distributed`` is not initialized
+        ValueError: If the dtype is a low precision dtype
+    """
+
+    def __init__(
+        self,
+        m: int,
+        n_photons: int,
+        output_map_func: Callable[[tuple[int, ...]], tuple[int, ...] | None] = None,
+        no_bunching: bool = False,
+        keep_keys: bool = True,
+        device=None,
+        dtype: torch.dtype = torch.float,
+        index_photons: list[tuple[int, ...]] | None = None,
+        threshold_detection: bool = False,
+        max_occupation: int | list[int] | None = None,
+        constraints: list[PhotonCountConstraint] | None = None,
+        photon_modes: list[list[int]] | None = None,
+        group=None,
+        chunk_size: int = 1 << 16,
+    ):
+        if not dist.is_available() or not dist.is_initialized():
+            raise RuntimeError(
+                "torch.distributed must be initialized to distribute a SLOS graph"
+            )
+        if dtype in LOW_PRECISION_DTYPES:
+            raise ValueError("Low precision graphs cannot be distributed")
+        if threshold_detection and output_map_func is not None:
+            raise ValueError(
+                "threshold_detection and output_map_func cannot be used together"
+            )
+        self.group = group
+        self.rank = dist.get_rank(group)
+        self.world_size = dist.get_world_size(group)
+        # planning collectives run on the device of the backend
+        self._plan_device = (
+            torch.device("cuda", torch.cuda.current_device())
+            if dist.get_backend(group) == "nccl"
+            else torch.device("cpu")
+        )
+
+        self.m = m
+        self.n_photons = n_photons
+        self.device = device
+        self.dtype = dtype
+        self.complex_dtype = _get_complex_dtype_for_float(dtype)
+        self.no_bunching = no_bunching
+        self.keep_keys = keep_keys
+        self.output_map_func = output_map_func
+        self.threshold_detection = threshold_detection
+        self.chunk_size = chunk_size
+        if max_occupation is None:
+            self.occupation_caps = None
+        elif isinstance(max_occupation, int):
+            self.occupation_caps = [max_occupation] * m
+        elif len(max_occupation) == m:
+            self.occupation_caps = list(max_occupation)
+        else:
+            raise ValueError(
+                f"max_occupation must be an int or a list of {m} ints, got {max_occupation}"
+            )
+        self.constraints = list(constraints) if constraints else None
+
+        if index_photons is None:
+            index_photons = [(0, m - 1)] * n_photons
+        self.index_photons = index_photons
+        self.photon_modes = [tuple(range(low, high + 1)) for low, high in index_photons]
+        if photon_modes is not None:
+            if len(photon_modes) != n_photons:
+                raise ValueError(
+                    f"photon_modes must give the modes of {n_photons} photons"
+                )
+            self.photon_modes = [
+                tuple(mode for mode in modes if mode in reachable)
+                for modes, reachable in zip(
+                    self.photon_modes, map(set, photon_modes), strict=True
+                )
+            ]
+        self._constraint_bounds = (
+            _constraint_bounds(self.constraints, self.photon_modes)
+            if self.constraints
+            else None
+        )
+
+        self.plans: list[_LayerPlan] = []
+        previous_bounds, previous_keys = None, None
+        for layer in range(n_photons):
+            bounds = self._layer_bounds(layer)
+            keys, states = self._enumerate(
+                layer, bounds[self.rank], bounds[self.rank + 1]
+            )
+            plan, states, keys = self._plan_layer(
+                layer, states, keys, previous_bounds, previous_keys
+            )
+            self.plans.append(plan)
+            previous_bounds, previous_keys = bounds, keys
+
+        sizes = self._all_gather_object(states.shape[0])
+        if sum(sizes) == 0:
+            raise ValueError("No output state satisfies the graph constraints")
+        offset = sum(sizes[: self.rank])
+        self.final_sizes = sizes
+        self.local_range = (offset, offset + states.shape[0])
+
+        factorials = torch.tensor(
+            [float(math.factorial(k)) for k in range(n_photons + 1)],
+            dtype=torch.float64,
+        )
+        self.norm_factor_output = (
+            factorials[states].prod(dim=-1).to(dtype=dtype, device=device)
+        )
+        table = _count_table(m, n_photons)
+        self.local_keys = (
+            FockStateKeys(fock_state_rank(states, n_photons, table), m, n_photons)
+            if keep_keys
+            else None
+        )
+        self._final_keys: FockStateKeys | None = None
+
+        self.target_indices: torch.Tensor | None = None
+        self.mapped_keys: list[tuple[int, ...]] | None = None
+        self.total_mapped_keys = 0
+        if output_map_func is not None:
+            self._build_output_mapping(states)
+        elif threshold_detection:
+            self._build_click_mapping(states)
+
+        self.renormalize = bool(
+            output_map_func is not None
+            or no_bunching
+            or max_occupation is not None
+            or self.constraints
+        )
+        self.norm_factor_input = 1
+        self.truncated_mass: torch.Tensor | None = None
+
+    @property
+    def has_output_mapping(self) -> bool:
+        """Whether final states are reduced to mapped keys (``target_indices``)."""
+        return self.output_map_func is not None or self.threshold_detection
+
+    @property
+    def final_keys(self) -> FockStateKeys | None:
+        """Keys of all the final states, gathered from every rank on first use.
+
+        This is a collective: every rank must access it.
+        """
+        if self.local_keys is None:
+            return None
+        if self._final_keys is None:
+            ranks = self.local_keys.ranks.to(self._plan_device)
+            padded = torch.full(
+                (max(self.final_sizes),), -1, dtype=torch.long, device=ranks.device
+            )
+            padded[: ranks.shape[0]] = ranks
+            gathered = [torch.empty_like(padded) for _ in range(self.world_size)]
+            dist.all_gather(gathered, padded, group=self.group)
+            ranks = torch.cat([
+                part[:size]
+                for part, size in zip(gathered, self.final_sizes, strict=True)
+            ])
+            self._final_keys = FockStateKeys(ranks.cpu(), self.m, self.n_photons)
+        return self._final_keys
+
+    def _all_gather_object(self, obj) -> list:
+        """Python objects of every rank, in rank order."""
+        gathered: list = [None] * self.world_size
+        dist.all_gather_object(gathered, obj, group=self.group)
+        return gathered
+
+    def _state_mask(self, states: torch.Tensor, layer: int) -> torch.Tensor:
+        """Mask of the states of a layer that the graph may hold, from the states
+        alone: photons in reachable modes, bunching, occupation caps and constraints.
+        Whether a state is produced by the previous layer is checked by the planning.
+        """
+        reachable = set().union(*self.photon_modes[: layer + 1])
+        unreachable = [mode for mode in range(self.m) if mode not in reachable]
+        mask = (states[:, unreachable] == 0).all(dim=-1)
+        if self.no_bunching:
+            mask &= (states <= 1).all(dim=-1)
+        if self.occupation_caps is not None:
+            caps = torch.tensor(self.occupation_caps, dtype=torch.long)
+            mask &= (states <= caps).all(dim=-1)
+        if self.constraints:
+            mask &= _reachable_states(
+                states,
+                self.constraints,
+                self._constraint_bounds[layer],
+                self.no_bunching,
+                self.occupation_caps,
+            )
+        return mask
+
+    def _chunks(self, layer: int, start: int, end: int):
+        """States of a layer with keys in ``[start, end)``, in chunks.
+
+        The key of a state is its position in decreasing rank order.
+
+        Yields:
+            Tuples of the keys and occupations of the states of the chunk that pass
+            ``_state_mask``
+        """
+        n_photons = layer + 1
+        table = _count_table(self.m, n_photons)
+        num_states = int(table[n_photons, self.m - 1].item())
+        for chunk_start in range(start, end, self.chunk_size):
+            keys = torch.arange(chunk_start, min(chunk_start + self.chunk_size, end))
+            states = fock_state_unrank(num_states - 1 - keys, self.m, n_photons, table)
+            mask = self._state_mask(states, layer)
+            yield keys[mask], states[mask]
+
+    def _layer_bounds(self, layer: int) -> list[int]:
+        """Split the keys of a layer into one range per rank, balancing the number of
+        states passing ``_state_mask``.
+
+        The key space is cut into blocks counted in turn by the ranks, and the counts
+        are summed across ranks before choosing the bounds among the block edges.
+        """
+        n_photons = layer + 1
+        num_states = math.comb(self.m + n_photons - 1, n_photons)
+        num_blocks = min(num_states, self.world_size * _BLOCKS_PER_RANK)
+        edges = [block * num_states // num_blocks for block in range(num_blocks + 1)]
+        counts = torch.zeros(num_blocks, dtype=torch.long)
+        for block in range(self.rank, num_blocks, self.world_size):
+            counts[block] = sum(
+                keys.shape[0]
+                for keys, _ in self._chunks(layer, edges[block], edges[block + 1])
+            )
+        counts = counts.to(self._plan_device)
+        dist.all_reduce(counts, group=self.group)
+        cumulative = counts.cumsum(0).cpu()
+        total = int(cumulative[-1].item())
+        targets = torch.tensor(
+            [rank * total // self.world_size for rank in range(1, self.world_size)],
+            dtype=torch.long,
+        )
+        cuts = torch.searchsorted(cumulative, targets, right=True).tolist()
+        return [0, *(edges[cut] for cut in cuts), num_states]
+
+    def _enumerate(
+        self, layer: int, start: int, end: int
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Keys and occupations of the states of a layer in ``[start, end)``."""
+        chunks = list(self._chunks(layer, start, end))
+        if not chunks:
+            return (
+                torch.empty(0, dtype=torch.long),
+                torch.empty((0, self.m), dtype=torch.long),
+            )
+        keys, states = zip(*chunks, strict=True)
+        return torch.cat(keys), torch.cat(states)
+
+    def _exchange_plan(
+        self,
+        needed: torch.Tensor,
+        previous_bounds: list[int],
+        previous_keys: torch.Tensor,
+    ) -> tuple[torch.Tensor, torch.Tensor, list[int], list[int]]:
+        """Look up the needed sources (sorted keys) on the ranks owning them.
+
+        Returns:
+            Whether every needed source exists, the indices of the owned states each
+            peer needs in rank order, and the send and receive counts
+        """
+        device = self._plan_device
+        owners = torch.searchsorted(torch.tensor(previous_bounds), needed, right=True)
+        owners = owners - 1
+        request_counts = torch.bincount(owners, minlength=self.world_size)
+        peer_counts = torch.empty_like(request_counts, device=device)
+        dist.all_to_all_single(peer_counts, request_counts.to(device), group=self.group)
+        peer_counts = peer_counts.cpu()
+
+        # keys requested by every peer, looked up among the owned states
+        requested = torch.empty(int(peer_counts.sum().item()), dtype=torch.long)
+        requested = requested.to(device)
+        dist.all_to_all_single(
+            requested,
+            needed.to(device),
+            output_split_sizes=peer_counts.tolist(),
+            input_split_sizes=request_counts.tolist(),
+            group=self.group,
+        )
+        requested = requested.cpu()
+        if previous_keys.shape[0]:
+            positions = torch.searchsorted(previous_keys, requested)
+            positions = positions.clamp(max=previous_keys.shape[0] - 1)
+            found = previous_keys[positions] == requested
+        else:
+            positions = torch.zeros_like(requested)
+            found = torch.zeros_like(requested, dtype=torch.bool)
+        peers = torch.repeat_interleave(
+            torch.arange(self.world_size), peer_counts, output_size=requested.shape[0]
+        )
+        send_counts = torch.bincount(peers[found], minlength=self.world_size)
+
+        # answers, in the order of the requests
+        exists = torch.empty(needed.shape[0], dtype=torch.uint8, device=device)
+        dist.all_to_all_single(
+            exists,
+            found.to(device=device, dtype=torch.uint8),
+            output_split_sizes=request_counts.tolist(),
+            input_split_sizes=peer_counts.tolist(),
+            group=self.group,
+        )
+        exists = exists.cpu().bool()
+        recv_counts = torch.bincount(owners[exists], minlength=self.world_size)
+        return exists, positions[found], send_counts.tolist(), recv_counts.tolist()
+
+    def _plan_layer(
+        self,
+        layer: int,
+        states: torch.Tensor,
+        keys: torch.Tensor,
+        previous_bounds: list[int] | None,
+        previous_keys: torch.Tensor | None,
+    ) -> tuple[_LayerPlan, torch.Tensor, torch.Tensor]:
+        """Local operations of the rank and amplitude exchange for one layer.
+
+        Every operation adds a photon in a reachable mode of a source state: the
+        operations producing the local states are found by removing a photon from
+        them, and kept when their source exists on its owner. Local states produced
+        by no operation are dropped.
+
+        Returns:
+            The plan of the layer, and the occupations and keys of the states kept
+        """
+        modes = torch.tensor(self.photon_modes[layer], dtype=torch.long)
+        destinations, positions = (states[:, modes] > 0).nonzero(as_tuple=True)
+        operation_modes = modes[positions]
+
+        if previous_bounds is None:
+            # the initial state is replicated, no exchange needed
+            sources = torch.zeros_like(destinations)
+            send_indices = send_counts = recv_counts = None
+        else:
+            source_states = states[destinations]
+            source_states[torch.arange(destinations.shape[0]), operation_modes] -= 1
+            num_sources = math.comb(self.m + layer - 1, layer)
+            source_keys = num_sources - 1 - fock_state_rank(source_states, layer)
+            needed, inverse = torch.unique(source_keys, return_inverse=True)
+            exists, send_indices, send_counts, recv_counts = self._exchange_plan(
+                needed, previous_bounds, previous_keys
+            )
+            kept = exists[inverse]
+            # position of every existing source in the received buffer
+            sources = (exists.cumsum(0) - 1)[inverse[kept]]
+            destinations, operation_modes = destinations[kept], operation_modes[kept]
+
+        produced = torch.zeros(states.shape[0], dtype=torch.bool)
+        produced[destinations] = True
+        if self.output_map_func is not None and layer == self.n_photons - 1:
+            # drop the output states that the output map discards
+            produced &= torch.tensor(
+                [self.output_map_func(tuple(s)) is not None for s in states.tolist()],
+                dtype=torch.bool,
+            )
+            kept = produced[destinations]
+            sources, destinations = sources[kept], destinations[kept]
+            operation_modes = operation_modes[kept]
+        destinations = (produced.cumsum(0) - 1)[destinations]
+        states, keys = states[produced], keys[produced]
+
+        plan = _LayerPlan(
+            sources.to(self.device),
+            destinations.to(self.device),
+            operation_modes.to(self.device),
+            states.shape[0],
+            send_indices,
+            send_counts,
+            recv_counts,
+        )
+        return plan, states, keys
+
+    def _build_output_mapping(self, states: torch.Tensor):
+        """Mapped keys of every rank, merged in first-appearance order."""
+        mapped = [self.output_map_func(tuple(s)) for s in states.tolist()]
+        local_keys = list(dict.fromkeys(mapped))
+        indices: dict = {}
+        for rank_keys in self._all_gather_object(local_keys):
+            for key in rank_keys:
+                indices.setdefault(key, len(indices))
+        self.mapped_keys = list(indices)
+        self.total_mapped_keys = len(self.mapped_keys)
+        self.target_indices = torch.tensor(
+            [indices[key] for key in mapped], dtype=torch.long, device=self.device
+        )
+
+    def _build_click_mapping(self, states: torch.Tensor):
+        """Click patterns of every rank, merged in sorted order."""
+        patterns, inverse = torch.unique(
+            (states > 0).to(torch.long), dim=0, return_inverse=True
+        )
+        local_patterns = [tuple(pattern) for pattern in patterns.tolist()]
+        merged = sorted(set().union(*self._all_gather_object(local_patterns)))
+        indices = {pattern: index for index, pattern in enumerate(merged)}
+        self.mapped_keys = merged
+        self.total_mapped_keys = len(merged)
+        local_indices = torch.tensor(
+            [indices[pattern] for pattern in local_patterns], dtype=torch.long
+        )
+        self.target_indices = local_indices[inverse].to(self.device)
+
+    def compose_readout_indices(self, group_indices: torch.Tensor) -> torch.Tensor:
+        """
+        Compose an output grouping with the output mapping, for the local states.
+
+        Args:
+            group_indices (torch.Tensor): Bucket index of every entry of the gathered
+                distribution returned by ``compute`` (i.e. indexed like
+                ``mapped_keys``, or like ``final_keys`` without output mapping)
+
+        Returns:
+            torch.Tensor: Bucket index of every final Fock state of the rank, suitable
+                for the ``readout_indices`` argument of ``compute``
+        """
+        group_indices = group_indices.to(device=self.device, dtype=torch.long)
+        if self.has_output_mapping:
+            return group_indices[self.target_indices]
+        return group_indices[self.local_range[0] : self.local_range[1]]
+
+    def _prepare_inputs(
+        self, unitary: torch.Tensor, input_state: list[int]
+    ) -> tuple[torch.Tensor, bool, list[int]]:
+        """Validate the inputs of a computation, as ``SLOSComputeGraph`` does.
+
+        Returns:
+            The batched unitary, whether the input was batched, and the input mode of
+            every photon layer
+        """
+        is_batched = unitary.dim() == 3
+        if not is_batched:
+            unitary = unitary.unsqueeze(0)
+        idx_n, self.norm_factor_input = _photon_input_modes(
+            input_state, self.index_photons, self.no_bunching
+        )
+        if unitary.shape[1] != unitary.shape[2] or unitary.shape[1] != self.m:
+            raise ValueError(
+                f"Unitary matrix must be square with dimension {self.m}x{self.m}"
+            )
+        if unitary.dtype not in (self.complex_dtype, self.dtype):
+            raise ValueError(
+                f"Unitary dtype {unitary.dtype} doesn't match the expected complex "
+                f"dtype {self.complex_dtype} or float dtype {self.dtype} of the graph"
+            )
+        return unitary, is_batched, idx_n
+
+    def _exchange(self, amplitudes: torch.Tensor, plan: _LayerPlan) -> torch.Tensor:
+        """Source amplitudes of the local operations, received from their owners."""
+        is_complex = amplitudes.is_complex()
+        if is_complex:
+            amplitudes = torch.view_as_real(amplitudes)
+        # states first, as all_to_all_single splits the first dimension
+        send = amplitudes[:, plan.send_indices.to(amplitudes.device)]
+        send = send.transpose(0, 1).contiguous()
+        received = send.new_empty((sum(plan.recv_counts), *send.shape[1:]))
+        received = dist_fn.all_to_all_single(
+            received,
+            send,
+            output_split_sizes=plan.recv_counts,
+            input_split_sizes=plan.send_counts,
+            group=self.group,
+        ).transpose(0, 1)
+        if is_complex:
+            received = torch.view_as_complex(received.contiguous())
+        return received
+
+    def _all_reduce(self, tensor: torch.Tensor) -> torch.Tensor:
+        """Differentiable sum of a tensor over the ranks."""
+        return dist_fn.all_reduce(tensor, group=self.group)
+
+    def _all_gather(self, probabilities: torch.Tensor) -> torch.Tensor:
+        """Concatenation of the local probabilities of every rank."""
+        sizes = self.final_sizes
+        # all_gather requires equal shapes: pad to the largest range
+        padded = torch.nn.functional.pad(
+            probabilities, (0, max(sizes) - probabilities.shape[1])
+        )
+        gathered = dist_fn.all_gather(padded, group=self.group)
+        return torch.cat(
+            [part[:, :size] for part, size in zip(gathered, sizes, strict=True)],
+            dim=1,
+        )
+
+    def compute(
+        self,
+        unitary: torch.Tensor,
+        input_state: list[int],
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+        gather: bool = True,
+    ) -> tuple[Sequence[tuple[int, ...]] | None, torch.Tensor]:
+        """
+        Compute the probability distribution, distributed across the process group.
+
+        Args:
+            unitary (torch.Tensor): Single unitary matrix [m x m] or batch of unitaries
+                [b x m x m], identical on every rank, in the complex dtype of the graph
+                or, for real-orthogonal circuits, in its float dtype
+            input_state (list[int]): Input state of length m
+            readout_indices (torch.Tensor, optional): Bucket index of every final Fock
+                state of the rank, as returned by ``compose_readout_indices``. The
+                buckets are reduced across ranks.
+            readout_size (int, optional): Number of buckets, required with
+                ``readout_indices``
+            gather (bool): If False, the ungrouped distribution is not gathered and
+                each rank returns the probabilities of the final states in
+                ``local_range``
+
+        Returns:
+            Tuple[List[Tuple[int, ...]], torch.Tensor]:
+                - Output keys, as returned by ``SLOSComputeGraph.compute``, or None
+                  for a grouped or local readout
+                - Probability distribution tensor
+        """
+        if readout_indices is not None and readout_size is None:
+            raise ValueError("readout_size must be given along with readout_indices")
+
+        unitary, is_batched, idx_n = self._prepare_inputs(unitary, input_state)
+        amplitudes = torch.ones(
+            (unitary.shape[0], 1), dtype=unitary.dtype, device=unitary.device
+        )
+
+        for layer_idx, plan in enumerate(self.plans):
+            if plan.send_indices is not None:
+                amplitudes = self._exchange(amplitudes, plan)
+            if plan.sources.shape[0] == 0:
+                amplitudes = amplitudes.new_zeros((amplitudes.shape[0], 0))
+                continue
+            amplitudes = layer_compute_vectorized(
+                unitary,
+                amplitudes,
+                plan.sources,
+                plan.destinations,
+                plan.modes,
+                idx_n[layer_idx],
+            )
+
+        if amplitudes.is_complex():
+            probabilities = amplitudes.real**2 + amplitudes.imag**2
+        else:
+            probabilities = amplitudes.square()
+        probabilities = probabilities * self.norm_factor_output.to(probabilities.device)
+
+        keys: Sequence[tuple[int, ...]] | None = None
+        if readout_indices is None and self.has_output_mapping:
+            readout_indices = self.target_indices
+            readout_size = self.total_mapped_keys
+            keys = self.mapped_keys
+        elif readout_indices is None and gather:
+            keys = self.final_keys
+
+        if readout_indices is not None:
+            probabilities = probabilities.new_zeros((
+                probabilities.shape[0],
+                readout_size,
+            )).index_add_(1, readout_indices.to(probabilities.device), probabilities)
+            probabilities = self._all_reduce(probabilities)
+        elif gather:
+            probabilities = self._all_gather(probabilities)
+
+        if self.renormalize:
+            sum_probs = probabilities.sum(dim=1, keepdim=True)
+            if readout_indices is None and not gather:
+                sum_probs = self._all_reduce(sum_probs)
+            self.truncated_mass = (
+                1 - sum_probs.detach().squeeze(1) / self.norm_factor_input
+            ).clamp(min=0)
+            safe_sum = torch.where(sum_probs > 0, sum_probs, torch.ones_like(sum_probs))
+            probabilities = probabilities / safe_sum
+        else:
+            self.truncated_mass = None
+            probabilities = probabilities / self.norm_factor_input
+
+        probabilities = probabilities.to(self.dtype)
+        if not is_batched:
+            probabilities = probabilities.squeeze(0)
+        return keys, probabilities
@@ -0,0 +1,274 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Compact integer encoding of Fock states.
+
+A Fock state with ``n`` photons in ``m`` modes is identified by its combinatorial rank,
+its position in the lexicographic order of all such states. Ranks are computed and
+decoded with a table of binomial coefficients, vectorized over batches of states, so
+output keys can be stored as a single integer tensor instead of Python tuples.
+Perceval's Fock state arrays enumerate states by decreasing rank.
+"""
+
+from collections.abc import Sequence
+
+import perceval as pcvl
+import torch
+
+
+def _count_table(m: int, n_photons: int) -> torch.Tensor:
+    """Table ``T[r, k] = C(r + k, k)``: number of states of r photons in k + 1 modes."""
+    total = 1
+    rows = []
+    for r in range(n_photons + 1):
+        row = [1]
+        for k in range(1, m):
+            row.append(row[-1] * (r + k) // k)
+        rows.append(row)
+        total = row[-1]
+    if total >= 2**63:
+        raise ValueError(
+            f"The Fock space of {n_photons} photons in {m} modes is too large to rank"
+        )
+    return torch.tensor(rows, dtype=torch.long)
+
+
+def fock_state_rank(
+    states: torch.Tensor, n_photons: int, table: torch.Tensor | None = None
+) -> torch.Tensor:
+    """Lexicographic rank of Fock states among all states with ``n_photons`` photons.
+
+    Args:
+        states: Occupations of shape (..., m)
+        n_photons: Number of photons of the states
+        table: Optional precomputed table from ``_count_table``
+
+    Returns:
+        Ranks of shape (...); states that do not hold ``n_photons`` photons get rank -1
+    """
+    states = states.to(torch.long)
+    m = states.shape[-1]
+    if table is None:
+        table = _count_table(m, n_photons)
+    table = table.to(states.device)
+
+    valid = (states >= 0).all(dim=-1) & (states.sum(dim=-1) == n_photons)
+    states = torch.where(valid.unsqueeze(-1), states, torch.zeros_like(states))
+    states[..., 0] = torch.where(valid, states[..., 0], n_photons)
+
+    # photons left before every mode, and number of modes after it
+    remaining = n_photons - (states.cumsum(dim=-1) - states)
+    modes_after = torch.arange(m - 1, -1, -1, device=states.device).expand_as(states)
+    # states sharing the prefix with a smaller occupation in this mode (hockey stick)
+    smaller = table[remaining, modes_after] - table[remaining - states, modes_after]
+    return torch.where(valid, smaller.sum(dim=-1), -1)
+
+
+def fock_state_unrank(
+    ranks: torch.Tensor, m: int, n_photons: int, table: torch.Tensor | None = None
+) -> torch.Tensor:
+    """Fock states from their lexicographic ranks (inverse of ``fock_state_rank``).
+
+    Args:
+        ranks: Ranks of shape (...)
+        m: Number of modes
+        n_photons: Number of photons of the states
+        table: Optional precomputed table from ``_count_table``
+
+    Returns:
+        Occupations of shape (..., m)
+    """
+    if table is None:
+        table = _count_table(m, n_photons)
+    table = table.to(ranks.device)
+
+    shape = ranks.shape
+    offset = ranks.reshape(-1).to(torch.long)
+    remaining = torch.full_like(offset, n_photons)
+    occupations = torch.arange(n_photons + 1, device=ranks.device)
+    states = torch.zeros((offset.shape[0], m), dtype=torch.long, device=ranks.device)
+
+    for i in range(m - 1):
+        k = m - 1 - i
+        left = remaining.unsqueeze(-1) - occupations
+        smaller = table[remaining, k].unsqueeze(-1) - table[left.clamp(min=0), k]
+        fits = (smaller <= offset.unsqueeze(-1)) & (left >= 0)
+        occupation = fits.sum(dim=-1) - 1
+        offset = offset - (table[remaining, k] - table[remaining - occupation, k])
+        remaining = remaining - occupation
+        states[:, i] = occupation
+    states[:, m - 1] = remaining
+
+    return states.reshape(*shape, m)
+
+
+class FockStateKeys(Sequence):
+    """Read-only sequence of Fock states stored as a tensor of combinatorial ranks.
+
+    Behaves like the list of output state tuples (indexing, iteration, ``len``,
+    ``in``, ``index``) while storing 8 bytes per state. States are decoded lazily,
+    and ``state_to_index`` / ``index_to_state`` give vectorized lookups.
+
+    Args:
+        ranks: Rank of every state, in key order
+        m: Number of modes
+        n_photons: Number of photons of the states
+    """
+
+    _DECODE_CHUNK = 65536
+
+    def __init__(self, ranks: torch.Tensor, m: int, n_photons: int):
+        self.ranks = ranks.to(torch.long)
+        self.m = m
+        self.n_photons = n_photons
+        self._table = _count_table(m, n_photons)
+        self._sorted_ranks: torch.Tensor | None = None
+        self._sorted_order: torch.Tensor | None = None
+
+    @classmethod
+    def from_states(cls, states, m: int, n_photons: int) -> "FockStateKeys":
+        """Encode an iterable of Fock states (tuples or a tensor of shape (N, m))."""
+        if not isinstance(states, torch.Tensor):
+            states = torch.tensor(list(states), dtype=torch.long).reshape(-1, m)
+        ranks = fock_state_rank(states, n_photons, _count_table(m, n_photons))
+        return cls(ranks, m, n_photons)
+
+    def __len__(self) -> int:
+        return self.ranks.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            indices = torch.arange(len(self))[index]
+            return [tuple(state) for state in self.index_to_state(indices).tolist()]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Fock state key index out of range")
+        return tuple(self.index_to_state(torch.tensor(index)).tolist())
+
+    def __iter__(self):
+        for start in range(0, len(self), self._DECODE_CHUNK):
+            states = fock_state_unrank(
+                self.ranks[start : start + self._DECODE_CHUNK],
+                self.m,
+                self.n_photons,
+                self._table,
+            )
+            yield from (tuple(state) for state in states.tolist())
+
+    def __contains__(self, state) -> bool:
+        return len(state) == self.m and self.state_to_index(state).item() >= 0
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, FockStateKeys):
+            return self.m == other.m and torch.equal(self.ranks, other.ranks)
+        if isinstance(other, Sequence):
+            return len(self) == len(other) and list(self) == [tuple(s) for s in other]
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return (
+            f"FockStateKeys(m={self.m}, n_photons={self.n_photons}, size={len(self)})"
+        )
+
+    def index(self, state, start: int = 0, stop: int | None = None) -> int:
+        """Index of a state, as ``list.index``."""
+        idx = int(self.state_to_index(state).item()) if len(state) == self.m else -1
+        if idx < 0 or idx < start or (stop is not None and idx >= stop):
+            raise ValueError(f"{tuple(state)} is not in the keys")
+        return idx
+
+    def to(self, device) -> "FockStateKeys":
+        """Move the rank tensor to a device."""
+        self.ranks = self.ranks.to(device)
+        self._sorted_ranks = None
+        self._sorted_order = None
+        return self
+
+    def sort(self) -> tuple["FockStateKeys", torch.Tensor]:
+        """Sort the keys in perceval order, i.e. by decreasing rank.
+
+        Returns:
+            The sorted keys, and the key index of every sorted state
+        """
+        ranks, order = self.ranks.sort(descending=True)
+        return FockStateKeys(ranks, self.m, self.n_photons), order
+
+    def to_perceval(self) -> list[pcvl.BasicState]:
+        """The keys as perceval basic states."""
+        return [pcvl.BasicState(list(state)) for state in self]
+
+    def state_to_index(self, states) -> torch.Tensor:
+        """Key index of Fock states.
+
+        Args:
+            states: A state or states of shape (..., m), as a tensor or nested sequence
+
+        Returns:
+            Indices of shape (...), -1 for states that are not keys
+        """
+        states = torch.as_tensor(states, dtype=torch.long, device=self.ranks.device)
+        if self._sorted_ranks is None:
+            self._sorted_ranks, self._sorted_order = self.ranks.sort()
+        ranks = fock_state_rank(states, self.n_photons, self._table)
+        position = torch.searchsorted(self._sorted_ranks, ranks.reshape(-1))
+        position = position.clamp(max=max(len(self) - 1, 0)).reshape(ranks.shape)
+        if len(self) == 0:
+            return torch.full_like(ranks, -1)
+        found = (self._sorted_ranks[position] == ranks) & (ranks >= 0)
+        return torch.where(found, self._sorted_order[position], -1)
+
+    def index_to_state(self, indices) -> torch.Tensor:
+        """Fock states of key indices.
+
+        Args:
+            indices: Key indices of any shape
+
+        Returns:
+            Occupations of shape (..., m)
+        """
+        indices = torch.as_tensor(indices, dtype=torch.long, device=self.ranks.device)
+        return fock_state_unrank(
+            self.ranks[indices], self.m, self.n_photons, self._table
+        )
+
+
+def to_state_vector(keys: Sequence, amplitudes: torch.Tensor) -> pcvl.StateVector:
+    """Build a perceval state vector from output amplitudes.
+
+    Args:
+        keys: Output Fock states, indexed like ``amplitudes``
+        amplitudes: Complex amplitudes of shape (len(keys),)
+
+    Returns:
+        The state vector sum_k amplitudes[k] |keys[k]>
+    """
+    if amplitudes.dim() != 1 or amplitudes.shape[0] != len(keys):
+        raise ValueError(
+            f"Expected a single vector of {len(keys)} amplitudes, "
+            f"got shape {tuple(amplitudes.shape)}"
+        )
+    state_vector = pcvl.StateVector()
+    for state, amplitude in zip(keys, amplitudes.detach().cpu().tolist(), strict=True):
+        state_vector += complex(amplitude) * pcvl.BasicState(list(state))
+    return state_vector
@@ -0,0 +1,96 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Light-cone analysis of linear optical circuits.
+
+A photon entering a mode can only leave through the modes connected to it by the
+components that follow. Following the components in order gives, for every input mode,
+the set of output modes with possibly non-zero unitary coefficients; restricting every
+SLOS photon layer to these modes shrinks the graph without changing the distribution.
+"""
+
+import perceval as pcvl
+
+
+def mode_light_cones(circuit: pcvl.Circuit) -> list[frozenset[int]]:
+    """Output modes reachable from every input mode of a circuit.
+
+    Permutations are followed exactly; any other component is assumed to mix all the
+    modes it acts on.
+
+    Args:
+        circuit: Perceval circuit
+
+    Returns:
+        For every input mode, the set of output modes it may reach
+    """
+    cones = [{mode} for mode in range(circuit.m)]
+    for modes, component in circuit:
+        if isinstance(component, pcvl.PERM):
+            # input r of the permutation goes to output perm_vector[r]
+            moved = {
+                modes[r]: modes[target]
+                for r, target in enumerate(component.perm_vector)
+            }
+            for cone in cones:
+                reached = cone & moved.keys()
+                cone -= reached
+                cone |= {moved[mode] for mode in reached}
+        elif len(modes) > 1:
+            span = set(modes)
+            for cone in cones:
+                if not cone.isdisjoint(span):
+                    cone |= span
+    return [frozenset(cone) for cone in cones]
+
+
+def photon_light_cones(
+    circuit: pcvl.Circuit, input_states: list[list[int]]
+) -> list[tuple[int, ...]]:
+    """Modes every SLOS photon layer may reach.
+
+    Photons are assigned to layers in the order of their input modes, as in the SLOS
+    graph. With several input states (superpositions), the cones of every state are
+    merged layer by layer.
+
+    Args:
+        circuit: Perceval circuit
+        input_states: Input states sharing the same number of photons
+
+    Returns:
+        Sorted reachable modes of every photon layer
+    """
+    cones = mode_light_cones(circuit)
+    layers = None
+    for input_state in input_states:
+        photon_cones = [
+            cones[mode] for mode, count in enumerate(input_state) for _ in range(count)
+        ]
+        if layers is None:
+            layers = [set(cone) for cone in photon_cones]
+        elif len(photon_cones) != len(layers):
+            raise ValueError("Input states must have the same number of photons")
+        else:
+            for layer, cone in zip(layers, photon_cones, strict=True):
+                layer |= cone
+    return [tuple(sorted(layer)) for layer in layers or []]
@@ -22,6 +22,7 @@
 
 from __future__ import annotations
 
+import math
 import random
 
 import torch
@@ -48,6 +49,10 @@ Components:
     Barrier: Synchronization barrier (removed during compilation)
 """
 
+# Tolerance on the imaginary parts of a real-orthogonal circuit, in units of the
+# machine epsilon of the converter dtype
+_REAL_TOLERANCE_EPS = 10
+
 
 class CircuitConverter:
     """Convert a parameterized Perceval circuit into a differentiable PyTorch unitary matrix.
@@ -70,6 +75,7 @@ class CircuitConverter:
         device: PyTorch device for tensor operations
         tensor_cdtype: Complex tensor dtype
         tensor_fdtype: Float tensor dtype
+        is_real: Whether the circuit is real orthogonal (see ``to_tensor(real=True)``)
 
     Example:
         Basic usage with a single phase shifter:
@@ -190,17 +196,19 @@ class CircuitConverter:
                     )
 
         self.list_rct = self._compile_circuit()
+        self.real_list_rct = self._compile_real_circuit()
 
     def set_dtype(self, dtype: torch.dtype):
         """Set the tensor data types for float and complex operations.
 
         Args:
-            dtype: Target dtype (float32/complex64 or float64/complex128)
+            dtype: Target dtype (float32/complex64 or float64/complex128). Unitaries of
+                float16 and bfloat16 simulations are built in single precision.
 
         Raises:
             TypeError: If dtype is not supported
         """
-        if dtype == torch.float32 or dtype == torch.complex64:
+        if dtype in (torch.float32, torch.complex64, torch.float16, torch.bfloat16):
             self.tensor_fdtype = torch.float32
             self.tensor_cdtype = torch.complex64
         elif dtype == torch.float64 or dtype == torch.complex128:
@@ -208,15 +216,28 @@ class CircuitConverter:
             self.tensor_cdtype = torch.complex128
         else:
             raise TypeError(
-                f"Unsupported dtype {dtype}. Supported dtypes are torch.float32, torch.float64, "
-                f"torch.complex64, and torch.complex128."
+                f"Unsupported dtype {dtype}. Supported dtypes are torch.float16, "
+                "torch.bfloat16, torch.float32, torch.float64, torch.complex64, and "
+                "torch.complex128."
             )
 
+    def __getstate__(self) -> dict:
+        """State of the converter for pickling, e.g. to send it to worker processes.
+
+        Unitaries are built from the compiled components only, so the circuit, which
+        may hold unpicklable parameter factories, is replaced by an empty circuit with
+        the same number of modes.
+        """
+        state = self.__dict__.copy()
+        state["circuit"] = Circuit(self.circuit.m)
+        state.pop("torch_params", None)
+        return state
+
     def to(self, dtype: torch.dtype, device: str | torch.device):
         """Move the converter to a specific device and dtype.
 
         Args:
-            dtype: Target tensor dtype (float32/complex64 or float64/complex128)
+            dtype: Target tensor dtype (see ``set_dtype``)
             device: Target device (string or torch.device)
 
         Returns:
@@ -233,17 +254,6 @@ class CircuitConverter:
             raise TypeError(
                 f"Expected a string or torch.device, but got {type(device).__name__}"
             )
-        if dtype not in (
-            torch.float32,
-            torch.float64,
-            torch.complex64,
-            torch.complex128,
-        ):
-            raise TypeError(
-                f"Unsupported dtype {dtype}. Supported dtypes are torch.float32, torch.float64, "
-                f"torch.complex64, and torch.complex128."
-            )
-
         self.set_dtype(dtype)
 
         for idx, (r, c) in enumerate(self.list_rct):
@@ -252,6 +262,17 @@ class CircuitConverter:
                     r,
                     c.to(dtype=self.tensor_cdtype, device=self.device),
                 )
+        if self.real_list_rct is not None:
+            for idx, (r, c) in enumerate(self.real_list_rct):
+                if isinstance(c, torch.Tensor):
+                    c = c.to(dtype=self.tensor_fdtype, device=self.device)
+                else:
+                    param_index, signs = c
+                    c = (
+                        param_index,
+                        signs.to(dtype=self.tensor_fdtype, device=self.device),
+                    )
+                self.real_list_rct[idx] = (r, c)
 
         return self
 
@@ -339,23 +360,93 @@ class CircuitConverter:
         # Remove None entries from the list
         return [item for item in list_rct if item[1] is not None]
 
+    def _compile_real_circuit(self):
+        """Compile the real form of a real-orthogonal circuit.
+
+        A circuit is real orthogonal when its precompiled tensors are real and its
+        parameterized components are beam splitters of the Ry or H convention whose
+        phases are pinned to values giving real matrix elements (multiples of pi). Only
+        their angle theta varies, so that they are a rotation by theta/2 with fixed
+        signs.
+
+        Returns:
+            List of (mode_range, tensor_or_rotation) tuples, where rotations are
+            ((tensor_id, idx_in_tensor), signs) with the 2x2 signs of the rotation
+            elements, or None if the circuit is not real orthogonal
+        """
+        # precompiled tensors carry the rounding errors of the converter dtype, e.g. a
+        # fixed PS(pi) compiles to -1 - 8.7e-08j in complex64
+        tolerance = torch.finfo(self.tensor_fdtype).eps * _REAL_TOLERANCE_EPS
+        real_list_rct = []
+        for r, c in self.list_rct:
+            if isinstance(c, torch.Tensor):
+                if c.imag.abs().max() > tolerance:
+                    return None
+                real_list_rct.append((r, c.real.clone()))
+                continue
+            if not isinstance(c, BS) or c._convention not in (
+                BSConvention.Ry,
+                BSConvention.H,
+            ):
+                return None
+            theta, *phis = c.get_parameters(all_params=True)
+            if not theta.is_variable or any(phi.is_variable for phi in phis):
+                return None
+            phi_tl, phi_bl, phi_tr, phi_br = (float(phi) for phi in phis)
+            phases = [
+                [phi_tl + phi_tr, phi_tr + phi_bl],
+                [phi_tl + phi_br, phi_bl + phi_br],
+            ]
+            phase_errors = [abs(math.sin(phase)) for row in phases for phase in row]
+            if max(phase_errors) > tolerance:
+                return None
+            if c._convention == BSConvention.Ry:
+                base = [[1, -1], [1, 1]]
+            else:
+                base = [[1, 1], [1, -1]]
+            signs = torch.tensor(
+                [
+                    [base[i][j] * round(math.cos(phases[i][j])) for j in range(2)]
+                    for i in range(2)
+                ],
+                dtype=self.tensor_fdtype,
+                device=self.device,
+            )
+            real_list_rct.append((r, (self.param_mapping[theta.name], signs)))
+        return real_list_rct
+
+    @property
+    def is_real(self) -> bool:
+        """Whether the circuit is real orthogonal, so that its unitary can be built as a
+        real tensor."""
+        return self.real_list_rct is not None
+
     def to_tensor(
-        self, *input_params: torch.Tensor, batch_size: int | None = None
+        self,
+        *input_params: torch.Tensor,
+        batch_size: int | None = None,
+        real: bool = False,
     ) -> torch.Tensor:
         r"""Convert the parameterized circuit to a PyTorch unitary tensor.
 
         Args:
             \*input_params: Variable number of parameter tensors. Each tensor has shape (num_params,) or (batch_size, num_params) corresponding to input_specs order.
             batch_size: Explicit batch size. If None, inferred from input tensors.
+            real: If True, build the unitary of a real-orthogonal circuit (see
+                ``is_real``) as a real tensor of dtype ``tensor_fdtype``.
 
         Returns:
             Complex unitary tensor of shape (circuit.m, circuit.m) for single samples\
-                 or (batch_size, circuit.m, circuit.m) for batched inputs.
+                 or (batch_size, circuit.m, circuit.m) for batched inputs (real with
+                 ``real=True``).
 
         Raises:
-            ValueError: If wrong number of input tensors provided.
+            ValueError: If wrong number of input tensors provided, or if a real unitary
+                is requested for a circuit that is not real orthogonal.
             TypeError: If input_params is not a list or tuple.
         """
+        if real and not self.is_real:
+            raise ValueError("The circuit is not real orthogonal")
         if len(input_params) == 1 and isinstance(input_params[0], list):
             input_params = input_params[0]  # type: ignore[assignment]
         if len(input_params) != self.nb_input_tensor:
@@ -367,12 +458,18 @@ class CircuitConverter:
                 f"Expected a list of input tensors, but got {type(input_params).__name__}."
             )
 
-        self.torch_params = input_params
+        # low-precision parameters are promoted to the dtype of the unitary
+        self.torch_params = [
+            param.to(self.tensor_fdtype)
+            if param.dtype in (torch.float16, torch.bfloat16)
+            else param
+            for param in input_params
+        ]
 
         if batch_size is None:
-            if input_params and input_params[0].dim() > 1:
+            if self.torch_params and self.torch_params[0].dim() > 1:
                 has_batch = True
-                batch_size = input_params[0].shape[0]
+                batch_size = self.torch_params[0].shape[0]
             else:
                 has_batch = False
                 batch_size = 1
@@ -380,19 +477,22 @@ class CircuitConverter:
             has_batch = True
         self.batch_size = batch_size
 
+        dtype = self.tensor_fdtype if real else self.tensor_cdtype
         converted_tensor = (
-            torch.eye(self.circuit.m, dtype=self.tensor_cdtype, device=self.device)
+            torch.eye(self.circuit.m, dtype=dtype, device=self.device)
             .unsqueeze(0)
             .repeat(batch_size, 1, 1)
         )
         # Build unitary tensor by composing component unitaries
-        for r, c in self.list_rct:
+        for r, c in self.real_list_rct if real else self.list_rct:
             if isinstance(c, torch.Tensor):
                 # If the component is already a tensor, use it directly, just move it to the correct device and dtype
                 # and expand it to the batch size
-                curr_comp_tensor = c.to(
-                    dtype=self.tensor_cdtype, device=self.device
-                ).expand(batch_size, -1, -1)
+                curr_comp_tensor = c.to(dtype=dtype, device=self.device).expand(
+                    batch_size, -1, -1
+                )
+            elif real:
+                curr_comp_tensor = self._compute_rotation_tensor(*c)
             else:
                 curr_comp_tensor = self._compute_tensor(c)
 
@@ -408,6 +508,31 @@ class CircuitConverter:
 
         return converted_tensor
 
+    def _compute_rotation_tensor(
+        self, param_index: tuple[int, int], signs: torch.Tensor
+    ) -> torch.Tensor:
+        """Compute the real tensor of a beam splitter of a real-orthogonal circuit.
+
+        Args:
+            param_index: (tensor_id, idx_in_tensor) of the theta parameter
+            signs: Signs of the 2x2 rotation elements
+
+        Returns:
+            Batched 2x2 real tensor of shape (batch_size, 2, 2)
+        """
+        (tensor_id, idx_in_tensor) = param_index
+        half_theta = self.torch_params[tensor_id][..., idx_in_tensor] / 2
+        cos_theta = torch.cos(half_theta)
+        sin_theta = torch.sin(half_theta)
+        rotation = torch.stack(
+            (
+                torch.stack((cos_theta, sin_theta), dim=-1),
+                torch.stack((sin_theta, cos_theta), dim=-1),
+            ),
+            dim=-2,
+        )
+        return (rotation * signs).reshape(-1, 2, 2).expand(self.batch_size, -1, -1)
+
     @dispatch((Unitary, PERM))
     def _compute_tensor(self, comp: AComponent) -> torch.Tensor:
         """Compute tensor for Unitary and Permutation components.
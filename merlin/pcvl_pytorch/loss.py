@@ -0,0 +1,128 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Photon loss applied to simulated output distributions.
+
+Losing photons at the outputs of an interferometer with efficiency eta_i in mode i is
+equivalent to a beam splitter coupling every mode to a virtual loss mode, traced out
+after detection. Tracing out the loss modes turns the n-photon distribution into
+distributions over every lower photon number (binomial thinning of every mode), so all
+the photon-number sectors are obtained from a single n-photon simulation without
+doubling the number of modes. Uniform losses anywhere in the circuit commute with it.
+"""
+
+import torch
+
+from .fock_keys import FockStateKeys, _count_table, fock_state_rank
+
+
+class PhotonLossChannel:
+    """Linear map from an n-photon distribution to lossy photon-number sectors.
+
+    The map is built once for a set of n-photon states: every state is expanded into
+    all the states it can decay to, with vectorized index tensors, and the efficiencies
+    only enter the weights at application time (so they may be trainable).
+
+    Args:
+        keys: The n-photon states the distributions are defined on
+        sectors: Detected photon numbers to return, defaults to all of n, n-1, ..., 0
+    """
+
+    def __init__(self, keys: FockStateKeys, sectors: list[int] | None = None):
+        self.m = keys.m
+        self.n_photons = keys.n_photons
+        if sectors is None:
+            sectors = list(range(self.n_photons, -1, -1))
+        if any(not 0 <= k <= self.n_photons for k in sectors):
+            raise ValueError(f"Photon-number sectors must be in [0, {self.n_photons}]")
+        self.sectors = list(sectors)
+
+        full = keys.index_to_state(torch.arange(len(keys)))
+        # expand every state into its sub-states, one mode at a time
+        sources = torch.arange(full.shape[0])
+        kept = full.new_zeros((full.shape[0], 0))
+        for mode in range(self.m):
+            repeats = full[sources, mode] + 1
+            sources = torch.repeat_interleave(sources, repeats)
+            kept = torch.repeat_interleave(kept, repeats, dim=0)
+            starts = torch.cumsum(repeats, 0) - repeats
+            offsets = torch.arange(sources.shape[0]) - torch.repeat_interleave(
+                starts, repeats
+            )
+            kept = torch.cat([kept, offsets.unsqueeze(-1)], dim=-1)
+
+        detected = kept.sum(dim=-1)
+        self.keys = {}
+        self.transitions = {}
+        for k in self.sectors:
+            selected = detected == k
+            table = _count_table(self.m, k)
+            self.keys[k] = FockStateKeys(
+                torch.arange(int(table[k, self.m - 1])), self.m, k
+            )
+            self.transitions[k] = (
+                sources[selected],
+                fock_state_rank(kept[selected], k, table),
+                kept[selected],
+                full[sources[selected]] - kept[selected],
+            )
+
+    def __call__(
+        self, distribution: torch.Tensor, efficiency: float | torch.Tensor
+    ) -> dict[int, tuple[FockStateKeys, torch.Tensor]]:
+        """Apply the loss channel.
+
+        Args:
+            distribution: n-photon distribution [num_states] or [batch_size x num_states]
+            efficiency: Transmission of every mode, a float or a tensor of shape [m]
+
+        Returns:
+            For every sector k, the keys of the k-photon states and the probability of
+            detecting each of them ([num_k_states] or [batch_size x num_k_states])
+        """
+        efficiency = torch.as_tensor(
+            efficiency, dtype=distribution.dtype, device=distribution.device
+        ).expand(self.m)
+        sectors = {}
+        for k in self.sectors:
+            sources, destinations, kept, lost = (
+                t.to(distribution.device) for t in self.transitions[k]
+            )
+            # binomial thinning of every mode
+            weights = (
+                torch.lgamma(kept + lost + 1.0)
+                - torch.lgamma(kept + 1.0)
+                - torch.lgamma(lost + 1.0)
+            ).exp()
+            weights = (
+                weights * efficiency.pow(kept) * (1 - efficiency).pow(lost)
+            ).prod(dim=-1)
+            contributions = distribution[..., sources] * weights.to(distribution.dtype)
+            sectors[k] = (
+                self.keys[k],
+                distribution.new_zeros((
+                    *distribution.shape[:-1],
+                    len(self.keys[k]),
+                )).index_add_(-1, destinations, contributions),
+            )
+        return sectors
@@ -0,0 +1,219 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Marginal output distributions over a subset of watched modes.
+
+The marginal distribution of the watched modes does not change when any unitary acts
+on the unwatched output modes. The unwatched rows of the unitary, restricted to the p
+occupied input modes, span at most p dimensions: rotating the unwatched modes onto an
+orthonormal basis of that span leaves at most p of them coupled to the input, and the
+others never receive a photon. The SLOS simulation thus runs on w + min(m - w, p)
+modes whatever the size of the circuit, and every final state is folded into its
+watched pattern directly in the readout.
+"""
+
+import math
+
+import torch
+
+from .fock_keys import fock_state_rank, fock_state_unrank
+from .slos_torchscript import SLOSComputeGraph, _get_complex_dtype_for_float
+
+
+def compress_unwatched_modes(
+    unitary: torch.Tensor, input_state: list[int], watched_modes: list[int]
+) -> tuple[torch.Tensor, list[int]]:
+    """
+    Reduce a circuit to its watched modes plus the unwatched span of its input.
+
+    Args:
+        unitary (torch.Tensor): Unitary [m x m] or batch of unitaries [b x m x m]
+        input_state (list[int]): Input occupation of every mode
+        watched_modes (list[int]): Output modes of the marginal, in output order
+
+    Returns:
+        Tuple[torch.Tensor, list[int]]:
+            - Square transfer matrix [(b x) m' x m'] whose first len(watched_modes) rows
+              are the watched modes and whose first columns are the occupied inputs
+              (the other columns are zero)
+            - The input state of the reduced circuit
+    """
+    m = unitary.shape[-1]
+    occupied = [mode for mode, count in enumerate(input_state) if count > 0]
+    watched = unitary[..., watched_modes, :][..., occupied]
+    unwatched_modes = [mode for mode in range(m) if mode not in set(watched_modes)]
+    unwatched = unitary[..., unwatched_modes, :][..., occupied]
+
+    if len(unwatched_modes) > len(occupied):
+        # The marginal only depends on the Gram matrix of the unwatched rows, and
+        # projecting on their span preserves it to first order, so the basis is kept
+        # out of the autograd graph (QR is not differentiable for rank-deficient rows)
+        basis, _ = torch.linalg.qr(unwatched.detach())
+        unwatched = basis.mH @ unwatched
+
+    rows = torch.cat([watched, unwatched], dim=-2)
+    size = rows.shape[-2]
+    transfer = torch.nn.functional.pad(rows, (0, size - len(occupied)))
+    reduced_state = [input_state[mode] for mode in occupied]
+    reduced_state += [0] * (size - len(occupied))
+    return transfer, reduced_state
+
+
+class MarginalComputeGraph:
+    """
+    Compute the output distribution of a subset of modes without the full output space.
+
+    The marginal space holds every occupation pattern of the watched modes with at most
+    ``n_photons`` photons (the missing photons are in unwatched modes), indexed like
+    ``keys``. The reduced SLOS graphs only depend on the number of occupied input
+    modes and are built on first use.
+
+    Args:
+        m (int): Number of modes of the circuit
+        n_photons (int): Number of photons of the input states
+        watched_modes (list[int]): Output modes of the marginal, in output order
+        device: Optional device of the graphs
+        dtype: Floating point precision of the computation
+    """
+
+    def __init__(
+        self,
+        m: int,
+        n_photons: int,
+        watched_modes: list[int],
+        device=None,
+        dtype: torch.dtype = torch.float,
+    ):
+        if len(set(watched_modes)) != len(watched_modes) or any(
+            not 0 <= mode < m for mode in watched_modes
+        ):
+            raise ValueError(
+                f"watched_modes must be distinct modes in [0, {m - 1}], "
+                f"got {watched_modes}"
+            )
+        self.m = m
+        self.n_photons = n_photons
+        self.watched_modes = list(watched_modes)
+        self.device = device
+        self.dtype = dtype
+        self.complex_dtype = _get_complex_dtype_for_float(dtype)
+        self.truncated_mass = None
+
+        # watched patterns, completed by a slack mode holding the unwatched photons,
+        # are the n-photon states of w + 1 modes
+        width = len(self.watched_modes) + 1
+        self.size = math.comb(width + n_photons - 1, n_photons)
+        patterns = fock_state_unrank(torch.arange(self.size), width, n_photons)
+        self.keys = [tuple(pattern[:-1]) for pattern in patterns.tolist()]
+        self._graphs: dict[int, tuple[SLOSComputeGraph, torch.Tensor]] = {}
+
+    def _reduced_graph(self, m: int) -> tuple[SLOSComputeGraph, torch.Tensor]:
+        """SLOS graph of a reduced circuit of m modes, and the marginal index of every
+        final state."""
+        if m not in self._graphs:
+            graph = SLOSComputeGraph(
+                m,
+                self.n_photons,
+                no_bunching=False,
+                device=self.device,
+                dtype=self.dtype,
+            )
+            keys = graph.final_keys
+            states = keys.index_to_state(torch.arange(len(keys)))
+            watched = states[:, : len(self.watched_modes)]
+            slack = self.n_photons - watched.sum(dim=-1, keepdim=True)
+            patterns = torch.cat([watched, slack], dim=-1)
+            indices = fock_state_rank(patterns, self.n_photons)
+            self._graphs[m] = (graph, indices.to(self.device))
+        return self._graphs[m]
+
+    def compose_readout_indices(self, group_indices: torch.Tensor) -> torch.Tensor:
+        """
+        Compose an output grouping of the marginal space with the marginal readout.
+
+        Args:
+            group_indices (torch.Tensor): Bucket index of every pattern of ``keys``
+
+        Returns:
+            torch.Tensor: The same indices, composed with the reduced graph in
+                ``compute``
+        """
+        return group_indices.to(device=self.device, dtype=torch.long)
+
+    def compute(
+        self,
+        unitary: torch.Tensor,
+        input_state: list[int],
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+    ) -> tuple[list[tuple[int, ...]] | None, torch.Tensor]:
+        """
+        Compute the marginal distribution of the watched modes.
+
+        Args:
+            unitary (torch.Tensor): Unitary [m x m] or batch of unitaries [b x m x m]
+            input_state (list[int]): Input state of length m with ``n_photons`` photons
+            readout_indices (torch.Tensor, optional): Bucket index of every watched
+                pattern, to group the marginal in the same readout pass
+            readout_size (int, optional): Number of buckets, required with
+                ``readout_indices``
+
+        Returns:
+            Tuple[List[Tuple[int, ...]], torch.Tensor]:
+                - The watched patterns (None for a grouped readout)
+                - Marginal probability of every pattern
+        """
+        if readout_indices is not None and readout_size is None:
+            raise ValueError("readout_size must be given along with readout_indices")
+        if len(input_state) != self.m or sum(input_state) != self.n_photons:
+            raise ValueError(
+                f"Input state must have {self.m} modes and {self.n_photons} photons"
+            )
+        if unitary.dtype != self.complex_dtype:
+            raise ValueError(
+                f"Unitary dtype {unitary.dtype} doesn't match the expected complex "
+                f"dtype {self.complex_dtype}"
+            )
+
+        transfer, reduced_state = compress_unwatched_modes(
+            unitary, input_state, self.watched_modes
+        )
+        graph, indices = self._reduced_graph(transfer.shape[-1])
+        if readout_indices is None:
+            keys, size = self.keys, self.size
+        else:
+            keys, size = None, readout_size
+            indices = readout_indices.to(indices.device)[indices]
+        _, probabilities = graph.compute(transfer, reduced_state, indices, size)
+        return keys, probabilities
+
+    def to(self, dtype: torch.dtype, device) -> "MarginalComputeGraph":
+        """Move the marginal graph to another dtype and device."""
+        self.dtype = dtype
+        self.complex_dtype = _get_complex_dtype_for_float(dtype)
+        self.device = device
+        self._graphs = {
+            m: (graph.to(dtype, device), indices.to(device))
+            for m, (graph, indices) in self._graphs.items()
+        }
+        return self
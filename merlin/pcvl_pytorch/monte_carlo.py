@@ -0,0 +1,176 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Monte Carlo estimation of permanents and output probabilities.
+
+Glynn's formula is an expectation over random sign vectors: sampling the signs instead
+of enumerating the 2^(n-1) of them gives Gurvits' randomized estimator. For submatrices
+of a unitary its variance is at most 1 per sample, so the additive error on a
+permanent decreases as 1 / sqrt(samples) whatever the number of photons.
+"""
+
+import math
+
+import torch
+
+
+def _glynn_moments(
+    matrix: torch.Tensor,
+    samples: int,
+    generator: torch.Generator | None,
+    chunk_size: int,
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Sample mean and sample (co)variances of the real and imaginary parts of
+    Glynn's estimator, over the leading dimensions of ``matrix``."""
+    if samples < 2:
+        raise ValueError("At least 2 samples are needed to estimate a standard error")
+    n = matrix.shape[-1]
+    if not matrix.is_complex():
+        matrix = matrix.to(torch.promote_types(matrix.dtype, torch.complex64))
+    real_dtype = matrix.real.dtype
+
+    total = matrix.new_zeros(matrix.shape[:-2])
+    squares = torch.zeros(
+        (3, *matrix.shape[:-2]), dtype=real_dtype, device=matrix.device
+    )
+    # the estimator only depends on the sample through the rows, i.e. on M x
+    transposed = matrix.transpose(-1, -2)
+    for start in range(0, samples, chunk_size):
+        size = min(chunk_size, samples - start)
+        signs = torch.randint(
+            0, 2, (size, n), generator=generator, device=matrix.device
+        )
+        signs = (2 * signs - 1).to(real_dtype)
+        values = (signs.to(matrix.dtype) @ transposed).prod(dim=-1)
+        values = values * signs.prod(dim=-1)
+        total = total + values.sum(dim=-1)
+
+        values = values.detach()
+        squares[0] += values.real.square().sum(dim=-1)
+        squares[1] += values.imag.square().sum(dim=-1)
+        squares[2] += (values.real * values.imag).sum(dim=-1)
+
+    mean = total / samples
+    centered = mean.detach()
+    var_real = (squares[0] - samples * centered.real.square()) / (samples - 1)
+    var_imag = (squares[1] - samples * centered.imag.square()) / (samples - 1)
+    cov = (squares[2] - samples * centered.real * centered.imag) / (samples - 1)
+    return mean, var_real.clamp(min=0), var_imag.clamp(min=0), cov
+
+
+def estimate_permanent(
+    matrix: torch.Tensor,
+    samples: int = 10000,
+    generator: torch.Generator | None = None,
+    chunk_size: int = 1024,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Estimate the permanent of a batch of square matrices with Gurvits' algorithm.
+
+    Args:
+        matrix (torch.Tensor): Tensor of shape [..., n, n], real or complex
+        samples (int): Number of random sign vectors
+        generator (torch.Generator, optional): Random generator for reproducibility
+        chunk_size (int): Number of sign vectors processed at once
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor]:
+            - Unbiased estimates of the permanents [...], differentiable w.r.t. ``matrix``
+            - Standard errors of the estimates [...]
+    """
+    mean, var_real, var_imag, _ = _glynn_moments(matrix, samples, generator, chunk_size)
+    return mean, ((var_real + var_imag) / samples).sqrt()
+
+
+def estimate_output_probabilities(
+    unitary: torch.Tensor,
+    input_state: list[int],
+    output_states: list[tuple[int, ...]] | torch.Tensor,
+    samples: int = 10000,
+    generator: torch.Generator | None = None,
+    chunk_size: int = 1024,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Estimate output probabilities |Perm(U_st)|^2 / (s! t!) with Gurvits' estimator.
+
+    The square of the permanent estimate is corrected by its sample variance, so that the
+    probability estimates are unbiased (and may be slightly negative for tiny
+    probabilities). Standard errors are obtained with the delta method.
+
+    Args:
+        unitary (torch.Tensor): Unitary [m x m] or batch of unitaries [b x m x m]
+        input_state (list[int]): Input occupation of every mode
+        output_states: Output states of the same photon number [k x m]
+        samples (int): Number of random sign vectors per probability
+        generator (torch.Generator, optional): Random generator for reproducibility
+        chunk_size (int): Number of sign vectors processed at once
+
+    Returns:
+        Tuple[torch.Tensor, torch.Tensor]:
+            - Probability estimates [k] or [b x k], differentiable w.r.t. ``unitary``
+            - Standard errors [k] or [b x k]
+    """
+    m = unitary.shape[-1]
+    output_states = torch.as_tensor(output_states, dtype=torch.long).reshape(-1, m)
+    n_photons = sum(input_state)
+    if len(input_state) != m:
+        raise ValueError(f"Input state has {len(input_state)} modes, expected {m}")
+    if not torch.all(output_states.sum(dim=-1) == n_photons):
+        raise ValueError(f"Output states must hold {n_photons} photons")
+
+    input_modes = torch.tensor(
+        [mode for mode, count in enumerate(input_state) for _ in range(count)],
+        dtype=torch.long,
+    )
+    modes = torch.arange(m).expand_as(output_states)
+    output_modes = torch.repeat_interleave(
+        modes.reshape(-1), output_states.reshape(-1)
+    ).reshape(-1, n_photons)
+
+    submatrices = unitary[
+        ...,
+        output_modes.to(unitary.device).unsqueeze(-1),
+        input_modes.to(unitary.device),
+    ]
+    mean, var_real, var_imag, cov = _glynn_moments(
+        submatrices, samples, generator, chunk_size
+    )
+
+    input_norm = math.prod(math.factorial(count) for count in input_state)
+    norm = torch.lgamma(output_states.to(var_real.dtype) + 1).sum(dim=-1).exp()
+    norm = (norm * input_norm).to(unitary.device)
+
+    estimates = (mean.real.square() + mean.imag.square()) - (
+        var_real + var_imag
+    ) / samples
+    centered = mean.detach()
+    variance = (
+        4
+        * (
+            centered.real.square() * var_real
+            + centered.imag.square() * var_imag
+            + 2 * centered.real * centered.imag * cov
+        )
+        / samples
+    )
+    return estimates / norm, variance.clamp(min=0).sqrt() / norm
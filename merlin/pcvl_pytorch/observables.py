@@ -0,0 +1,90 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Mode-occupation observables of Fock input states.
+
+First and second moments of the output photon numbers only involve |U|^2 and 2x2
+permanents of the unitary, so they are computed in O(m^3) without enumerating the
+output space. For an input with occupations s:
+
+- <n_i> = sum_k |U_ik|^2 s_k
+- <n_i n_j> = <n_i><n_j> + |G_ij|^2 - sum_k (s_k^2 + s_k) |U_ik|^2 |U_jk|^2
+  + delta_ij <n_i>, with G = U diag(s) U^dagger.
+
+The moments are those of the full output state, without any post-selection.
+"""
+
+import torch
+
+
+def _input_occupations(unitary: torch.Tensor, input_state: list[int]) -> torch.Tensor:
+    if len(input_state) != unitary.shape[-1]:
+        raise ValueError(
+            f"Input state has {len(input_state)} modes, expected {unitary.shape[-1]}"
+        )
+    return torch.tensor(input_state, dtype=unitary.real.dtype, device=unitary.device)
+
+
+def mode_occupations(unitary: torch.Tensor, input_state: list[int]) -> torch.Tensor:
+    """
+    Mean photon number of every output mode.
+
+    Args:
+        unitary (torch.Tensor): Unitary [m x m] or batch of unitaries [b x m x m]
+        input_state (list[int]): Input occupation of every mode
+
+    Returns:
+        torch.Tensor: <n_i> of shape [m] or [b x m], differentiable w.r.t. ``unitary``
+    """
+    occupations = _input_occupations(unitary, input_state)
+    return (unitary.real.square() + unitary.imag.square()) @ occupations
+
+
+def mode_correlations(unitary: torch.Tensor, input_state: list[int]) -> torch.Tensor:
+    """
+    Second moments <n_i n_j> of the output photon numbers.
+
+    Args:
+        unitary (torch.Tensor): Unitary [m x m] or batch of unitaries [b x m x m]
+        input_state (list[int]): Input occupation of every mode
+
+    Returns:
+        torch.Tensor: <n_i n_j> of shape [m x m] or [b x m x m], differentiable w.r.t.
+            ``unitary``
+    """
+    occupations = _input_occupations(unitary, input_state)
+    intensities = unitary.real.square() + unitary.imag.square()
+    means = intensities @ occupations
+
+    # G_ij = sum_k s_k U_ik conj(U_jk): exchange terms of the 2x2 permanents
+    exchange = (unitary * occupations.to(unitary.dtype)) @ unitary.mH
+    # photons from the same input mode are counted once in both products
+    same_input = (intensities * (occupations.square() + occupations)) @ intensities.mT
+
+    correlations = (
+        means.unsqueeze(-1) * means.unsqueeze(-2)
+        + exchange.real.square()
+        + exchange.imag.square()
+        - same_input
+    )
+    return correlations + torch.diag_embed(means)
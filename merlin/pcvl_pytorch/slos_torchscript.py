@@ -29,24 +29,38 @@ The optimized implementation pre-builds the computation graph based on the input
 configuration, which can then be reused for multiple unitary evaluations.
 """
 
+import math
 import os
+import time
 from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 
 import torch
-import torch.jit as jit
+
+from .constraints import PhotonCountConstraint, _constraint_bounds
+from .fock_keys import FockStateKeys, _count_table, fock_state_rank
+from .loss import PhotonLossChannel
+
+# Dtypes whose amplitudes are stored as split real/imag tensors, accumulated in float32
+LOW_PRECISION_DTYPES = (torch.float16, torch.bfloat16)
 
 
 def _get_complex_dtype_for_float(dtype):
-    """Helper function to get the corresponding complex dtype for a float dtype."""
-    if dtype == torch.float16 and hasattr(torch, "complex32"):
-        return torch.complex32
+    """Helper function to get the corresponding complex dtype for a float dtype.
+
+    Low-precision graphs take single-precision unitaries: only their amplitudes are
+    stored in low precision.
+    """
+    if dtype in LOW_PRECISION_DTYPES:
+        return torch.cfloat
     elif dtype == torch.float:
         return torch.cfloat
     elif dtype == torch.float64:
         return torch.cdouble
     else:
         raise ValueError(
-            f"Unsupported dtype: {dtype}. Must be torch.float16, torch.float, or torch.float64"
+            f"Unsupported dtype: {dtype}. Must be torch.float16, torch.bfloat16, "
+            "torch.float, or torch.float64"
         )
 
 
@@ -153,6 +167,107 @@ def layer_compute_vectorized(
     return result
 
 
+def layer_compute_split(
+    unitary: torch.Tensor,
+    prev_amplitudes: torch.Tensor,
+    sources: torch.Tensor,
+    destinations: torch.Tensor,
+    modes: torch.Tensor,
+    p: int,
+) -> torch.Tensor:
+    """
+    Variant of ``layer_compute_vectorized`` on split real/imaginary amplitudes.
+
+    Amplitudes are stored as real and imaginary planes stacked on a leading dimension,
+    and the complex multiply-accumulate runs with real operations only. Planes may be
+    stored in float16 or bfloat16, products and the scatter accumulation then run in
+    the dtype of the unitary planes (float32).
+
+    Args:
+        unitary: Real and imaginary planes of the unitaries [2, batch_size, m, m]
+        prev_amplitudes: Previous layer amplitudes [2, batch_size, prev_size]
+        sources: Source indices for operations [num_ops]
+        destinations: Destination indices for operations [num_ops]
+        modes: Mode indices for operations [num_ops]
+        p: Photon index for this layer
+
+    Returns:
+        Next layer amplitudes [2, batch_size, next_size], in the dtype of the previous
+        amplitudes
+    """
+    if sources.shape[0] == 0:
+        return prev_amplitudes
+
+    batch_size = unitary.shape[1]
+    next_size = int(destinations.max().item()) + 1
+    u_elements = unitary[..., abs(p)].index_select(2, modes.to(unitary.device))
+    prev_amps = prev_amplitudes.index_select(2, sources.to(prev_amplitudes.device)).to(
+        u_elements.dtype
+    )
+
+    u_real, u_imag = u_elements
+    a_real, a_imag = prev_amps
+    contributions = torch.stack((
+        u_real * a_real - u_imag * a_imag,
+        u_real * a_imag + u_imag * a_real,
+    ))
+
+    # real and imaginary planes of every batch element are scattered as one 2D tensor
+    result = contributions.new_zeros((2 * batch_size, next_size))
+    result.index_add_(
+        1,
+        destinations.to(result.device),
+        contributions.view(2 * batch_size, -1),
+    )
+    return result.view(2, batch_size, next_size).to(prev_amplitudes.dtype)
+
+
+# Fastest layer kernel per (device type, dtype), measured once per process
+_SPLIT_KERNEL_IS_FASTER: dict[tuple[str, torch.dtype], bool] = {}
+
+
+def _split_kernel_is_faster(device: torch.device, complex_dtype: torch.dtype) -> bool:
+    """Time the complex and split layer kernels on a synthetic layer.
+
+    Complex scatters and products are poorly vectorized on some CPU builds, while
+    others are faster than the equivalent real operations: the kernel is chosen by
+    measurement, once per device type and dtype.
+    """
+    key = (device.type, complex_dtype)
+    if key not in _SPLIT_KERNEL_IS_FASTER:
+        generator = torch.Generator().manual_seed(0)
+        batch_size, m, prev_size, next_size, num_ops = 16, 12, 2048, 4096, 16384
+        unitary = torch.randn(
+            (batch_size, m, m), generator=generator, dtype=complex_dtype
+        ).to(device)
+        prev = torch.randn(
+            (batch_size, prev_size), generator=generator, dtype=complex_dtype
+        ).to(device)
+        sources = torch.randint(prev_size, (num_ops,), generator=generator).to(device)
+        destinations = torch.randint(next_size, (num_ops,), generator=generator)
+        destinations[-1] = next_size - 1
+        destinations = destinations.to(device)
+        modes = torch.randint(m, (num_ops,), generator=generator).to(device)
+        split_unitary = torch.stack((unitary.real, unitary.imag))
+        split_prev = torch.stack((prev.real, prev.imag))
+
+        def timing(kernel, u, amplitudes):
+            kernel(u, amplitudes, sources, destinations, modes, 0)  # warm-up
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            start = time.perf_counter()
+            for _ in range(3):
+                kernel(u, amplitudes, sources, destinations, modes, 0)
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            return time.perf_counter() - start
+
+        _SPLIT_KERNEL_IS_FASTER[key] = timing(
+            layer_compute_split, split_unitary, split_prev
+        ) < timing(layer_compute_vectorized, unitary, prev)
+    return _SPLIT_KERNEL_IS_FASTER[key]
+
+
 def layer_compute_backward(
     unitary: torch.Tensor,
     sources: torch.Tensor,
@@ -202,6 +317,165 @@ def layer_compute_backward(
     return inverts
 
 
+# Minimum number of operations of a layer for it to be partitioned across threads
+_PARALLEL_MIN_OPS = 1 << 15
+
+# Persistent thread pools, shared by the graphs using the same number of threads
+_THREAD_POOLS: dict[int, ThreadPoolExecutor] = {}
+
+
+def _thread_pool(num_threads: int) -> ThreadPoolExecutor:
+    """Get the persistent thread pool of ``num_threads`` workers."""
+    pool = _THREAD_POOLS.get(num_threads)
+    if pool is None:
+        pool = ThreadPoolExecutor(num_threads, thread_name_prefix="slos")
+        _THREAD_POOLS[num_threads] = pool
+    return pool
+
+
+def partition_layer(
+    sources: torch.Tensor,
+    destinations: torch.Tensor,
+    modes: torch.Tensor,
+    num_chunks: int,
+) -> list[tuple[torch.Tensor, torch.Tensor, torch.Tensor]]:
+    """
+    Partition the operations of a layer into contiguous ranges of destination states.
+
+    Every chunk computes its own slice of the next layer, so that chunks are
+    independent and their results are concatenated in order. Ranges are chosen to
+    balance the number of operations of the chunks.
+
+    Args:
+        sources: Source indices of the operations [num_ops]
+        destinations: Destination indices of the operations [num_ops]
+        modes: Mode indices of the operations [num_ops]
+        num_chunks: Maximum number of chunks
+
+    Returns:
+        List of (sources, destinations, modes) of every chunk, with destinations
+        relative to the first destination of the chunk
+    """
+    order = torch.argsort(destinations, stable=True)
+    sources, destinations, modes = sources[order], destinations[order], modes[order]
+    num_ops = destinations.shape[0]
+    # first destination of every chunk, at evenly spaced operations
+    cuts = torch.arange(1, num_chunks) * num_ops // num_chunks
+    bounds = torch.unique(destinations[cuts])
+    bounds = bounds[bounds > 0]
+    splits = torch.searchsorted(destinations, bounds).tolist()
+    starts = [0, *bounds.tolist()]
+
+    chunks = []
+    for start, begin, end in zip(starts, [0, *splits], [*splits, num_ops], strict=True):
+        chunks.append((
+            sources[begin:end],
+            destinations[begin:end] - start,
+            modes[begin:end],
+        ))
+    return chunks
+
+
+def _chunked_ranks(
+    states: torch.Tensor, n_photons: int, chunk_size: int = 1 << 16
+) -> torch.Tensor:
+    """Combinatorial ranks of states, computed by chunks to bound the memory of the
+    intermediate tensors."""
+    table = _count_table(states.shape[-1], n_photons)
+    ranks = torch.empty(states.shape[0], dtype=torch.long)
+    for start in range(0, states.shape[0], chunk_size):
+        ranks[start : start + chunk_size] = fock_state_rank(
+            states[start : start + chunk_size], n_photons, table
+        )
+    return ranks
+
+
+def _merge_by_rank(ranks: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """Merge candidate states with equal ranks, in order of first appearance.
+
+    Args:
+        ranks: Rank of every candidate state [num_candidates]
+
+    Returns:
+        The index of the merged state of every candidate, and the first candidate of
+        every merged state
+    """
+    unique, inverse = torch.unique(ranks, return_inverse=True)
+    first = torch.full_like(unique, ranks.shape[0]).scatter_reduce_(
+        0, inverse, torch.arange(ranks.shape[0]), reduce="amin"
+    )
+    first, order = first.sort()
+    position = torch.empty_like(order)
+    position[order] = torch.arange(order.shape[0])
+    return position[inverse], first
+
+
+def _photon_input_modes(
+    input_state: list[int],
+    index_photons: list[tuple[int, ...]],
+    no_bunching: bool,
+) -> tuple[list[int], int]:
+    """Validate an input state against the photon bounds of a graph.
+
+    Returns:
+        The input mode of every photon layer, and the Fock normalization of the input
+        state
+    """
+    if any(n < 0 for n in input_state) or sum(input_state) == 0:
+        raise ValueError("Photon numbers cannot be negative or all zeros")
+
+    if no_bunching and not all(x in [0, 1] for x in input_state):
+        raise ValueError(
+            "Input state must be binary (0s and 1s only) in non-bunching mode"
+        )
+
+    idx_n: list[int] = []
+    norm_factor_input = 1
+    for i, count in enumerate(input_state):
+        for c in range(count):
+            norm_factor_input *= c + 1
+            idx_n.append(i)
+            if (i > index_photons[len(idx_n) - 1][1]) or (
+                i < index_photons[len(idx_n) - 1][0]
+            ):
+                raise ValueError(
+                    f"Input state photons must be bounded by {index_photons}"
+                )
+    return idx_n, norm_factor_input
+
+
+def _reachable_states(
+    states: torch.Tensor,
+    constraints: list[PhotonCountConstraint],
+    bounds: list[tuple[int, int]],
+    no_bunching: bool,
+    occupation_caps: list[int] | None,
+) -> torch.Tensor:
+    """Mask of the partial states that can still satisfy every constraint, given
+    the bounds of ``_constraint_bounds`` for their layer."""
+    reachable = torch.ones(states.shape[0], dtype=torch.bool, device=states.device)
+    for constraint, (min_added, layers_in_group) in zip(
+        constraints, bounds, strict=True
+    ):
+        group = list(constraint.modes)
+        count = states[:, group].to(torch.long).sum(dim=-1)
+        # modes of the group can only hold so many more photons
+        max_added = torch.full_like(count, layers_in_group)
+        if no_bunching:
+            max_added = torch.minimum(max_added, len(group) - count)
+        elif occupation_caps is not None:
+            capacity = sum(occupation_caps[mode] for mode in group)
+            max_added = torch.minimum(max_added, capacity - count)
+        reachable &= constraint.is_reachable(count, min_added, max_added)
+    return reachable
+
+
+def _restored_output_map(state: tuple[int, ...]) -> tuple[int, ...]:
+    """Placeholder output map of restored graphs, whose mapping is already held by
+    ``mapped_indices`` and ``target_indices``."""
+    return state
+
+
 class SLOSComputeGraph:
     """
     A class that builds and stores the computation graph for SLOS algorithm.
@@ -220,6 +494,12 @@ class SLOSComputeGraph:
         device=None,  # Optional device parameter
         dtype: torch.dtype = torch.float,  # Optional dtype parameter
         index_photons: list[tuple[int, ...]] = None,
+        threshold_detection: bool = False,
+        max_occupation: int | list[int] | None = None,
+        constraints: list[PhotonCountConstraint] | None = None,
+        photon_modes: list[list[int]] | None = None,
+        kernel: str = "auto",
+        num_threads: int = 1,
     ):
         """
         Initialize the SLOS computation graph.
@@ -232,10 +512,32 @@ class SLOSComputeGraph:
             keep_keys (bool): If True, output state keys are returned
             device: Optional device to place tensors on (CPU, CUDA, etc.)
             dtype: Data type precision for floating point calculations (default: torch.float)
-                  Use torch.float16 for half precision, torch.float for single precision,
-                  or torch.float64 for double precision
+                  Use torch.float16 or torch.bfloat16 for low precision, torch.float for single
+                  precision, or torch.float64 for double precision. Low-precision graphs take
+                  complex64 unitaries and store amplitudes as split real/imag tensors, with
+                  float32 accumulation; distributions are returned in the low-precision dtype
             index_photons: List of tuples (first_integer, second_integer). The first_integer is the
                   lowest index layer a photon can take and the second_integer is the highest index
+            threshold_detection (bool): If True, outputs are click patterns of non photon-number
+                  resolving detectors (1 where a mode holds at least one photon)
+            max_occupation (int or list[int], optional): Maximum number of photons in every mode
+                  (or in each mode, for a list). States above the cap are pruned during the graph
+                  construction; the distribution is renormalized and the pruned probability is
+                  reported in ``truncated_mass``
+            constraints (list[PhotonCountConstraint], optional): Post-selection constraints
+                  (heralds, photon counts or parities of mode groups). Partial states that
+                  cannot satisfy them are pruned at every layer, and the distribution is
+                  renormalized over the accepted outputs
+            photon_modes (list[list[int]], optional): Modes every photon layer may reach, e.g.
+                  the light cones of the circuit (see ``photon_light_cones``). Unlike
+                  ``index_photons``, these need not be contiguous; both can be combined
+            kernel (str): Layer kernel, "complex" for complex amplitudes, "split" for split
+                  real/imaginary amplitudes computed with real operations, or "auto" to use the
+                  fastest one on the device of the unitary (measured once per device and dtype).
+                  Low-precision graphs always use the split kernel
+            num_threads (int): Number of CPU threads a single computation runs on. Large
+                  layers are partitioned into ranges of destination states when the graph
+                  is built, and the ranges run in parallel on a persistent thread pool
 
         """
         self.m = m
@@ -243,25 +545,60 @@ class SLOSComputeGraph:
         self.output_map_func = output_map_func
         self.no_bunching = no_bunching
         self.keep_keys = keep_keys
+        self.threshold_detection = threshold_detection
+        self.max_occupation = max_occupation
+        if max_occupation is None:
+            self.occupation_caps = None
+        elif isinstance(max_occupation, int):
+            self.occupation_caps = [max_occupation] * m
+        elif len(max_occupation) == m:
+            self.occupation_caps = list(max_occupation)
+        else:
+            raise ValueError(
+                f"max_occupation must be an int or a list of {m} ints, got {max_occupation}"
+            )
+        self.constraints = list(constraints) if constraints else None
+        # Probability of the outputs the graph does not enumerate, set by every computation
+        self.truncated_mass = None
+        if threshold_detection and output_map_func is not None:
+            raise ValueError(
+                "threshold_detection and output_map_func cannot be used together"
+            )
+        if kernel not in ("auto", "complex", "split"):
+            raise ValueError(
+                f"kernel must be 'auto', 'complex' or 'split', got {kernel!r}"
+            )
+        self.kernel = kernel
+        if not isinstance(num_threads, int) or num_threads < 1:
+            raise ValueError(
+                f"num_threads must be a positive integer, got {num_threads}"
+            )
+        self.num_threads = num_threads
         self.device = device
         self.prev_amplitudes = None
-        self.dtype = dtype
+        self._set_dtype(dtype)
         self.ct_inverts = None
+        self._loss_channels: dict[tuple[int, ...] | None, PhotonLossChannel] = {}
+        # final keys in perceval order, and the key index of every sorted state
+        self._perceval_keys: tuple[FockStateKeys, torch.Tensor] | None = None
 
         if index_photons is None:
             index_photons = [(0, self.m - 1)] * self.n_photons
             self.reduced_outputs = True
         self.index_photons = index_photons
-
-        # Determine corresponding complex dtype using helper function
-        try:
-            self.complex_dtype = _get_complex_dtype_for_float(dtype)
-        except ValueError:
-            raise ValueError(
-                f"Unsupported dtype: {dtype}. Must be torch.float16, torch.float, or torch.float64"
-            )
-
-        # Check input validity
+        # modes every photon layer may reach
+        self.photon_modes = [tuple(range(low, high + 1)) for low, high in index_photons]
+        if photon_modes is not None:
+            if len(photon_modes) != self.n_photons:
+                raise ValueError(
+                    f"photon_modes must give the modes of {self.n_photons} photons"
+                )
+            self.photon_modes = [
+                tuple(mode for mode in modes if mode in reachable)
+                for modes, reachable in zip(
+                    self.photon_modes, map(set, photon_modes), strict=True
+                )
+            ]
 
         # Pre-compute layer structures and operation sequences
         self._build_graph_structure()
@@ -269,69 +606,156 @@ class SLOSComputeGraph:
         # Create TorchScript function for the core computation
         self._create_torchscript_modules()
 
+    def _set_dtype(self, dtype: torch.dtype):
+        """Set the float dtype of the distributions and the dtypes derived from it."""
+        self.complex_dtype = _get_complex_dtype_for_float(dtype)
+        self.dtype = dtype
+        self.low_precision = dtype in LOW_PRECISION_DTYPES
+        # normalization factors (up to n!) and accumulations stay in float32
+        self.accumulate_dtype = torch.float32 if self.low_precision else dtype
+
+    def _uses_split_kernel(self, device: torch.device) -> bool:
+        """Whether amplitudes on this device are computed with the split kernel."""
+        if self.low_precision or self.kernel == "split":
+            return True
+        if self.kernel == "complex":
+            return False
+        return _split_kernel_is_faster(torch.device(device), self.complex_dtype)
+
+    def _layer_inputs(
+        self, unitary: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor, list]:
+        """Initial amplitudes, kernel unitary and layer functions of a computation.
+
+        Real unitaries (real-orthogonal circuits) propagate real amplitudes with the
+        complex kernel, which then only runs real operations. Complex unitaries
+        propagate complex amplitudes [b x 1], or split amplitudes [2 x b x 1] with the
+        split kernel.
+        """
+        batch_size, device = unitary.shape[0], unitary.device
+        if not unitary.is_complex():
+            amplitudes = torch.ones((batch_size, 1), dtype=self.dtype, device=device)
+            return amplitudes, unitary, self.layer_functions
+        if self._uses_split_kernel(device):
+            amplitudes = torch.zeros(
+                (2, batch_size, 1), dtype=self.dtype, device=device
+            )
+            amplitudes[0] = 1
+            split_unitary = torch.stack((unitary.real, unitary.imag))
+            return amplitudes, split_unitary, self.split_layer_functions
+        amplitudes = torch.ones(
+            (batch_size, 1), dtype=self.complex_dtype, device=device
+        )
+        return amplitudes, unitary, self.layer_functions
+
+    def _squared_moduli(self, amplitudes: torch.Tensor) -> torch.Tensor:
+        """|amplitude|^2 of complex, split or real amplitudes, in the accumulation
+        dtype."""
+        if amplitudes.is_complex():
+            return amplitudes.real**2 + amplitudes.imag**2
+        amplitudes = amplitudes.to(self.accumulate_dtype).square()
+        return amplitudes.sum(dim=0) if amplitudes.dim() == 3 else amplitudes
+
+    def _as_complex(self, amplitudes: torch.Tensor) -> torch.Tensor:
+        """Complex amplitudes from complex, split or real amplitudes."""
+        if amplitudes.is_complex():
+            return amplitudes
+        amplitudes = amplitudes.to(self.accumulate_dtype)
+        if amplitudes.dim() == 3:
+            return torch.complex(amplitudes[0], amplitudes[1])
+        return torch.complex(amplitudes, torch.zeros_like(amplitudes))
+
     def _build_graph_structure(self):
-        """Build the graph structure using dictionary for fast state lookups."""
-        list_operations = []  # Operations to perform at each layer
-        self.vectorized_operations = []  # the same, vectorized
+        """Build the graph structure layer by layer, with states stored as tensors.
+
+        The states of a layer are kept as an occupation matrix and identified by their
+        combinatorial rank, so that no Python object is created per state or per
+        operation. Candidate states (every state of the previous layer plus one photon
+        in every reachable mode) are merged by rank, in order of first appearance.
+        """
+        self.vectorized_operations = []
+        # Fock normalization of the states of every intermediate layer
+        self.layer_norm_factors = []
 
         # Initial state is all zeros
-        last_combinations = {tuple([0] * self.m): (1, 0)}
+        occupation_dtype = torch.uint8 if self.n_photons < 256 else torch.int16
+        states = torch.zeros((1, self.m), dtype=occupation_dtype)
+        norm_factors = torch.ones(1, dtype=torch.float64)
+        if self.constraints:
+            constraint_bounds = _constraint_bounds(self.constraints, self.photon_modes)
 
-        # For each photon/layer, compute the state combinations and operations
         for idx in range(self.n_photons):
-            combinations = {}
-            operations = []  # [src_state_idx, dest_idx, mode_i]
-
-            for state, (norm_factor, src_state_idx) in last_combinations.items():
-                nstate = list(state)
-                # iterate on the possible values for every photon
-                for i in range(
-                    self.index_photons[idx][0], self.index_photons[idx][1] + 1
-                ):
-                    if nstate[i] and self.no_bunching:
-                        continue
-
-                    nstate[i] += 1
-                    nstate_tuple = tuple(nstate)
-
-                    # consider the state if we don't have output map or we are not at the last layer or
-                    # the output map is preserving the state
-                    if (
-                        not (self.output_map_func)
-                        or idx < self.n_photons - 1
-                        or self.output_map_func(nstate) is not None
-                    ):
-                        dest_idx = combinations.get(nstate_tuple, None)
-                        if dest_idx is None:
-                            dest_idx = combinations[nstate_tuple] = (
-                                norm_factor * nstate[i],
-                                len(combinations),
-                            )
-                        # Record the operation: [src_state_idx, dest_idx, mode_i]
-                        operations.append([src_state_idx, dest_idx[1], i])
-
-                    nstate[i] -= 1
-
-            list_operations.append(operations)
-            last_combinations = combinations
-
-        # For each layer, prepare vectorized operations on the specified device
-        for ops in list_operations:
-            sources, destinations, modes = prepare_vectorized_operations(
-                ops, device=self.device
-            )
-            self.vectorized_operations.append((sources, destinations, modes))
-
-        # Store only the final layer combinations if needed for output mapping or keys
+            modes = torch.tensor(self.photon_modes[idx], dtype=torch.long)
+            # candidate operations, by source state then mode [num_states x num_modes]
+            occupations = states[:, modes].to(torch.long)
+            valid = torch.ones_like(occupations, dtype=torch.bool)
+            if self.no_bunching:
+                valid &= occupations == 0
+            if self.occupation_caps is not None:
+                caps = torch.tensor(self.occupation_caps, dtype=torch.long)
+                valid &= occupations < caps[modes]
+            sources, mode_positions = valid.nonzero(as_tuple=True)
+            operation_modes = modes[mode_positions]
+            candidates = states[sources]
+            candidates[torch.arange(sources.shape[0]), operation_modes] += 1
+
+            if self.constraints:
+                reachable = _reachable_states(
+                    candidates,
+                    self.constraints,
+                    constraint_bounds[idx],
+                    self.no_bunching,
+                    self.occupation_caps,
+                )
+                sources, operation_modes = (
+                    sources[reachable],
+                    operation_modes[reachable],
+                )
+                candidates = candidates[reachable]
+
+            ranks = _chunked_ranks(candidates, idx + 1)
+            destinations, first = _merge_by_rank(ranks)
+
+            if self.output_map_func is not None and idx == self.n_photons - 1:
+                # drop the output states that the output map discards
+                kept = torch.tensor(
+                    [
+                        self.output_map_func(state) is not None
+                        for state in candidates[first].tolist()
+                    ],
+                    dtype=torch.bool,
+                )
+                kept = kept[destinations]
+                sources, operation_modes = sources[kept], operation_modes[kept]
+                candidates, ranks = candidates[kept], ranks[kept]
+                destinations, first = _merge_by_rank(ranks)
+
+            norm_factors = norm_factors[sources[first]] * candidates[
+                first, operation_modes[first]
+            ].to(torch.float64)
+            states = candidates[first]
+            ranks = ranks[first]
+            self.vectorized_operations.append((
+                sources.to(self.device),
+                destinations.to(self.device),
+                operation_modes.to(self.device),
+            ))
+            if idx < self.n_photons - 1:
+                self.layer_norm_factors.append(norm_factors.to(self.accumulate_dtype))
+            del candidates
+
+        if states.shape[0] == 0:
+            raise ValueError("No output state satisfies the graph constraints")
+
+        # Store the final states if needed for output mapping or keys, packed as
+        # combinatorial ranks
         self.final_keys = (
-            list(last_combinations.keys())
-            if self.keep_keys or self.output_map_func
+            FockStateKeys(ranks, self.m, self.n_photons)
+            if self.keep_keys or self.has_output_mapping
             else None
         )
-        self.norm_factor_output = torch.tensor(
-            [v[0] for v in last_combinations.values()], dtype=self.dtype
-        )
-        del last_combinations
+        self.norm_factor_output = norm_factors.to(self.accumulate_dtype)
+        del states
 
         if self.output_map_func is not None:
             self.mapped_keys = []
@@ -356,14 +780,77 @@ class SLOSComputeGraph:
 
             # Clean up temporary dictionaries
             del mapping_indices
+        elif self.threshold_detection:
+            self._build_click_mapping()
         else:
             self.mapped_keys = self.final_keys
             self.total_mapped_keys = self.keep_keys and len(self.final_keys) or 0
 
+    @property
+    def has_output_mapping(self) -> bool:
+        """Whether final states are reduced to mapped keys (``target_indices``)."""
+        return self.output_map_func is not None or self.threshold_detection
+
+    def _build_click_mapping(self):
+        """Map every final state to its threshold-detector click pattern, vectorially."""
+        states = self.final_keys.index_to_state(torch.arange(len(self.final_keys)))
+        patterns, target_indices = torch.unique(
+            (states > 0).to(torch.long), dim=0, return_inverse=True
+        )
+        self.mapped_keys = [tuple(pattern) for pattern in patterns.tolist()]
+        self.mapped_indices = target_indices.tolist()
+        self.total_mapped_keys = len(self.mapped_keys)
+        self.target_indices = target_indices.to(self.device)
+
+    def state_to_index(self, states) -> torch.Tensor:
+        """Output index of Fock states, before any output mapping.
+
+        Args:
+            states: A Fock state or states of shape (..., m)
+
+        Returns:
+            Indices of shape (...), -1 for states that are not outputs of the graph
+        """
+        if self.final_keys is None:
+            raise ValueError("Output keys are not kept by this graph (keep_keys=False)")
+        return self.final_keys.state_to_index(states)
+
+    def index_to_state(self, indices) -> torch.Tensor:
+        """Fock states of output indices, before any output mapping.
+
+        Args:
+            indices: Output indices of any shape
+
+        Returns:
+            Occupations of shape (..., m)
+        """
+        if self.final_keys is None:
+            raise ValueError("Output keys are not kept by this graph (keep_keys=False)")
+        return self.final_keys.index_to_state(indices)
+
+    def set_num_threads(self, num_threads: int):
+        """Set the number of CPU threads of a computation, and partition the layers
+        accordingly.
+
+        Args:
+            num_threads (int): Number of threads, 1 to run every layer in one piece
+        """
+        if not isinstance(num_threads, int) or num_threads < 1:
+            raise ValueError(
+                f"num_threads must be a positive integer, got {num_threads}"
+            )
+        self.num_threads = num_threads
+        self._create_torchscript_modules()
+
     def _create_torchscript_modules(self):
         """Create TorchScript modules for different parts of the computation."""
         # Create layer computation functions
         self.layer_functions = []
+        self.split_layer_functions = []
+        parallel = (
+            self.num_threads > 1 and torch.device(self.device or "cpu").type == "cpu"
+        )
+        pool = _thread_pool(self.num_threads) if parallel else None
 
         for _layer_idx, (sources, destinations, modes) in enumerate(
             self.vectorized_operations
@@ -371,8 +858,8 @@ class SLOSComputeGraph:
             # Get the photon index for this layer
 
             # Create a partial function with fixed operation
-            def make_layer_fn(s, d, m):
-                return lambda u, prev, p_val: layer_compute_vectorized(
+            def make_layer_fn(s, d, m, kernel):
+                return lambda u, prev, p_val: kernel(
                     u,
                     prev,
                     s,
@@ -381,68 +868,113 @@ class SLOSComputeGraph:
                     p_val,
                 )
 
-            self.layer_functions.append(make_layer_fn(sources, destinations, modes))
+            def make_parallel_layer_fn(chunks, kernel):
+                def layer_fn(u, prev, p_val):
+                    # grad mode is thread-local: forward it to the workers
+                    grad_enabled = torch.is_grad_enabled()
 
-        # Create mapping function if needed
-        if self.output_map_func is not None:
+                    def run(chunk):
+                        with torch.set_grad_enabled(grad_enabled):
+                            return kernel(u, prev, *chunk, p_val)
 
-            @jit.script
-            def apply_mapping(
-                probabilities: torch.Tensor,
-                target_indices: torch.Tensor,
-                output_size: int,
-            ) -> torch.Tensor:
-                """Apply state mapping using optimized index_add_ operation."""
-                batch_size = probabilities.shape[0]
-
-                # Create result tensor on the same device as input
-                result = torch.zeros(
-                    (batch_size, output_size),
-                    dtype=probabilities.dtype,
-                    device=probabilities.device,
-                )
+                    return torch.cat(list(pool.map(run, chunks)), dim=-1)
 
-                # Use scatter_add_ in a fully vectorized way
-                # Target indices need to be repeated for each batch
-                result.scatter_add_(
-                    dim=1,  # scatter along the second dimension (output states)
-                    index=target_indices.repeat(
-                        batch_size, 1
-                    ),  # repeat indices for each batch
-                    src=probabilities,  # values to add
-                )
+                return layer_fn
 
-                # Renormalize
-                sum_probs = result.sum(dim=1, keepdim=True)
-                safe_sum = torch.where(
-                    sum_probs > 0, sum_probs, torch.ones_like(sum_probs)
+            if parallel and sources.shape[0] >= _PARALLEL_MIN_OPS:
+                chunks = partition_layer(sources, destinations, modes, self.num_threads)
+                self.layer_functions.append(
+                    make_parallel_layer_fn(chunks, layer_compute_vectorized)
                 )
-                normalized_result = result / safe_sum
-
-                return normalized_result
+                self.split_layer_functions.append(
+                    make_parallel_layer_fn(chunks, layer_compute_split)
+                )
+                continue
 
-            self.mapping_function = lambda probs: apply_mapping(
-                probs, self.target_indices, self.total_mapped_keys
+            self.layer_functions.append(
+                make_layer_fn(sources, destinations, modes, layer_compute_vectorized)
+            )
+            self.split_layer_functions.append(
+                make_layer_fn(sources, destinations, modes, layer_compute_split)
             )
-        else:
-            self.mapping_function = lambda x: x
 
-    def compute(
-        self, unitary: torch.Tensor, input_state: list[int]
-    ) -> tuple[list[tuple[int, ...]], torch.Tensor]:
+    def compose_readout_indices(self, group_indices: torch.Tensor) -> torch.Tensor:
         """
-        Compute the probability distribution using the pre-built graph.
+        Compose an output grouping with the graph's own output mapping.
 
         Args:
-            unitary (torch.Tensor): Single unitary matrix [m x m] or batch of unitaries [b x m x m].\
-                The unitary should be provided in the complex dtype corresponding to the graph's dtype.\
-                For example, for torch.float32, use torch.cfloat; for torch.float64, use torch.cdouble.
-            input_state (list[int]): Input_state of length self.m with self.n_photons in the input state
+            group_indices (torch.Tensor): Bucket index of every entry of the distribution
+                returned by ``compute`` (i.e. indexed like ``mapped_keys``)
 
         Returns:
-            Tuple[List[Tuple[int, ...]], torch.Tensor]:
-                - List of tuples representing output Fock state configurations
-                - Probability distribution tensor
+            torch.Tensor: Bucket index of every final Fock state of the graph, suitable for
+                the ``readout_indices`` argument of ``compute``
+        """
+        group_indices = group_indices.to(device=self.device, dtype=torch.long)
+        if self.has_output_mapping:
+            return group_indices[self.target_indices]
+        return group_indices
+
+    def _readout(
+        self,
+        amplitudes: torch.Tensor,
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+    ) -> tuple[list[tuple[int, ...]] | None, torch.Tensor]:
+        """
+        Turn final-layer amplitudes into the (optionally grouped) output distribution.
+
+        Squaring, Fock normalization and the reduction to mapped keys or output buckets
+        are done in a single ``index_add_`` pass, and the renormalization is applied on the
+        reduced tensor.
+        """
+        probabilities = self._squared_moduli(amplitudes)
+        probabilities = probabilities * self.norm_factor_output.to(probabilities.device)
+
+        if readout_indices is not None:
+            keys = None
+        elif self.has_output_mapping:
+            readout_indices = self.target_indices
+            readout_size = self.total_mapped_keys
+            keys = self.mapped_keys
+        else:
+            keys = self.final_keys if self.keep_keys else None
+
+        if readout_indices is not None:
+            probabilities = probabilities.new_zeros((
+                probabilities.shape[0],
+                readout_size,
+            )).index_add_(1, readout_indices.to(probabilities.device), probabilities)
+
+        if (
+            self.output_map_func is not None
+            or self.no_bunching
+            or self.max_occupation is not None
+            or self.constraints
+        ):
+            # Renormalize, only where sum > 0 to avoid division by zero
+            sum_probs = probabilities.sum(dim=1, keepdim=True)
+            self.truncated_mass = (
+                1 - sum_probs.detach().squeeze(1) / self.norm_factor_input
+            ).clamp(min=0)
+            safe_sum = torch.where(sum_probs > 0, sum_probs, torch.ones_like(sum_probs))
+            probabilities = probabilities / safe_sum
+        else:
+            self.truncated_mass = None
+            probabilities = probabilities / self.norm_factor_input
+
+        return keys, probabilities.to(self.dtype)
+
+    def _prepare_inputs(
+        self, unitary: torch.Tensor, input_state: list[int]
+    ) -> tuple[torch.Tensor, bool, list[int]]:
+        """Validate the inputs of a computation.
+
+        Sets ``norm_factor_input`` for the readout.
+
+        Returns:
+            The batched unitary, whether the input was batched, and the input mode of
+            every photon layer
         """
         if len(unitary.shape) == 2:
             is_batched = False
@@ -450,13 +982,9 @@ class SLOSComputeGraph:
         else:
             is_batched = True
 
-        if any(n < 0 for n in input_state) or sum(input_state) == 0:
-            raise ValueError("Photon numbers cannot be negative or all zeros")
-
-        if self.no_bunching and not all(x in [0, 1] for x in input_state):
-            raise ValueError(
-                "Input state must be binary (0s and 1s only) in non-bunching mode"
-            )
+        idx_n, self.norm_factor_input = _photon_input_modes(
+            input_state, self.index_photons, self.no_bunching
+        )
 
         batch_size, m, m2 = unitary.shape
         if m != m2 or m != self.m:
@@ -464,37 +992,55 @@ class SLOSComputeGraph:
                 f"Unitary matrix must be square with dimension {self.m}x{self.m}"
             )
 
-        # Check dtype - it should match the complex dtype used for the graph building
-        if unitary.dtype != self.complex_dtype:
+        # Check dtype - it should match the complex dtype used for the graph building,
+        # or the float dtype for the real unitaries of real-orthogonal circuits
+        real_unitary = unitary.dtype == self.dtype and not self.low_precision
+        if unitary.dtype != self.complex_dtype and not real_unitary:
             # Raise an error instead of just warning and converting
             raise ValueError(
                 f"Unitary dtype {unitary.dtype} doesn't match the expected complex dtype {self.complex_dtype} "
                 f"for the graph built with dtype {self.dtype}. Please provide a unitary with the correct dtype "
                 f"or rebuild the graph with a compatible dtype."
             )
-        idx_n = []
-        self.norm_factor_input = 1
-        for i, count in enumerate(input_state):
-            for c in range(count):
-                self.norm_factor_input *= c + 1
-                idx_n.append(i)
-                if (i > self.index_photons[len(idx_n) - 1][1]) or (
-                    i < self.index_photons[len(idx_n) - 1][0]
-                ):
-                    raise ValueError(
-                        f"Input state photons must be bounded by {self.index_photons}"
-                    )
-
-        # Get device from unitary
-        device = unitary.device
+        return unitary, is_batched, idx_n
+
+    def compute(
+        self,
+        unitary: torch.Tensor,
+        input_state: list[int],
+        readout_indices: torch.Tensor | None = None,
+        readout_size: int | None = None,
+    ) -> tuple[list[tuple[int, ...]], torch.Tensor]:
+        """
+        Compute the probability distribution using the pre-built graph.
+
+        Args:
+            unitary (torch.Tensor): Single unitary matrix [m x m] or batch of unitaries [b x m x m].\
+                The unitary should be provided in the complex dtype corresponding to the graph's dtype.\
+                For example, for torch.float32, use torch.cfloat; for torch.float64, use torch.cdouble.\
+                Real unitaries in the graph's dtype (real-orthogonal circuits) are simulated in real arithmetic.
+            input_state (list[int]): Input_state of length self.m with self.n_photons in the input state
+            readout_indices (torch.Tensor, optional): Bucket index of every final Fock state, as
+                returned by ``compose_readout_indices``. When given, the output grouping is fused
+                into the readout and the grouped distribution is returned instead.
+            readout_size (int, optional): Number of buckets, required with ``readout_indices``
+
+        Returns:
+            Tuple[List[Tuple[int, ...]], torch.Tensor]:
+                - List of tuples representing output Fock state configurations (None for a
+                  grouped readout)
+                - Probability distribution tensor
+        """
+        if readout_indices is not None and readout_size is None:
+            raise ValueError("readout_size must be given along with readout_indices")
+
+        unitary, is_batched, idx_n = self._prepare_inputs(unitary, input_state)
 
         # Initial amplitude (batch of 1s on same device as unitary with appropriate dtype)
-        amplitudes = torch.ones(
-            (batch_size, 1), dtype=self.complex_dtype, device=device
-        )
+        amplitudes, unitary, layer_functions = self._layer_inputs(unitary)
 
         # Apply each layer
-        for layer_idx, layer_fn in enumerate(self.layer_functions):
+        for layer_idx, layer_fn in enumerate(layer_functions):
             p = idx_n[layer_idx]
             amplitudes = layer_fn(
                 unitary,
@@ -503,37 +1049,242 @@ class SLOSComputeGraph:
             )
 
         self.prev_amplitudes = amplitudes  # type: ignore[assignment]
-        # Calculate probabilities
-        # probabilities = (amplitudes.abs() ** 2).real
-        probabilities = amplitudes.real**2 + amplitudes.imag**2
-        probabilities *= self.norm_factor_output.to(probabilities.device)
-        probabilities /= self.norm_factor_input
+        keys, probabilities = self._readout(amplitudes, readout_indices, readout_size)
 
-        # Apply output mapping if needed
-        if self.output_map_func is not None:
-            probabilities = self.mapping_function(probabilities)
-            keys = self.mapped_keys
-        else:
-            if self.no_bunching:
-                sum_probs = probabilities.sum(dim=1, keepdim=True)
-                # Only normalize when sum > 0 to avoid division by zero
-                valid_entries = sum_probs > 0
-                if valid_entries.any():
-                    probabilities = torch.where(
-                        valid_entries,
-                        probabilities
-                        / torch.where(
-                            valid_entries, sum_probs, torch.ones_like(sum_probs)
-                        ),
-                        probabilities,
-                    )
-            keys = self.final_keys if self.keep_keys else None
         # Remove batch dimension if input was single unitary
         if not is_batched:
             probabilities = probabilities.squeeze(0)
 
         return keys, probabilities
 
+    def compute_amplitudes(
+        self,
+        unitary: torch.Tensor,
+        input_state: list[int],
+        normalized: bool = True,
+    ) -> tuple[FockStateKeys, torch.Tensor]:
+        """
+        Compute the complex output amplitudes, in perceval's output state order.
+
+        Unnormalized amplitudes are the raw SLOS coefficients, as stored by perceval's
+        SLOS backend. Normalized amplitudes are the probability amplitudes <out|U|in>,
+        so that their squared moduli sum to one over the full output space (to one
+        minus the truncated mass when the graph restricts the output space).
+
+        Args:
+            unitary (torch.Tensor): Single unitary matrix [m x m] or batch of unitaries
+                [b x m x m], in the complex dtype of the graph
+            input_state (list[int]): Input state of length self.m with self.n_photons
+            normalized (bool): If True, Fock normalization factors are applied
+
+        Returns:
+            Tuple[FockStateKeys, torch.Tensor]:
+                - Output states, in perceval order
+                - Complex amplitudes indexed like the keys, of shape [len(keys)] or
+                  [b x len(keys)] (complex64 for low-precision graphs). On CPU,
+                  ``amplitudes.detach().numpy()`` shares their memory.
+        """
+        if self.has_output_mapping:
+            raise ValueError(
+                "Amplitudes are not defined for mapped outputs (output_map_func or "
+                "threshold_detection)"
+            )
+        if self.final_keys is None:
+            raise ValueError("Output keys are not kept by this graph (keep_keys=False)")
+
+        unitary, is_batched, idx_n = self._prepare_inputs(unitary, input_state)
+        amplitudes, kernel_unitary, layer_functions = self._layer_inputs(unitary)
+        for layer_idx, layer_fn in enumerate(layer_functions):
+            amplitudes = layer_fn(kernel_unitary, amplitudes, idx_n[layer_idx])
+        self.prev_amplitudes = amplitudes  # type: ignore[assignment]
+        amplitudes = self._as_complex(amplitudes)
+
+        if self._perceval_keys is None:
+            self._perceval_keys = self.final_keys.sort()
+        keys, order = self._perceval_keys
+        amplitudes = amplitudes[:, order.to(amplitudes.device)]
+        if normalized:
+            scale = self.norm_factor_output[order] / self.norm_factor_input
+            amplitudes = amplitudes * scale.sqrt().to(amplitudes.device)
+
+        if not is_batched:
+            amplitudes = amplitudes.squeeze(0)
+        return keys, amplitudes
+
+    def compute_approximate(
+        self,
+        unitary: torch.Tensor,
+        input_state: list[int],
+        threshold: float | None = None,
+        budget: int | None = None,
+    ) -> tuple[list[tuple[int, ...]], torch.Tensor, torch.Tensor]:
+        """
+        Compute an approximate distribution, pruning small intermediate amplitudes.
+
+        After every intermediate photon layer, partial states whose probability (for the
+        photons added so far) is below ``threshold`` for every unitary of the batch, or
+        outside the ``budget`` most probable ones, are dropped. Only the survivors are
+        propagated, with operation indices compacted on the fly.
+
+        Dropping partial states of probability mass q after l of n photons changes the
+        final amplitude vector by a vector of norm at most sqrt(q * n!/l! * c_l/c_n),
+        where c_l is the product of the factorials of the input occupations of the first
+        l photons (creation operators have norm at most sqrt(N + 1) on N photons). If the
+        norms of the amplitude errors sum to e, the L1 distance between the approximate
+        and exact probabilities (before any renormalization) is at most e * (2 + e).
+
+        Args:
+            unitary (torch.Tensor): Single unitary matrix [m x m] or batch of unitaries [b x m x m]
+            input_state (list[int]): Input_state of length self.m with self.n_photons in the input state
+            threshold (float, optional): Minimum partial probability of a surviving state
+            budget (int, optional): Maximum number of surviving states per unitary and layer
+
+        Returns:
+            Tuple[List[Tuple[int, ...]], torch.Tensor, torch.Tensor]:
+                - Output keys, as for ``compute``
+                - Approximate probability distribution tensor
+                - Bound on the L1 error of the distribution, per unitary
+        """
+        if self.low_precision:
+            raise ValueError(
+                "Approximate computation requires a float32 or float64 graph"
+            )
+        unitary, is_batched, idx_n = self._prepare_inputs(unitary, input_state)
+        batch_size = unitary.shape[0]
+        device = unitary.device
+        real_dtype = unitary.real.dtype
+
+        amplitudes = torch.ones(
+            (batch_size, 1), dtype=self.complex_dtype, device=device
+        )
+        amplitude_error = torch.zeros(batch_size, dtype=real_dtype, device=device)
+        # full index of every propagated state (None: all states of the layer)
+        survivors = None
+        input_counts = [0] * self.m
+
+        for layer_idx, (sources, destinations, modes) in enumerate(
+            self.vectorized_operations
+        ):
+            if survivors is not None:
+                # only keep operations from surviving states, in compact indices
+                previous_size = self.layer_norm_factors[layer_idx - 1].shape[0]
+                position = torch.full(
+                    (previous_size,), -1, dtype=torch.long, device=sources.device
+                )
+                position[survivors] = torch.arange(
+                    survivors.shape[0], device=sources.device
+                )
+                compact_sources = position[sources]
+                kept_ops = compact_sources >= 0
+                sources = compact_sources[kept_ops]
+                modes = modes[kept_ops]
+                survivors, destinations = torch.unique(
+                    destinations[kept_ops], return_inverse=True
+                )
+
+            amplitudes = layer_compute_vectorized(
+                unitary, amplitudes, sources, destinations, modes, idx_n[layer_idx]
+            )
+            input_counts[idx_n[layer_idx]] += 1
+            if layer_idx == len(self.vectorized_operations) - 1:
+                break
+
+            norm_factors = self.layer_norm_factors[layer_idx].to(device)
+            if survivors is not None:
+                norm_factors = norm_factors[survivors.to(device)]
+            layer_norm = math.prod(math.factorial(c) for c in input_counts)
+            probabilities = (
+                (amplitudes.real**2 + amplitudes.imag**2) * norm_factors / layer_norm
+            )
+
+            keep = torch.zeros_like(probabilities, dtype=torch.bool)
+            keep.scatter_(1, probabilities.argmax(dim=1, keepdim=True), True)
+            if threshold is not None:
+                keep |= probabilities >= threshold
+            else:
+                keep.fill_(True)
+            if budget is not None and probabilities.shape[1] > budget:
+                in_budget = torch.zeros_like(keep)
+                in_budget.scatter_(1, probabilities.topk(budget, dim=1).indices, True)
+                keep &= in_budget
+            keep = keep.any(dim=0)
+            if bool(keep.all()):
+                continue
+
+            pruned_mass = (probabilities * ~keep).sum(dim=1).detach()
+            growth = (
+                math.factorial(self.n_photons)
+                / math.factorial(layer_idx + 1)
+                * layer_norm
+                / self.norm_factor_input
+            )
+            amplitude_error = amplitude_error + (growth * pruned_mass).sqrt()
+
+            amplitudes = amplitudes[:, keep]
+            if survivors is None:
+                survivors = torch.arange(keep.shape[0], device=keep.device)
+            survivors = survivors[keep.to(survivors.device)]
+
+        if survivors is not None:
+            final_size = self.norm_factor_output.shape[0]
+            amplitudes = amplitudes.new_zeros((batch_size, final_size)).index_copy(
+                1, survivors.to(device), amplitudes
+            )
+        keys, probabilities = self._readout(amplitudes)
+        error_bound = (amplitude_error * (2 + amplitude_error)).clamp(max=2)
+
+        if not is_batched:
+            probabilities = probabilities.squeeze(0)
+            error_bound = error_bound.squeeze(0)
+
+        return keys, probabilities, error_bound
+
+    def compute_sectors(
+        self,
+        unitary: torch.Tensor,
+        input_state: list[int],
+        efficiency: float | torch.Tensor,
+        sectors: list[int] | None = None,
+    ) -> dict[int, tuple[FockStateKeys, torch.Tensor]]:
+        """
+        Compute the distributions of every detected photon number under output losses.
+
+        The n-photon distribution is computed once, then every mode is thinned with its
+        efficiency (see ``PhotonLossChannel``), which gives the distributions of all the
+        requested photon-number sectors.
+
+        Args:
+            unitary (torch.Tensor): Single unitary matrix [m x m] or batch of unitaries [b x m x m]
+            input_state (list[int]): Input_state of length self.m with self.n_photons in the input state
+            efficiency (float or torch.Tensor): Transmission of every mode, a float or a tensor [m]
+            sectors (list[int], optional): Detected photon numbers, defaults to n, n-1, ..., 0
+
+        Returns:
+            Dict[int, Tuple[FockStateKeys, torch.Tensor]]: For every sector, the keys of the
+                detected states and their probabilities ([num_states] or [b x num_states])
+        """
+        if (
+            self.no_bunching
+            or self.has_output_mapping
+            or self.max_occupation is not None
+        ):
+            raise ValueError(
+                "Photon-number sectors need the full bunched distribution: build the "
+                "graph with no_bunching=False, without max_occupation and without "
+                "output mapping"
+            )
+        if self.final_keys is None:
+            raise ValueError("Output keys are not kept by this graph (keep_keys=False)")
+
+        sectors_key = None if sectors is None else tuple(sectors)
+        channel = self._loss_channels.get(sectors_key)
+        if channel is None:
+            channel = PhotonLossChannel(self.final_keys, sectors)
+            self._loss_channels[sectors_key] = channel
+
+        _, distribution = self.compute(unitary, input_state)
+        return channel(distribution, efficiency)
+
     def _prepare_pa_inc(self, unitary):
         self.ct_inverts = []
         for _layer_idx, (sources, destinations, modes) in enumerate(
@@ -543,12 +1294,32 @@ class SLOSComputeGraph:
                 layer_compute_backward(unitary, sources, destinations, modes, self.m)
             )
 
+    def __getstate__(self) -> dict:
+        """State of the graph for pickling, e.g. to send it to worker processes.
+
+        Layer closures, caches and the output map, which may be a lambda, are left out;
+        the output mapping itself is kept in ``target_indices``.
+        """
+        state = self.__dict__.copy()
+        for name in ("layer_functions", "split_layer_functions", "save"):
+            state.pop(name, None)
+        state.update(prev_amplitudes=None, ct_inverts=None, _perceval_keys=None)
+        state["_loss_channels"] = {}
+        if state["output_map_func"] is not None:
+            state["output_map_func"] = _restored_output_map
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._create_torchscript_modules()
+
     def to(self, dtype: torch.dtype, device: str | torch.device):
         """
-        Moves the converter to a specific device.
+        Moves the graph to a specific device and dtype.
 
         :param dtype: The data type to use for the tensors - one can specify either a float or complex dtype.
-                      Supported dtypes are torch.float32 or torch.complex64, torch.float64 or torch.complex128.
+                      Supported dtypes are torch.float16, torch.bfloat16, torch.float32 or torch.complex64,
+                      torch.float64 or torch.complex128.
         :param device: The device to move the converter to.
         """
         if isinstance(device, str):
@@ -559,26 +1330,32 @@ class SLOSComputeGraph:
             raise TypeError(
                 f"Expected a string or torch.device, but got {type(device).__name__}"
             )
-        if dtype not in (
-            torch.float32,
-            torch.float64,
-            torch.complex64,
-            torch.complex128,
-        ):
+        if dtype in (torch.complex64, torch.complex128):
+            dtype = _get_float_dtype_for_complex(dtype)
+        if dtype not in (*LOW_PRECISION_DTYPES, torch.float32, torch.float64):
             raise TypeError(
-                f"Unsupported dtype {dtype}. Supported dtypes are torch.float32, torch.float64, "
-                f"torch.complex64, and torch.complex128."
+                f"Unsupported dtype {dtype}. Supported dtypes are torch.float16, "
+                "torch.bfloat16, torch.float32, torch.float64, torch.complex64, and "
+                "torch.complex128."
             )
-        if self.output_map_func is not None:
-            self.target_indices.to(dtype=dtype, device=self.device)
+        self._set_dtype(dtype)
+        self.prev_amplitudes = None
+        self.norm_factor_output = self.norm_factor_output.to(self.accumulate_dtype)
+        self.layer_norm_factors = [
+            factors.to(self.accumulate_dtype) for factors in self.layer_norm_factors
+        ]
+        # index tensors keep their integer dtype, only the device changes
+        if self.has_output_mapping:
+            self.target_indices = self.target_indices.to(device=self.device)
         for idx, (sources, destinations, modes) in enumerate(
             self.vectorized_operations
         ):
             self.vectorized_operations[idx] = (
-                sources.to(dtype=dtype, device=self.device),
-                destinations.to(dtype=dtype, device=self.device),
-                modes.to(dtype=dtype, device=self.device),
+                sources.to(device=self.device),
+                destinations.to(device=self.device),
+                modes.to(device=self.device),
             )
+        self._create_torchscript_modules()
 
         return self
 
@@ -589,6 +1366,10 @@ class SLOSComputeGraph:
         input_state: list[int],
         changed_unitary=False,
     ) -> tuple[list[tuple[int, ...]], torch.Tensor]:
+        if self.low_precision:
+            raise ValueError(
+                "Incremental computation requires a float32 or float64 graph"
+            )
         if len(unitary.shape) == 2:
             is_batched = False
             unitary = unitary.unsqueeze(0)  # Add batch dimension [1 x m x m]
@@ -638,6 +1419,7 @@ class SLOSComputeGraph:
             raise RuntimeError(
                 "prev_amplitudes is None - compute must be called before forward"
             )
+        amplitudes = self._as_complex(amplitudes)
 
         num_changes = len(idx_n_pos)
 
@@ -659,31 +1441,7 @@ class SLOSComputeGraph:
                 )
 
         self.prev_amplitudes = amplitudes  # type: ignore[assignment]
-        # Calculate probabilities
-        # probabilities = (amplitudes.abs() ** 2).real
-        probabilities = amplitudes.real**2 + amplitudes.imag**2
-        probabilities *= self.norm_factor_output.to(device=self.device)
-        probabilities /= self.norm_factor_input
-
-        # Apply output mapping if needed
-        if self.output_map_func is not None:
-            probabilities = self.mapping_function(probabilities)
-            keys = self.mapped_keys
-        else:
-            if self.no_bunching:
-                sum_probs = probabilities.sum(dim=1, keepdim=True)
-                # Only normalize when sum > 0 to avoid division by zero
-                valid_entries = sum_probs > 0
-                if valid_entries.any():
-                    probabilities = torch.where(
-                        valid_entries,
-                        probabilities
-                        / torch.where(
-                            valid_entries, sum_probs, torch.ones_like(sum_probs)
-                        ),
-                        probabilities,
-                    )
-            keys = self.final_keys if self.keep_keys else None
+        keys, probabilities = self._readout(amplitudes)
 
         # Remove batch dimension if input was single unitary
         if not is_batched:
@@ -701,6 +1459,12 @@ def build_slos_distribution_computegraph(
     device=None,
     dtype: torch.dtype = torch.float,
     index_photons: list[tuple[int, ...]] | None = None,
+    threshold_detection: bool = False,
+    max_occupation: int | list[int] | None = None,
+    constraints: list[PhotonCountConstraint] | None = None,
+    photon_modes: list[list[int]] | None = None,
+    kernel: str = "auto",
+    num_threads: int = 1,
 ) -> SLOSComputeGraph:
     """
     Build a computation graph for Strong Linear Optical Simulation (SLOS) algorithm
@@ -718,6 +1482,12 @@ def build_slos_distribution_computegraph(
         device,
         dtype,
         index_photons,
+        threshold_detection,
+        max_occupation,
+        constraints,
+        photon_modes,
+        kernel,
+        num_threads,
     )
 
     # Add save method to the returned object
@@ -741,6 +1511,15 @@ def build_slos_distribution_computegraph(
             "keep_keys": compute_graph.keep_keys,
             "dtype_str": str(compute_graph.dtype),
             "has_output_map_func": output_map_func is not None,
+            "threshold_detection": compute_graph.threshold_detection,
+            "max_occupation": compute_graph.max_occupation,
+            "photon_modes": compute_graph.photon_modes,
+            "kernel": compute_graph.kernel,
+            "num_threads": compute_graph.num_threads,
+            "constraints": [
+                (c.modes, c.min_photons, c.max_photons, c.parity)
+                for c in compute_graph.constraints or []
+            ],
         }
 
         # Save TorchScript layer functions if possible
@@ -749,8 +1528,13 @@ def build_slos_distribution_computegraph(
             {
                 "metadata": metadata,
                 "vectorized_operations": compute_graph.vectorized_operations,
-                "final_keys": compute_graph.final_keys,
-                "mapped_keys": compute_graph.mapped_keys,
+                # keys are saved as their ranks, mapped keys only when they differ
+                "final_keys": compute_graph.final_keys.ranks
+                if compute_graph.final_keys is not None
+                else None,
+                "mapped_keys": compute_graph.mapped_keys
+                if compute_graph.has_output_mapping
+                else None,
                 "mapped_indices": compute_graph.mapped_indices
                 if hasattr(compute_graph, "mapped_indices")
                 else None,
@@ -804,7 +1588,9 @@ def load_slos_distribution_computegraph(path):
 
     # Parse dtype
     dtype_str = metadata.get("dtype_str", "torch.float32")
-    if "float16" in dtype_str:
+    if "bfloat16" in dtype_str:
+        dtype = torch.bfloat16
+    elif "float16" in dtype_str:
         dtype = torch.float16
     elif "float64" in dtype_str:
         dtype = torch.float64
@@ -812,11 +1598,31 @@ def load_slos_distribution_computegraph(path):
         dtype = torch.float32
 
     # Create basic graph (without output_map_func for now)
-    graph = SLOSComputeGraph(m, n_photons, None, no_bunching, keep_keys, dtype=dtype)
+    graph = SLOSComputeGraph(
+        m,
+        n_photons,
+        None,
+        no_bunching,
+        keep_keys,
+        dtype=dtype,
+        threshold_detection=metadata.get("threshold_detection", False),
+        max_occupation=metadata.get("max_occupation"),
+        constraints=[
+            PhotonCountConstraint(*fields) for fields in metadata.get("constraints", [])
+        ],
+        photon_modes=metadata.get("photon_modes"),
+        kernel=metadata.get("kernel", "auto"),
+        num_threads=metadata.get("num_threads", 1),
+    )
     # Restore saved attributes
     graph.vectorized_operations = saved_data["vectorized_operations"]
-    graph.final_keys = saved_data["final_keys"]
+    final_keys = saved_data["final_keys"]
+    if isinstance(final_keys, torch.Tensor):
+        final_keys = FockStateKeys(final_keys, m, n_photons)
+    graph.final_keys = final_keys
     graph.mapped_keys = saved_data["mapped_keys"]
+    if graph.mapped_keys is None:
+        graph.mapped_keys = final_keys
 
     # Restore mapping information if it was used
     if metadata.get("has_output_map_func", False):
@@ -824,13 +1630,9 @@ def load_slos_distribution_computegraph(path):
         graph.total_mapped_keys = saved_data["total_mapped_keys"]
         graph.target_indices = saved_data["target_indices"]
 
-        # We need to recreate a dummy output_map_func that uses the saved mapping
-        def restored_output_map_func(state):
-            # This function just serves as a placeholder to indicate mapping is used
-            # The actual mapping is handled by the restored mapped_indices
-            return state
-
-        graph.output_map_func = restored_output_map_func
+        # The mapping is handled by the restored mapped_indices, the output map is a
+        # placeholder indicating that mapping is used
+        graph.output_map_func = _restored_output_map
 
     # Recreate the TorchScript modules
     graph._create_torchscript_modules()
@@ -848,6 +1650,9 @@ def compute_slos_distribution(
     no_bunching: bool = False,
     keep_keys: bool = True,
     index_photons: list[tuple[int, ...]] | None = None,
+    threshold_detection: bool = False,
+    max_occupation: int | list[int] | None = None,
+    constraints: list[PhotonCountConstraint] | None = None,
 ) -> tuple[list[tuple[int, ...]], torch.Tensor]:
     """
     TorchScript-optimized version of pytorch_slos_output_distribution.
@@ -864,6 +1669,11 @@ def compute_slos_distribution(
         keep_keys (bool): If True, output state keys are returned
         index_photons: List of tuples (first_integer, second_integer). The first_integer is the\
                   lowest index layer a photon can take and the second_integer is the highest index
+        threshold_detection (bool): If True, click patterns of threshold detectors are returned
+        max_occupation (int or list[int], optional): Maximum number of photons per mode in the
+                  output states
+        constraints (list[PhotonCountConstraint], optional): Post-selection constraints on the
+                  output states
 
 
     Returns:
@@ -887,6 +1697,9 @@ def compute_slos_distribution(
         device=device,
         dtype=dtype,
         index_photons=index_photons,
+        threshold_detection=threshold_detection,
+        max_occupation=max_occupation,
+        constraints=constraints,
     )
     return graph.compute(unitary, input_state)
 
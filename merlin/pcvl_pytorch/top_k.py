@@ -0,0 +1,166 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Search of the most probable output states of a linear optical circuit.
+
+Photons are added one by one as in SLOS, but only the partial states of a beam are
+propagated: at every photon layer, the partial states are ranked by an upper bound on
+the probability mass they can reach, and only the best ones are kept. The cost depends
+on the beam width instead of the size of the output space.
+"""
+
+import math
+
+import torch
+
+from .fock_keys import _count_table, fock_state_rank
+
+
+def _factorial_products(states: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+    """Product of the factorials of the occupations of every state."""
+    return torch.lgamma(states.to(dtype) + 1).sum(dim=-1).exp()
+
+
+def _unique_states(
+    states: torch.Tensor, n_photons: int
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Unique rows of a state matrix, through their ranks when the space can be ranked."""
+    try:
+        table = _count_table(states.shape[-1], n_photons)
+    except ValueError:
+        return torch.unique(states, dim=0, return_inverse=True)
+    ranks, inverse = torch.unique(
+        fock_state_rank(states, n_photons, table), return_inverse=True
+    )
+    first = torch.empty_like(ranks).scatter_(
+        0, inverse, torch.arange(inverse.shape[0], device=inverse.device)
+    )
+    return states[first], inverse
+
+
+def top_k_states(
+    unitary: torch.Tensor,
+    input_state: list[int],
+    k: int,
+    beam_width: int = 4096,
+    no_bunching: bool = False,
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Find the k most probable output states without computing the full distribution.
+
+    Pruning a partial state of l photons with probability p discards a component whose
+    norm, once the remaining photons are added, is at most sqrt(p * n! / l! * c_l / c_n)
+    (creation operators of a unit mode vector have norm at most sqrt(N + 1) on N-photon
+    states; c_l is the product of the factorials of the input occupations of the first
+    l photons). This bound is used both to rank the partial states and to report an
+    error bound on the returned amplitudes.
+
+    Args:
+        unitary: Unitary matrix [m x m] or batch of unitaries [batch_size x m x m]
+        input_state: Input occupation of every mode
+        k: Number of states to return
+        beam_width: Maximum number of partial states kept for every unitary at every
+            photon layer
+        no_bunching: If True, only states with at most one photon per mode are searched.
+            Probabilities are then not renormalized over the collision-free states.
+
+    Returns:
+        - states: Occupations of the most probable states [k x m] or [batch_size x k x m],
+          by decreasing probability
+        - probabilities: Their probabilities [k] or [batch_size x k]
+        - amplitude_error: Bound on the error of the square root of every probability
+          [] or [batch_size]. States that are not returned and were pruned have a
+          probability at most amplitude_error ** 2 above the k-th returned one.
+    """
+    is_batched = unitary.dim() == 3
+    if not is_batched:
+        unitary = unitary.unsqueeze(0)
+    batch_size, m, _ = unitary.shape
+    if len(input_state) != m:
+        raise ValueError(
+            f"Input state has {len(input_state)} modes, the unitary has {m}"
+        )
+    device = unitary.device
+    real_dtype = unitary.real.dtype
+
+    photon_modes = [
+        mode for mode, count in enumerate(input_state) for _ in range(count)
+    ]
+    n_photons = len(photon_modes)
+    final_norm = math.prod(math.factorial(count) for count in input_state)
+
+    states = torch.zeros((1, m), dtype=torch.long, device=device)
+    amplitudes = torch.ones((batch_size, 1), dtype=unitary.dtype, device=device)
+    unit_steps = torch.eye(m, dtype=torch.long, device=device)
+    amplitude_error = torch.zeros(batch_size, dtype=real_dtype, device=device)
+    input_counts = [0] * m
+
+    for layer, mode in enumerate(photon_modes, start=1):
+        # every partial state gains a photon in every mode
+        children = (states.unsqueeze(1) + unit_steps).reshape(-1, m)
+        contributions = amplitudes.unsqueeze(-1) * unitary[:, :, mode].unsqueeze(1)
+        contributions = contributions.reshape(batch_size, -1)
+        if no_bunching:
+            # bunched partial states only lead to bunched outputs
+            collision_free = (children <= 1).all(dim=-1)
+            children = children[collision_free]
+            contributions = contributions[:, collision_free]
+
+        states, inverse = _unique_states(children, layer)
+        amplitudes = contributions.new_zeros((batch_size, states.shape[0])).index_add_(
+            1, inverse, contributions
+        )
+        input_counts[mode] += 1
+
+        if states.shape[0] > beam_width and layer < n_photons:
+            layer_norm = math.prod(math.factorial(count) for count in input_counts)
+            probabilities = (
+                amplitudes.abs().square()
+                * _factorial_products(states, real_dtype)
+                / layer_norm
+            )
+            beams = probabilities.topk(beam_width, dim=-1).indices
+            kept = torch.zeros_like(probabilities, dtype=torch.bool)
+            kept.scatter_(1, beams, True)
+            kept = kept.any(dim=0)
+
+            pruned_mass = (probabilities * ~kept).sum(dim=-1).clamp(min=0)
+            growth = (
+                math.factorial(n_photons)
+                / math.factorial(layer)
+                * layer_norm
+                / final_norm
+            )
+            amplitude_error = amplitude_error + (growth * pruned_mass).sqrt()
+
+            states = states[kept]
+            amplitudes = amplitudes[:, kept]
+
+    probabilities = (
+        amplitudes.abs().square() * _factorial_products(states, real_dtype) / final_norm
+    )
+    top = probabilities.topk(min(k, states.shape[0]), dim=-1)
+    top_states = states[top.indices]
+
+    if not is_batched:
+        return top_states[0], top.values[0], amplitude_error[0]
+    return top_states, top.values, amplitude_error
@@ -22,6 +22,7 @@
 
 """Sampling and autodiff utilities."""
 
+from .alias import AliasTable
 from .autodiff import AutoDiffProcess
 from .mappers import LexGroupingMapper, ModGroupingMapper, OutputMapper
 from .process import SamplingProcess
@@ -34,4 +35,5 @@ __all__ = [
     "ModGroupingMapper",
     "SamplingProcess",
     "AutoDiffProcess",
+    "AliasTable",
 ]
@@ -0,0 +1,149 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Walker alias tables for repeated sampling from fixed distributions.
+"""
+
+import torch
+
+
+class AliasTable:
+    """Walker alias tables for a batch of discrete distributions.
+
+    Every state owns one bucket of probability ``prob[b]`` and an alias filling the
+    rest of the bucket, so that a draw costs one uniform bucket index and one uniform
+    threshold: O(1) per shot, vectorized over shots and over the batch.
+
+    The tables are built without a Python loop over the states, using the sweeping
+    construction: light states (scaled weight below 1) are filled in order by heavy
+    states, and a heavy state whose weight drops below 1 is filled by the next heavy
+    one. Both the light deficits and the heavy surpluses are laid on a line with prefix
+    sums, so the alias of every bucket is found with ``searchsorted``.
+    """
+
+    def __init__(self, distribution: torch.Tensor):
+        """Build the alias tables.
+
+        Args:
+            distribution: Non-negative weights of shape (num_states,) or
+                (batch_size, num_states), not necessarily normalized
+        """
+        weights = distribution.detach().to(torch.float64).clamp(min=0)
+        self.is_batched = weights.dim() == 2
+        if not self.is_batched:
+            weights = weights.unsqueeze(0)
+        batch_size, num_states = weights.shape
+        self.batch_size = batch_size
+        self.num_states = num_states
+
+        total = weights.sum(dim=1, keepdim=True)
+        scaled = weights * num_states / torch.where(total > 0, total, 1.0)
+
+        # light states first, then heavy states
+        heavy = scaled >= 1
+        order = torch.sort(heavy.to(torch.uint8), dim=1, stable=True).indices
+        scaled = scaled.gather(1, order)
+        heavy = heavy.gather(1, order)
+
+        deficits = torch.where(heavy, 0.0, 1 - scaled)
+        surpluses = torch.where(heavy, scaled - 1, 0.0)
+        demand_end = deficits.cumsum(dim=1)
+        supply_end = surpluses.cumsum(dim=1)
+
+        # a light bucket is filled by the first heavy state with supply left at the
+        # point where its demand starts
+        light_alias = torch.searchsorted(
+            supply_end, (demand_end - deficits).contiguous(), right=True
+        )
+        # a heavy state gives until the end of the demand it is filling when its
+        # surplus runs out; the deficit left in its own bucket is filled by the next one
+        filled_to = demand_end.gather(
+            1,
+            torch.searchsorted(demand_end, supply_end.contiguous()).clamp(
+                max=num_states - 1
+            ),
+        )
+        heavy_prob = 1 - (filled_to - supply_end)
+        heavy_alias = torch.arange(1, num_states + 1, device=weights.device).expand(
+            batch_size, -1
+        )
+
+        prob = torch.where(heavy, heavy_prob, scaled).clamp(0, 1)
+        alias = torch.where(heavy, heavy_alias, light_alias).clamp(max=num_states - 1)
+
+        self.prob = prob
+        self.own_states = order
+        self.alias_states = order.gather(1, alias)
+
+    def sample(
+        self, shots: int, generator: torch.Generator | None = None
+    ) -> torch.Tensor:
+        """Draw state indices.
+
+        Args:
+            shots: Number of draws for every distribution of the batch
+            generator: Optional random generator, for reproducible sampling
+
+        Returns:
+            State indices of shape (shots,) or (batch_size, shots)
+        """
+        device = self.prob.device
+        buckets = torch.randint(
+            self.num_states,
+            (self.batch_size, shots),
+            generator=generator,
+            device=device,
+        )
+        thresholds = torch.rand(
+            (self.batch_size, shots),
+            generator=generator,
+            dtype=self.prob.dtype,
+            device=device,
+        )
+        keep = thresholds < self.prob.gather(1, buckets)
+        states = torch.where(
+            keep,
+            self.own_states.gather(1, buckets),
+            self.alias_states.gather(1, buckets),
+        )
+        return states if self.is_batched else states.squeeze(0)
+
+    def sample_counts(
+        self, shots: int, generator: torch.Generator | None = None
+    ) -> torch.Tensor:
+        """Draw shots and accumulate the counts of every state.
+
+        Args:
+            shots: Number of draws for every distribution of the batch
+            generator: Optional random generator, for reproducible sampling
+
+        Returns:
+            Integer counts of shape (num_states,) or (batch_size, num_states)
+        """
+        states = self.sample(shots, generator)
+        if not self.is_batched:
+            states = states.unsqueeze(0)
+        counts = torch.zeros(
+            (self.batch_size, self.num_states), dtype=torch.long, device=states.device
+        ).scatter_add_(1, states, torch.ones_like(states))
+        return counts if self.is_batched else counts.squeeze(0)
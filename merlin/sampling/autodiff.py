@@ -32,8 +32,12 @@ from ..sampling.process import SamplingProcess
 class AutoDiffProcess:
     """Handles automatic differentiation backend and sampling noise integration."""
 
-    def __init__(self, sampling_method: str = "multinomial"):
-        self.sampling_noise = SamplingProcess(method=sampling_method)
+    def __init__(
+        self, sampling_method: str = "multinomial", use_alias_tables: bool = False
+    ):
+        self.sampling_noise = SamplingProcess(
+            method=sampling_method, use_alias_tables=use_alias_tables
+        )
 
     def autodiff_backend(
         self, needs_gradient: bool, apply_sampling: bool, shots: int
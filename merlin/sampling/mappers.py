@@ -26,7 +26,6 @@ Output mapping implementations for quantum-to-classical conversion.
 
 import torch
 import torch.nn as nn
-import torch.nn.functional as F
 
 from .strategies import OutputMappingStrategy
 
@@ -64,25 +63,69 @@ class OutputMapper:
             return LexGroupingMapper(input_size, output_size)
         elif strategy == OutputMappingStrategy.MODGROUPING:
             return ModGroupingMapper(input_size, output_size)
-        elif strategy == OutputMappingStrategy.NONE:
+        elif strategy in [
+            OutputMappingStrategy.NONE,
+            OutputMappingStrategy.OCCUPATIONS,
+            OutputMappingStrategy.CORRELATIONS,
+        ]:
             if input_size != output_size:
                 raise ValueError(
                     f"Distribution size ({input_size}) must equal "
-                    f"output size ({output_size}) when using 'none' strategy"
+                    f"output size ({output_size}) when using "
+                    f"'{strategy.value}' strategy"
                 )
             return nn.Identity()
         else:
             raise ValueError(f"Unknown output mapping strategy: {strategy}")
 
 
+def _scatter_groups(
+    probability_distribution: torch.Tensor,
+    group_indices: torch.Tensor,
+    output_size: int,
+) -> torch.Tensor:
+    """Sum the entries of a distribution into buckets with a single scatter.
+
+    Args:
+        probability_distribution: Tensor of shape (..., input_size), dense or sparse COO
+        group_indices: Bucket index of every input entry, shape (input_size,)
+        output_size: Number of buckets
+
+    Returns:
+        Grouped dense tensor of shape (..., output_size)
+    """
+    if probability_distribution.is_sparse:
+        sparse = probability_distribution.coalesce()
+        indices = sparse.indices()
+        buckets = group_indices.to(indices.device)[indices[-1]]
+        result = sparse.values().new_zeros((*sparse.shape[:-1], output_size))
+        return result.index_put(
+            (*indices[:-1], buckets), sparse.values(), accumulate=True
+        )
+
+    result = probability_distribution.new_zeros((
+        *probability_distribution.shape[:-1],
+        output_size,
+    ))
+    return result.index_add(
+        -1, group_indices.to(probability_distribution.device), probability_distribution
+    )
+
+
 class LexGroupingMapper(nn.Module):
     """Maps probability distributions using lexicographical grouping.
 
     This mapper groups consecutive elements of the probability distribution into
     equal-sized buckets and sums them to produce the output. If the input size
-    is not evenly divisible by the output size, padding is applied.
+    is not evenly divisible by the output size, the last buckets receive fewer
+    elements (equivalent to zero-padding the input).
+
+    The bucket of every input index is precomputed in ``group_indices`` so that the
+    grouping costs a single scatter, and can be fused into the SLOS readout.
     """
 
+    group_indices: torch.Tensor
+
     def __init__(self, input_size: int, output_size: int):
         """Initialize the lexicographical grouping mapper.
 
@@ -93,6 +136,12 @@ class LexGroupingMapper(nn.Module):
         super().__init__()
         self.input_size = input_size
         self.output_size = output_size
+        bucket_size = -(-input_size // output_size)
+        self.register_buffer(
+            "group_indices",
+            torch.arange(input_size, dtype=torch.long) // bucket_size,
+            persistent=False,
+        )
 
     def forward(self, probability_distribution: torch.Tensor) -> torch.Tensor:
         """Group probability distribution into equal-sized buckets.
@@ -103,21 +152,9 @@ class LexGroupingMapper(nn.Module):
         Returns:
             Grouped probability tensor of shape (batch_size, output_size) or (output_size,)
         """
-        pad_size = (
-            self.output_size - (self.input_size % self.output_size)
-        ) % self.output_size
-
-        if pad_size > 0:
-            padded = F.pad(probability_distribution, (0, pad_size))
-        else:
-            padded = probability_distribution
-
-        if probability_distribution.dim() == 2:
-            return padded.view(
-                probability_distribution.shape[0], self.output_size, -1
-            ).sum(dim=-1)
-        else:
-            return padded.view(self.output_size, -1).sum(dim=-1)
+        return _scatter_groups(
+            probability_distribution, self.group_indices, self.output_size
+        )
 
 
 class ModGroupingMapper(nn.Module):
@@ -125,9 +162,12 @@ class ModGroupingMapper(nn.Module):
 
     This mapper groups elements of the probability distribution based on their
     index modulo the output size. Elements with the same modulo value are summed
-    together to produce the output.
+    together to produce the output. If the output size is larger than the input
+    size, the output is zero-padded.
     """
 
+    group_indices: torch.Tensor
+
     def __init__(self, input_size: int, output_size: int):
         """Initialize the modulo grouping mapper.
 
@@ -138,6 +178,11 @@ class ModGroupingMapper(nn.Module):
         super().__init__()
         self.input_size = input_size
         self.output_size = output_size
+        self.register_buffer(
+            "group_indices",
+            torch.arange(input_size, dtype=torch.long) % output_size,
+            persistent=False,
+        )
 
     def forward(self, probability_distribution: torch.Tensor) -> torch.Tensor:
         """Group probability distribution based on indices modulo output_size.
@@ -148,40 +193,6 @@ class ModGroupingMapper(nn.Module):
         Returns:
             Grouped probability tensor of shape (batch_size, output_size) or (output_size,)
         """
-        if self.output_size > self.input_size:
-            if probability_distribution.dim() == 2:
-                pad_size = self.output_size - self.input_size
-                padded = F.pad(probability_distribution, (0, pad_size))
-                return padded
-            else:
-                pad_size = self.output_size - self.input_size
-                padded = F.pad(probability_distribution, (0, pad_size))
-                return padded
-
-        indices = torch.arange(self.input_size, device=probability_distribution.device)
-        group_indices = indices % self.output_size
-
-        if probability_distribution.dim() == 2:
-            batch_size = probability_distribution.shape[0]
-            result = torch.zeros(
-                batch_size,
-                self.output_size,
-                device=probability_distribution.device,
-                dtype=probability_distribution.dtype,
-            )
-            for b in range(batch_size):
-                result[b] = torch.zeros(
-                    self.output_size,
-                    device=probability_distribution.device,
-                    dtype=probability_distribution.dtype,
-                )
-                result[b].index_add_(0, group_indices, probability_distribution[b])
-            return result
-        else:
-            result = torch.zeros(
-                self.output_size,
-                device=probability_distribution.device,
-                dtype=probability_distribution.dtype,
-            )
-            result.index_add_(0, group_indices, probability_distribution)
-            return result
+        return _scatter_groups(
+            probability_distribution, self.group_indices, self.output_size
+        )
@@ -24,8 +24,14 @@
 Quantum measurement sampling utilities.
 """
 
+import hashlib
+from collections import OrderedDict
+
 import torch
 
+from .alias import AliasTable
+from .sparse import from_padded_rows, to_padded_rows
+
 
 class SamplingProcess:
     """Handles quantum measurement sampling with different methods.
@@ -34,10 +40,19 @@ class SamplingProcess:
     by applying different sampling strategies to probability distributions.
     """
 
-    def __init__(self, method: str = "multinomial"):
+    def __init__(
+        self,
+        method: str = "multinomial",
+        use_alias_tables: bool = False,
+        alias_cache_size: int = 8,
+    ):
         """Initialize the sampling process with a specific method.
         Args:
             method: Sampling method to use ('multinomial', 'binomial', or 'gaussian')
+            use_alias_tables: If True, multinomial shots are drawn from Walker alias
+                tables, cached per distribution content so that repeated sampling from
+                the same distribution only costs O(1) per shot
+            alias_cache_size: Maximum number of distributions whose alias tables are kept
 
         Raises:
             ValueError: If method is not one of the valid options
@@ -50,19 +65,64 @@ class SamplingProcess:
                 f"Invalid sampling method: {method}. Valid options are: {self.valid_methods}"
             )
         self.method = method
+        self.use_alias_tables = use_alias_tables
+        self.alias_cache_size = alias_cache_size
+        self._alias_cache: OrderedDict = OrderedDict()
+
+    def alias_table(self, distribution: torch.Tensor) -> AliasTable:
+        """Get the alias tables of a distribution, building them if needed.
+
+        Tables are cached on the content of the distribution, so that the new but
+        equal distributions returned by repeated forward passes with unchanged inputs
+        and parameters (e.g. in eval mode) reuse them. Looking a distribution up costs
+        one hash of its values, copied to host memory first for device tensors.
+
+        Args:
+            distribution: Probability distribution of shape (num_states,) or
+                (batch_size, num_states)
+
+        Returns:
+            The alias tables of the distribution
+        """
+        key = _content_key(distribution)
+        table = self._alias_cache.get(key)
+        if table is not None:
+            self._alias_cache.move_to_end(key)
+            return table
+
+        table = AliasTable(distribution)
+        if self.alias_cache_size > 0:
+            self._alias_cache[key] = table
+            while len(self._alias_cache) > self.alias_cache_size:
+                self._alias_cache.popitem(last=False)
+        return table
+
+    def clear_alias_cache(self):
+        """Drop all cached alias tables."""
+        self._alias_cache.clear()
 
     def pcvl_sampler(
-        self, distribution: torch.Tensor, shots: int, method: str = None
+        self,
+        distribution: torch.Tensor,
+        shots: int,
+        method: str = None,
+        generator: torch.Generator | None = None,
+        return_counts: bool = False,
     ) -> torch.Tensor:
         """Apply sampling noise to a probability distribution.
 
         Args:
-            distribution: Input probability distribution tensor
-            method: Sampling method to use ('multinomial', 'binomial', or 'gaussian'), defaults to the initialized method
+            distribution: Input probability distribution tensor, of shape (num_states,) or
+                (batch_size, num_states). Sparse COO distributions are sampled over their
+                stored states only, and a sparse tensor with the same pattern is returned.
             shots: Number of measurement shots to simulate
+            method: Sampling method to use ('multinomial', 'binomial', or 'gaussian'), defaults to the initialized method
+            generator: Optional random generator, for reproducible sampling
+            return_counts: If True, return integer counts instead of frequencies
+                ('multinomial' and 'binomial' only)
 
         Returns:
-            Noisy probability distribution after sampling
+            Noisy probability distribution after sampling, or the counts of every state
 
         Raises:
             ValueError: If method is not one of the valid options
@@ -74,35 +134,45 @@ class SamplingProcess:
         if method is None:
             method = self.method
 
+        if distribution.is_sparse:
+            padded, slots = to_padded_rows(distribution)
+            sampled = self.pcvl_sampler(
+                padded, shots, method, generator=generator, return_counts=return_counts
+            )
+            return from_padded_rows(distribution, sampled, slots)
+
         if method == "multinomial":
-            if distribution.dim() == 1:
-                sampled_counts = torch.multinomial(
-                    distribution, num_samples=shots, replacement=True
+            if self.use_alias_tables:
+                counts = self.alias_table(distribution).sample_counts(
+                    shots, generator=generator
                 )
-                noisy_dist = torch.zeros_like(distribution)
-                for idx in sampled_counts:
-                    noisy_dist[idx] += 1
-                return noisy_dist / shots
             else:
-                batch_size = distribution.shape[0]
-                noisy_dists = []
-                for i in range(batch_size):
-                    sampled_counts = torch.multinomial(
-                        distribution[i], num_samples=shots, replacement=True
-                    )
-                    noisy_dist = torch.zeros_like(distribution[i])
-                    for idx in sampled_counts:
-                        noisy_dist[idx] += 1
-                    noisy_dists.append(noisy_dist / shots)
-                return torch.stack(noisy_dists)
+                counts = multinomial_counts(distribution, shots, generator=generator)
+            if return_counts:
+                return counts
+            return counts.to(distribution.dtype) / shots
 
         elif method == "binomial":
-            return torch.distributions.Binomial(shots, distribution).sample() / shots
+            counts = torch.binomial(
+                torch.full_like(distribution, shots),
+                distribution.clamp(0, 1),
+                generator=generator,
+            )
+            if return_counts:
+                return counts.long()
+            return counts / shots
 
         elif method == "gaussian":
+            if return_counts:
+                raise ValueError("Gaussian sampling cannot return integer counts")
             std_dev = torch.sqrt(distribution * (1 - distribution) / shots)
-            noise = torch.randn_like(distribution) * std_dev
-            noisy_dist = distribution + noise
+            noise = torch.randn(
+                distribution.shape,
+                generator=generator,
+                dtype=distribution.dtype,
+                device=distribution.device,
+            )
+            noisy_dist = distribution + noise * std_dev
             noisy_dist = torch.clamp(noisy_dist, 0, 1)
             noisy_dist = noisy_dist / noisy_dist.sum(dim=-1, keepdim=True)
             return noisy_dist
@@ -110,3 +180,93 @@ class SamplingProcess:
         raise ValueError(
             f"Invalid sampling method: {method}. Valid options are: {self.valid_methods}"
         )
+
+
+def _content_key(distribution: torch.Tensor) -> tuple:
+    """Cache key identifying a distribution by its shape, dtype, device and values."""
+    values = distribution.detach().contiguous().cpu().reshape(-1)
+    digest = hashlib.blake2b(values.view(torch.uint8).numpy().tobytes(), digest_size=16)
+    return (
+        tuple(distribution.shape),
+        distribution.dtype,
+        distribution.device,
+        digest.digest(),
+    )
+
+
+def multinomial_counts(
+    distribution: torch.Tensor,
+    shots: int,
+    generator: torch.Generator | None = None,
+) -> torch.Tensor:
+    """Draw multinomial shot counts for a batch of distributions.
+
+    When there are fewer shots than states, shots are drawn with a batched
+    ``torch.multinomial`` and accumulated with ``scatter_add_``, in O(shots).
+    Otherwise, counts are split recursively between the two halves of the state space
+    with binomial draws (conditional binomial decomposition of the multinomial), which
+    is exact and costs O(states) whatever the number of shots.
+
+    Args:
+        distribution: Non-negative weights of shape (num_states,) or (batch_size, num_states),
+            not necessarily normalized
+        shots: Number of shots drawn for every distribution
+        generator: Optional random generator, for reproducible sampling
+
+    Returns:
+        Integer counts (torch.long) with the shape of the distribution
+    """
+    probabilities = distribution.detach().clamp(min=0)
+    is_batched = probabilities.dim() == 2
+    if not is_batched:
+        probabilities = probabilities.unsqueeze(0)
+    batch_size, num_states = probabilities.shape
+
+    if shots <= 0:
+        counts = torch.zeros(
+            (batch_size, num_states), dtype=torch.long, device=probabilities.device
+        )
+    elif shots <= num_states:
+        draws = torch.multinomial(
+            probabilities, shots, replacement=True, generator=generator
+        )
+        counts = torch.zeros(
+            (batch_size, num_states), dtype=torch.long, device=probabilities.device
+        ).scatter_add_(1, draws, torch.ones_like(draws))
+    else:
+        counts = _binomial_split_counts(probabilities, shots, generator)
+
+    return counts if is_batched else counts.squeeze(0)
+
+
+def _binomial_split_counts(
+    probabilities: torch.Tensor, shots: int, generator: torch.Generator | None
+) -> torch.Tensor:
+    """Multinomial counts by binomial splitting over a binary tree of the states."""
+    batch_size, num_states = probabilities.shape
+    depth = max(num_states - 1, 0).bit_length()
+    # float64 keeps counts exact up to 2^53 shots
+    masses = torch.nn.functional.pad(
+        probabilities.to(torch.float64), (0, 2**depth - num_states)
+    )
+
+    # masses of the nodes of every level, from the leaves to the root
+    levels = [masses]
+    for _ in range(depth):
+        levels.append(levels[-1].view(batch_size, -1, 2).sum(dim=-1))
+
+    counts = torch.full(
+        (batch_size, 1), float(shots), dtype=torch.float64, device=masses.device
+    )
+    for children in reversed(levels[:-1]):
+        children = children.view(batch_size, -1, 2)
+        parent_mass = children.sum(dim=-1)
+        left_probability = torch.where(
+            parent_mass > 0,
+            children[..., 0] / torch.where(parent_mass > 0, parent_mass, 1.0),
+            0.0,
+        ).clamp(0, 1)
+        left = torch.binomial(counts, left_probability, generator=generator)
+        counts = torch.stack([left, counts - left], dim=-1).view(batch_size, -1)
+
+    return counts[:, :num_states].long()
@@ -0,0 +1,121 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Compact sparse representation of output distributions.
+
+Large bunched output spaces are dominated by negligible probabilities. Distributions
+can be truncated to a sparse COO tensor (``torch.sparse_coo_tensor``) holding only the
+significant states; the indices refer to the states of the dense distribution (e.g.
+``SLOSComputeGraph.final_keys``). The kept values are the exact, unnormalized
+probabilities and remain differentiable.
+"""
+
+import torch
+
+
+def sparsify_distribution(
+    distribution: torch.Tensor,
+    threshold: float | None = None,
+    mass: float | None = None,
+) -> torch.Tensor:
+    """Truncate a dense distribution to a sparse COO tensor.
+
+    Args:
+        distribution: Probability tensor of shape (num_states,) or (batch_size, num_states)
+        threshold: Only keep probabilities strictly above this value (default: keep
+            non-zero probabilities)
+        mass: If given, only keep the most probable states of every row, up to the
+            smallest set holding at least this fraction of the row's probability mass
+
+    Returns:
+        Sparse COO tensor with the shape of ``distribution``
+    """
+    if mass is not None and not 0 < mass <= 1:
+        raise ValueError(f"mass must be in (0, 1], got {mass}")
+
+    keep = distribution.detach() > (threshold or 0.0)
+    if mass is not None:
+        rows = distribution.detach().reshape(-1, distribution.shape[-1])
+        sorted_probs, order = rows.sort(dim=-1, descending=True)
+        mass_before = sorted_probs.cumsum(dim=-1) - sorted_probs
+        needed_sorted = mass_before < mass * rows.sum(dim=-1, keepdim=True)
+        needed = torch.zeros_like(needed_sorted).scatter_(-1, order, needed_sorted)
+        keep &= needed.reshape(distribution.shape)
+
+    indices = keep.nonzero().T
+    return torch.sparse_coo_tensor(
+        indices, distribution[keep], distribution.shape, check_invariants=False
+    ).coalesce()
+
+
+def discarded_mass(distribution: torch.Tensor, sparse: torch.Tensor) -> torch.Tensor:
+    """Probability mass dropped by a truncation, for every row of the distribution."""
+    kept = torch.sparse.sum(sparse, dim=-1)
+    if kept.is_sparse:
+        kept = kept.to_dense()
+    return distribution.sum(dim=-1) - kept
+
+
+def to_padded_rows(
+    sparse: torch.Tensor,
+) -> tuple[torch.Tensor, tuple[torch.Tensor, torch.Tensor]]:
+    """Gather the stored values of a sparse distribution into dense padded rows.
+
+    Args:
+        sparse: Sparse COO tensor of shape (num_states,) or (batch_size, num_states)
+
+    Returns:
+        - Values of shape (batch_size, max_nnz_per_row), zero-padded (batch_size is 1
+          for a 1D input)
+        - (rows, positions) of every stored value in the padded tensor, to scatter
+          results back with ``from_padded_rows``
+    """
+    sparse = sparse.coalesce()
+    indices = sparse.indices()
+    values = sparse.values()
+    if sparse.dim() == 1:
+        batch_size = 1
+        rows = torch.zeros_like(indices[0])
+    else:
+        batch_size = sparse.shape[0]
+        rows = indices[0]
+
+    row_counts = torch.bincount(rows, minlength=batch_size)
+    offsets = row_counts.cumsum(0) - row_counts
+    positions = torch.arange(rows.shape[0], device=rows.device) - offsets[rows]
+    width = int(row_counts.max().item()) if rows.numel() else 0
+
+    padded = values.new_zeros((batch_size, width)).index_put((rows, positions), values)
+    return padded, (rows, positions)
+
+
+def from_padded_rows(
+    sparse: torch.Tensor,
+    padded: torch.Tensor,
+    slots: tuple[torch.Tensor, torch.Tensor],
+) -> torch.Tensor:
+    """Build a sparse tensor with the pattern of ``sparse`` from padded row values."""
+    sparse = sparse.coalesce()
+    return torch.sparse_coo_tensor(
+        sparse.indices(), padded[slots], sparse.shape, check_invariants=False
+    ).coalesce()
@@ -28,10 +28,26 @@ from enum import Enum
 
 
 class OutputMappingStrategy(Enum):
-    """Strategy for mapping quantum probability distributions to classical outputs."""
+    """Strategy for mapping quantum probability distributions to classical outputs.
+
+    ``OCCUPATIONS`` and ``CORRELATIONS`` do not compute the distribution: they return
+    the mean photon number of every mode (and the second moments <n_i n_j>, i <= j)
+    directly from the circuit unitary, in polynomial time.
+    """
 
     LINEAR = "linear"
     GROUPING = "grouping"
     LEXGROUPING = "lexgrouping"
     MODGROUPING = "modgrouping"
     NONE = "none"
+    OCCUPATIONS = "occupations"
+    CORRELATIONS = "correlations"
+
+
+def observable_size(strategy: OutputMappingStrategy, n_modes: int) -> int | None:
+    """Number of features of an observable strategy, None for other strategies."""
+    if strategy == OutputMappingStrategy.OCCUPATIONS:
+        return n_modes
+    if strategy == OutputMappingStrategy.CORRELATIONS:
+        return n_modes + n_modes * (n_modes + 1) // 2
+    return None
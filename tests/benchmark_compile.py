@@ -0,0 +1,99 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Benchmarks of the compiled forward and backward passes of a QuantumLayer (CPU).
+
+Run with ``pytest tests/benchmark_compile.py``; compilation happens in the warm-up
+call, outside of the measured rounds. The benchmarks are skipped with
+``--benchmark-disable``, as compiling dominates their run time (the compiled forward
+pass is tested in ``test_layer.py``).
+"""
+
+import perceval as pcvl
+import pytest
+import torch
+
+import merlin as ML
+
+
+@pytest.fixture(autouse=True)
+def skip_disabled(benchmark):
+    if benchmark.disabled:
+        pytest.skip("benchmarks are disabled")
+
+
+def make_layer(n_modes: int, n_photons: int, compiled: bool) -> ML.QuantumLayer:
+    """Layer between two rectangular interferometers, with one encoding phase per
+    mode."""
+    left, right = (
+        pcvl.GenericInterferometer(
+            n_modes,
+            lambda i, side=side: pcvl.BS() // pcvl.PS(pcvl.P(f"theta_{side}{i}")),
+            shape=pcvl.InterferometerShape.RECTANGLE,
+        )
+        for side in ("l", "r")
+    )
+    encoding = pcvl.Circuit(n_modes)
+    for mode in range(n_modes):
+        encoding.add(mode, pcvl.PS(pcvl.P(f"x_{mode}")))
+    torch.manual_seed(0)
+    layer = ML.QuantumLayer(
+        input_size=n_modes,
+        output_size=4,
+        circuit=left // encoding // right,
+        input_state=[1, 0] * n_photons + [0] * (n_modes - 2 * n_photons),
+        trainable_parameters=["theta"],
+        input_parameters=["x"],
+        output_mapping_strategy=ML.OutputMappingStrategy.LEXGROUPING,
+        no_bunching=False,
+    )
+    if compiled:
+        layer.compile()
+    return layer
+
+
+def forward(layer, x):
+    with torch.no_grad():
+        return layer(x)
+
+
+def forward_backward(layer, x):
+    layer.zero_grad()
+    layer(x).square().sum().backward()
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize("n_modes, n_photons", [(8, 3), (12, 4)])
+def test_forward_benchmark(benchmark, n_modes, n_photons, compiled):
+    layer = make_layer(n_modes, n_photons, compiled)
+    x = torch.rand(32, n_modes)
+    forward(layer, x)
+    benchmark(forward, layer, x)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize("n_modes, n_photons", [(8, 3), (12, 4)])
+def test_backward_benchmark(benchmark, n_modes, n_photons, compiled):
+    layer = make_layer(n_modes, n_photons, compiled)
+    x = torch.rand(32, n_modes)
+    forward_backward(layer, x)
+    benchmark(forward_backward, layer, x)
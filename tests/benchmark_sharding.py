@@ -0,0 +1,58 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Benchmarks of the throughput of batch-sharded QuantumLayer training steps (CPU).
+
+Run with ``pytest tests/benchmark_sharding.py``. Every worker runs one torch thread on
+64 samples, as does the in-process reference (``num_workers=0``), so that a constant
+step time across worker counts means a throughput scaling linearly with the number of
+workers. Worker counts above the number of CPU cores are skipped.
+"""
+
+import os
+
+import pytest
+import torch
+from benchmark_compile import forward_backward, make_layer
+
+
+@pytest.fixture(autouse=True)
+def skip_disabled(benchmark):
+    if benchmark.disabled:
+        pytest.skip("benchmarks are disabled")
+
+
+@pytest.mark.parametrize("num_workers", [0, 1, 2, 4])
+def test_sharded_step_benchmark(benchmark, num_workers):
+    if num_workers > (os.cpu_count() or 1):
+        pytest.skip(f"{num_workers} workers need as many CPU cores")
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    layer = make_layer(12, 4, compiled=False).shard_batches(num_workers)
+    try:
+        x = torch.rand(64 * max(num_workers, 1), 12)
+        forward_backward(layer, x)
+        benchmark.extra_info["samples"] = x.shape[0]
+        benchmark(forward_backward, layer, x)
+    finally:
+        layer.shard_batches(0)
+        torch.set_num_threads(threads)
@@ -0,0 +1,174 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for the Clifford & Clifford shot sampler and the batched permanent.
+"""
+
+import itertools
+import math
+
+import perceval as pcvl
+import pytest
+import torch
+from helpers import random_unitary
+
+from merlin.core.process import ComputationProcessFactory
+from merlin.pcvl_pytorch import CliffordSampler, permanent
+from merlin.pcvl_pytorch.slos_torchscript import build_slos_distribution_computegraph
+
+
+def _naive_permanent(matrix):
+    n = matrix.shape[0]
+    return sum(
+        math.prod(matrix[i, sigma[i]] for i in range(n))
+        for sigma in itertools.permutations(range(n))
+    )
+
+
+class TestPermanent:
+    """Test suite for the batched Glynn permanent."""
+
+    @pytest.mark.parametrize("n", [0, 1, 2, 3, 5])
+    def test_matches_naive_permanent(self, n):
+        """Glynn's formula must match the definition of the permanent."""
+        matrix = torch.randn(n, n, dtype=torch.cdouble)
+        expected = _naive_permanent(matrix) if n else 1.0
+        assert torch.allclose(permanent(matrix), torch.as_tensor(expected).to(matrix))
+
+    def test_batched(self):
+        """Leading dimensions are treated as batch dimensions."""
+        matrices = torch.randn(2, 3, 4, 4, dtype=torch.cdouble)
+        result = permanent(matrices)
+        assert result.shape == (2, 3)
+        assert torch.allclose(result[1, 2], permanent(matrices[1, 2]))
+
+
+class TestCliffordSampler:
+    """Test suite for CliffordSampler."""
+
+    def test_counts_and_photon_number(self):
+        """Every shot is counted once and conserves the photon number."""
+        sampler = CliffordSampler(4, [1, 1, 0, 0])
+        keys, counts = sampler.sample(random_unitary(4), shots=200)
+
+        assert counts.shape == (len(keys),)
+        assert counts.sum().item() == 200
+        assert all(sum(key) == 2 for key in keys)
+
+    def test_batched_unitaries(self):
+        """Counts are returned for every unitary over the shared observed keys."""
+        sampler = CliffordSampler(4, [1, 0, 1, 0])
+        keys, counts = sampler.sample(random_unitary(4, batch_size=3), shots=150)
+
+        assert counts.shape == (3, len(keys))
+        assert torch.all(counts.sum(dim=1) == 150)
+
+    def test_matches_slos_distribution(self):
+        """Empirical frequencies converge to the exact SLOS distribution."""
+        torch.manual_seed(0)
+        input_state = [1, 1, 0, 1, 0]
+        unitary = random_unitary(5)
+        graph = build_slos_distribution_computegraph(5, 3, dtype=torch.float64)
+        slos_keys, probs = graph.compute(unitary, input_state)
+
+        shots = 20000
+        generator = torch.Generator().manual_seed(1)
+        keys, counts = CliffordSampler(5, input_state).sample(
+            unitary, shots, generator=generator
+        )
+        frequencies = dict(zip(keys, (counts / shots).tolist(), strict=True))
+
+        tvd = 0.5 * sum(
+            abs(p - frequencies.get(key, 0.0))
+            for key, p in zip(slos_keys, probs.tolist(), strict=True)
+        )
+        assert tvd < 0.03
+
+    def test_bunched_input_state(self):
+        """Several photons in one input mode are sampled from the right distribution."""
+        torch.manual_seed(2)
+        input_state = [2, 0, 1, 0]
+        unitary = random_unitary(4)
+        graph = build_slos_distribution_computegraph(4, 3, dtype=torch.float64)
+        slos_keys, probs = graph.compute(unitary, input_state)
+
+        shots = 20000
+        generator = torch.Generator().manual_seed(2)
+        keys, counts = CliffordSampler(4, input_state).sample(
+            unitary, shots, generator=generator
+        )
+        frequencies = dict(zip(keys, (counts / shots).tolist(), strict=True))
+
+        tvd = 0.5 * sum(
+            abs(p - frequencies.get(key, 0.0))
+            for key, p in zip(slos_keys, probs.tolist(), strict=True)
+        )
+        assert tvd < 0.03
+
+    def test_chunks_follow_memory_budget(self):
+        """Shots are propagated in chunks sized by the memory budget and n."""
+        small = CliffordSampler(6, [1, 1, 1, 1, 0, 0], memory_budget=4096)
+        large = CliffordSampler(6, [1, 1, 0, 0, 0, 0], memory_budget=4096)
+        assert small._shots_per_chunk(1, 16) < large._shots_per_chunk(1, 16)
+        assert small._shots_per_chunk(2, 16) < small._shots_per_chunk(1, 16)
+
+        keys, counts = small.sample(random_unitary(6), shots=100)
+        assert counts.sum().item() == 100
+
+    def test_no_bunching_rejects_collisions(self):
+        """In no-bunching mode, only collision-free states are counted."""
+        unitary = torch.tensor([[1, 1], [1, -1]], dtype=torch.cdouble) / math.sqrt(2)
+        keys, counts = CliffordSampler(2, [1, 1], no_bunching=True).sample(
+            unitary, shots=100
+        )
+        assert keys == []
+        assert counts.shape == (0,)
+
+    def test_reproducible_with_generator(self):
+        """The same generator seed gives the same samples."""
+        sampler = CliffordSampler(4, [1, 1, 0, 0], chunk_size=16)
+        unitary = random_unitary(4)
+        first = sampler.sample(unitary, 50, generator=torch.Generator().manual_seed(3))
+        second = sampler.sample(unitary, 50, generator=torch.Generator().manual_seed(3))
+        assert first[0] == second[0]
+        assert torch.equal(first[1], second[1])
+
+    def test_process_sample_does_not_build_graph(self):
+        """ComputationProcess.sample draws shots without building the SLOS graph."""
+        circuit = pcvl.GenericInterferometer(
+            6,
+            lambda i: pcvl.BS(theta=pcvl.P(f"theta_{i}")),
+        )
+        process = ComputationProcessFactory.create(
+            circuit=circuit,
+            input_state=[1, 0, 1, 0, 1, 0],
+            trainable_parameters=["theta"],
+            input_parameters=[],
+            no_bunching=False,
+        )
+        n_params = len(process.converter.spec_mappings["theta"])
+        keys, counts = process.sample([torch.rand(n_params)], shots=64)
+
+        assert process._simulation_graph is None
+        assert counts.sum().item() == 64
+        assert all(sum(key) == 3 for key in keys)
@@ -0,0 +1,172 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the SLOS graph distributed across processes."""
+
+import pytest
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from merlin.pcvl_pytorch.constraints import PhotonCountConstraint
+from merlin.pcvl_pytorch.distributed import DistributedSLOSGraph
+from merlin.pcvl_pytorch.slos_torchscript import build_slos_distribution_computegraph
+
+M = 5
+INPUT_STATE = [1, 0, 1, 0, 1]
+
+
+def random_unitary(batch_size: int) -> torch.Tensor:
+    torch.manual_seed(1)
+    matrix = torch.randn(batch_size, M, M, dtype=torch.cdouble)
+    return torch.linalg.qr(matrix)[0]
+
+
+def by_key(keys, probabilities: torch.Tensor) -> dict:
+    return dict(zip(keys, probabilities.unbind(-1), strict=True))
+
+
+def check_distributed(rank: int, world_size: int, store: str):
+    dist.init_process_group(
+        "gloo", init_method=f"file://{store}", rank=rank, world_size=world_size
+    )
+    try:
+        unitary = random_unitary(3)
+
+        # full distribution with keys, and gradients
+        graph = build_slos_distribution_computegraph(M, 3, dtype=torch.float64)
+        distributed = DistributedSLOSGraph(M, 3, dtype=torch.float64, chunk_size=7)
+        reference_unitary = unitary.clone().requires_grad_(True)
+        keys, expected = graph.compute(reference_unitary, INPUT_STATE)
+        weights = torch.rand(expected.shape, dtype=torch.float64)
+        (expected * weights).sum().backward()
+
+        dist_unitary = unitary.clone().requires_grad_(True)
+        dist_keys, probabilities = distributed.compute(dist_unitary, INPUT_STATE)
+        assert dist_keys == keys
+        torch.testing.assert_close(probabilities, expected)
+        (probabilities * weights).sum().backward()
+        grad = dist_unitary.grad.clone()
+        dist.all_reduce(grad)
+        torch.testing.assert_close(grad / world_size, reference_unitary.grad)
+
+        # every rank holds a balanced share of the final states
+        sizes = distributed.final_sizes
+        assert sum(sizes) == len(keys)
+        assert max(sizes) - min(sizes) <= 2
+        assert len(distributed.local_keys) == sizes[rank]
+
+        # local slices
+        _, local = distributed.compute(unitary, INPUT_STATE, gather=False)
+        start, end = distributed.local_range
+        torch.testing.assert_close(local, expected[:, start:end].detach())
+
+        # unbatched real unitary
+        rotation = torch.linalg.qr(torch.randn(M, M, dtype=torch.float64))[0]
+        _, expected = graph.compute(rotation, INPUT_STATE)
+        _, probabilities = distributed.compute(rotation, INPUT_STATE)
+        torch.testing.assert_close(probabilities, expected)
+
+        # grouped readout and renormalization
+        graph = build_slos_distribution_computegraph(
+            M, 3, no_bunching=True, dtype=torch.float64
+        )
+        distributed = DistributedSLOSGraph(M, 3, no_bunching=True, dtype=torch.float64)
+        _, expected = graph.compute(unitary, INPUT_STATE)
+        _, probabilities = distributed.compute(unitary, INPUT_STATE)
+        torch.testing.assert_close(probabilities, expected)
+        _, local = distributed.compute(unitary, INPUT_STATE, gather=False)
+        start, end = distributed.local_range
+        torch.testing.assert_close(local, expected[:, start:end])
+
+        group_indices = torch.arange(expected.shape[1]) % 4
+        readout_indices = graph.compose_readout_indices(group_indices)
+        _, expected = graph.compute(unitary, INPUT_STATE, readout_indices, 4)
+        readout_indices = distributed.compose_readout_indices(group_indices)
+        _, probabilities = distributed.compute(unitary, INPUT_STATE, readout_indices, 4)
+        torch.testing.assert_close(probabilities, expected)
+
+        # occupation caps and constraints
+        options = {
+            "max_occupation": 2,
+            "constraints": [PhotonCountConstraint((0, 1), min_photons=1)],
+        }
+        graph = build_slos_distribution_computegraph(
+            M, 3, dtype=torch.float64, **options
+        )
+        distributed = DistributedSLOSGraph(M, 3, dtype=torch.float64, **options)
+        keys, expected = graph.compute(unitary, INPUT_STATE)
+        dist_keys, probabilities = distributed.compute(unitary, INPUT_STATE)
+        assert dist_keys == keys
+        torch.testing.assert_close(probabilities, expected)
+        torch.testing.assert_close(distributed.truncated_mass, graph.truncated_mass)
+
+        # photons restricted to subsets of modes, in decreasing rank order
+        photon_modes = [[0, 1, 2], [1, 2, 3], [2, 3, 4]]
+        graph = build_slos_distribution_computegraph(
+            M, 3, dtype=torch.float64, photon_modes=photon_modes
+        )
+        distributed = DistributedSLOSGraph(
+            M, 3, dtype=torch.float64, photon_modes=photon_modes
+        )
+        keys, expected = graph.compute(unitary, INPUT_STATE)
+        dist_keys, probabilities = distributed.compute(unitary, INPUT_STATE)
+        assert dist_keys == sorted(keys, reverse=True)
+        expected = by_key(keys, expected)
+        for key, probability in by_key(dist_keys, probabilities).items():
+            torch.testing.assert_close(probability, expected[key])
+
+        # more ranks than states: some ranks own no state
+        graph = build_slos_distribution_computegraph(2, 1, dtype=torch.float64)
+        distributed = DistributedSLOSGraph(2, 1, dtype=torch.float64)
+        keys, expected = graph.compute(unitary[:, :2, :2], [1, 0])
+        dist_keys, probabilities = distributed.compute(unitary[:, :2, :2], [1, 0])
+        assert dist_keys == keys
+        torch.testing.assert_close(probabilities, expected)
+
+        # output mapping and threshold detection
+        for options in (
+            {"output_map_func": lambda s: (s[0], sum(s[1:])) if s[0] < 3 else None},
+            {"threshold_detection": True},
+        ):
+            graph = build_slos_distribution_computegraph(
+                M, 3, dtype=torch.float64, **options
+            )
+            distributed = DistributedSLOSGraph(M, 3, dtype=torch.float64, **options)
+            keys, expected = graph.compute(unitary, INPUT_STATE)
+            dist_keys, probabilities = distributed.compute(unitary, INPUT_STATE)
+            assert dist_keys == keys
+            torch.testing.assert_close(probabilities, expected)
+    finally:
+        dist.destroy_process_group()
+
+
+class TestDistributedSLOSGraph:
+    """Tests for DistributedSLOSGraph."""
+
+    def test_requires_process_group(self):
+        with pytest.raises(RuntimeError, match="initialized"):
+            DistributedSLOSGraph(M, 3)
+
+    def test_matches_single_process(self, tmp_path):
+        # three ranks, for unequal ranges and exchanges between every pair
+        mp.spawn(check_distributed, args=(3, str(tmp_path / "store")), nprocs=3)
@@ -24,6 +24,7 @@
 Tests for the main QuantumLayer class.
 """
 
+import perceval as pcvl
 import pytest
 import torch
 
@@ -319,3 +320,145 @@ class TestQuantumLayer:
         # Output should be probability distribution
         assert torch.all(output >= -1e6)  # Reasonable bounds
         assert output.shape[0] == 2
+
+    def test_threshold_detection_layer(self):
+        """Test a layer measuring click patterns of threshold detectors."""
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.PARALLEL_COLUMNS, n_modes=4, n_photons=3
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment, input_size=2, output_size=3
+        )
+        layer = ML.QuantumLayer(
+            input_size=2,
+            ansatz=ansatz,
+            no_bunching=False,
+            threshold_detection=True,
+        )
+
+        output = layer(torch.rand(5, 2))
+        patterns = layer.computation_process.simulation_graph.mapped_keys
+
+        assert output.shape == (5, 3)
+        assert len(patterns) == 14
+        assert all(set(pattern) <= {0, 1} for pattern in patterns)
+
+    def test_max_occupation_reports_truncated_mass(self):
+        """Test a bunched layer with an occupation cap."""
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.PARALLEL_COLUMNS, n_modes=4, n_photons=3
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment, input_size=2, output_size=3
+        )
+        layer = ML.QuantumLayer(
+            input_size=2, ansatz=ansatz, no_bunching=False, max_occupation=2
+        )
+
+        output = layer(torch.rand(5, 2))
+        keys = layer.computation_process.simulation_graph.final_keys
+
+        assert output.shape == (5, 3)
+        assert len(keys) == 16
+        assert layer.truncated_mass.shape == (5,)
+        assert torch.all((layer.truncated_mass >= 0) & (layer.truncated_mass <= 1))
+
+    def test_per_sample_input_states(self):
+        """Test a batch where every sample has its own input Fock state."""
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.PARALLEL_COLUMNS, n_modes=4, n_photons=2
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment,
+            input_size=2,
+            output_mapping_strategy=ML.OutputMappingStrategy.NONE,
+        )
+        layer = ML.QuantumLayer(input_size=2, ansatz=ansatz)
+        x = torch.rand(4, 2)
+        input_states = torch.tensor([
+            [1, 0, 1, 0],
+            [0, 1, 0, 1],
+            [1, 0, 1, 0],
+            [1, 1, 0, 0],
+        ])
+
+        output = layer(x, input_state=input_states)
+        output.sum().backward()
+
+        params = layer.prepare_parameters([x])
+        unitary = layer.computation_process.converter.to_tensor(*params)
+        graph = layer.computation_process.simulation_graph
+        for i, state in enumerate(input_states.tolist()):
+            _, expected = graph.compute(unitary[i], state)
+            assert torch.allclose(output[i], expected)
+        assert any(p.grad is not None for p in layer.parameters())
+
+        with pytest.raises(ValueError):
+            layer(x, input_state=torch.tensor([[1, 1, 1, 0]] * 4))
+
+    @pytest.mark.parametrize(
+        "strategy",
+        [ML.OutputMappingStrategy.LINEAR, ML.OutputMappingStrategy.LEXGROUPING],
+    )
+    def test_compiled_forward(self, strategy):
+        """Test that a compiled layer traces as one graph and matches eager mode."""
+        circuit = (
+            pcvl.Circuit(4)
+            // pcvl.BS()
+            // (2, pcvl.BS())
+            // (0, pcvl.PS(pcvl.P("in_0")))
+            // (2, pcvl.PS(pcvl.P("in_1")))
+            // (1, pcvl.BS.Ry(pcvl.P("theta_0")))
+            // (0, pcvl.PS(pcvl.P("theta_1")))
+            // (2, pcvl.BS.H(pcvl.P("theta_2"), phi_tr=pcvl.P("theta_3")))
+        )
+        kwargs = {
+            "input_size": 2,
+            "output_size": 3,
+            "circuit": circuit,
+            "input_state": [1, 0, 1, 0],
+            "trainable_parameters": ["theta"],
+            "input_parameters": ["in"],
+            "output_mapping_strategy": strategy,
+            "no_bunching": False,
+            "dtype": torch.float64,
+        }
+        layer = ML.QuantumLayer(**kwargs)
+        compiled = ML.QuantumLayer(**kwargs)
+        compiled.load_state_dict(layer.state_dict())
+        compiled.compile(backend="aot_eager", fullgraph=True)
+        x = torch.rand(6, 2, dtype=torch.float64)
+
+        expected = layer(x)
+        output = compiled(x)
+        expected.square().sum().backward()
+        output.square().sum().backward()
+
+        assert torch.allclose(output, expected, atol=1e-10)
+        for name, param in layer.named_parameters():
+            compiled_grad = compiled.get_parameter(name).grad
+            assert torch.allclose(compiled_grad, param.grad, atol=1e-10)
+        assert len(compiled._compiled_simulations) == 1
+
+    @pytest.mark.parametrize("dtype", [torch.float16, torch.bfloat16])
+    def test_low_precision_layer(self, dtype):
+        """Test a layer simulated with low-precision amplitudes."""
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.PARALLEL_COLUMNS, n_modes=6, n_photons=3
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment, input_size=2, output_size=4
+        )
+        layer = ML.QuantumLayer(input_size=2, ansatz=ansatz, dtype=dtype)
+        reference = ML.QuantumLayer(input_size=2, ansatz=ansatz, dtype=torch.float64)
+        reference.load_state_dict({
+            name: tensor.double() for name, tensor in layer.state_dict().items()
+        })
+        x = torch.rand(8, 2)
+
+        output = layer(x.to(dtype))
+        output.float().sum().backward()
+
+        assert output.dtype == dtype
+        assert torch.allclose(output.double(), reference(x.double()), atol=5e-2)
+        assert all(p.grad is not None for p in layer.parameters())
@@ -26,7 +26,7 @@ import torch
 from perceval.components import BS, PERM, PS, Circuit, Unitary
 from perceval.utils import Matrix, Parameter
 
-from merlin.pcvl_pytorch import CircuitConverter
+from merlin.pcvl_pytorch import CircuitConverter, CircuitProgram
 
 
 def test_ps_to_torch():
@@ -323,3 +323,70 @@ def test_circuit_with_perm_and_batch():
         exptd_u = torch.tensor(circ.compute_unitary(), dtype=torch.complex64)
 
         torch.allclose(torch_tensor[batch_idx], exptd_u)
+
+
+def test_real_orthogonal_circuit():
+    circ = Circuit(4)
+    for i in range(3):
+        circ.add(i, BS.Ry(Parameter(f"t{i}")))
+    circ.add(1, PERM([1, 0]))
+    circ.add(1, BS.H(Parameter("t3"), phi_tl=np.pi, phi_br=np.pi))
+    circ.add(0, BS.H())
+
+    torch_conv = CircuitConverter(circ, ["t"], dtype=torch.float64)
+    params = torch.rand(3, 4, dtype=torch.float64, requires_grad=True)
+    real_u = torch_conv.to_tensor(params, real=True)
+    complex_u = torch_conv.to_tensor(params)
+
+    assert torch_conv.is_real
+    assert real_u.dtype == torch.float64
+    assert real_u.requires_grad
+    assert torch.allclose(complex_u.imag, torch.zeros_like(real_u))
+    assert torch.allclose(complex_u.real, real_u)
+
+
+def test_real_orthogonal_circuit_float32():
+    # a fixed PS(pi) compiles to -1 - 8.7e-08j in complex64
+    circ = Circuit(2) // BS.Ry(Parameter("t")) // (0, PS(np.pi)) // BS.H()
+    torch_conv = CircuitConverter(circ, ["t"], dtype=torch.float32)
+    params = torch.rand(3, 1)
+
+    assert torch_conv.is_real
+    assert torch.allclose(
+        torch_conv.to_tensor(params, real=True), torch_conv.to_tensor(params).real
+    )
+
+
+@pytest.mark.parametrize(
+    "circ",
+    [
+        Circuit(2) // BS.Rx(Parameter("t")),
+        Circuit(2) // BS.Ry(Parameter("t")) // PS(Parameter("p")),
+        Circuit(2) // BS.Ry(Parameter("t"), phi_tr=Parameter("p")),
+        Circuit(2) // BS.Ry(Parameter("t")) // PS(0.3),
+    ],
+)
+def test_complex_circuit_is_not_real(circ):
+    torch_conv = CircuitConverter(circ)
+
+    assert not torch_conv.is_real
+    with pytest.raises(ValueError, match="not real orthogonal"):
+        torch_conv.to_tensor(torch.rand(len(circ.get_parameters())), real=True)
+
+
+def test_circuit_program_matches_converter():
+    circ = (
+        Circuit(3)
+        // BS.Rx(Parameter("t0"), phi_tl=Parameter("p0"))
+        // (1, BS.Ry(Parameter("t1"), phi_br=0.4))
+        // (0, PS(Parameter("p1")))
+        // (1, BS.H(Parameter("t2"), phi_bl=Parameter("p2"), phi_tr=0.1))
+        // (0, Unitary(Matrix.random_unitary(3)))
+    )
+    torch_conv = CircuitConverter(circ, ["t", "p"], dtype=torch.float64)
+    program = CircuitProgram(torch_conv)
+    params = [torch.rand(5, 3, dtype=torch.float64) for _ in range(2)]
+
+    u_real, u_imag = program(*params)
+
+    assert torch.allclose(torch.complex(u_real, u_imag), torch_conv.to_tensor(*params))
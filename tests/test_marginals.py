@@ -0,0 +1,170 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for marginal distributions over watched modes."""
+
+import pytest
+import torch
+from helpers import random_unitary
+
+import merlin as ML
+from merlin.core.process import ComputationProcessFactory
+from merlin.pcvl_pytorch import MarginalComputeGraph
+from merlin.pcvl_pytorch.slos_torchscript import build_slos_distribution_computegraph
+
+
+def _full_marginal(unitary, input_state, watched_modes, keys):
+    """Marginal of the full SLOS distribution, summed state by state."""
+    m, n = len(input_state), sum(input_state)
+    graph = build_slos_distribution_computegraph(
+        m, n, no_bunching=False, dtype=torch.float64
+    )
+    states, distribution = graph.compute(unitary, input_state)
+    index = {key: i for i, key in enumerate(keys)}
+    target = torch.tensor([
+        index[tuple(state[mode] for mode in watched_modes)] for state in states
+    ])
+    marginal = distribution.new_zeros((*distribution.shape[:-1], len(keys)))
+    return marginal.index_add_(-1, target, distribution)
+
+
+class TestMarginalComputeGraph:
+    """Tests for MarginalComputeGraph."""
+
+    @pytest.mark.parametrize(
+        "input_state, watched_modes",
+        [
+            ([1, 0, 2, 0, 1, 0, 0, 1, 0], [8, 3]),  # unwatched modes compressed
+            ([1, 1, 0, 1, 1, 0], [0, 2, 5]),  # fewer unwatched than input modes
+        ],
+    )
+    def test_matches_full_distribution(self, input_state, watched_modes):
+        unitary = random_unitary(len(input_state), batch_size=3)
+        graph = MarginalComputeGraph(
+            len(input_state), sum(input_state), watched_modes, dtype=torch.float64
+        )
+
+        keys, marginal = graph.compute(unitary, input_state)
+
+        assert len(keys) == graph.size
+        assert all(sum(key) <= sum(input_state) for key in keys)
+        expected = _full_marginal(unitary, input_state, watched_modes, keys)
+        assert torch.allclose(marginal, expected)
+
+    def test_gradients_match_full_distribution(self):
+        input_state = [1, 0, 1, 0, 0, 1, 0]
+        unitary = random_unitary(7).requires_grad_()
+        graph = MarginalComputeGraph(7, 3, [6], dtype=torch.float64)
+
+        keys, marginal = graph.compute(unitary, input_state)
+        weights = torch.arange(len(keys), dtype=torch.float64)
+        (grad,) = torch.autograd.grad(marginal @ weights, unitary)
+        expected = _full_marginal(unitary, input_state, [6], keys)
+        (expected_grad,) = torch.autograd.grad(expected @ weights, unitary)
+
+        assert torch.allclose(grad, expected_grad)
+
+    def test_grouped_readout(self):
+        input_state = [1, 1, 0, 0, 1]
+        unitary = random_unitary(5)
+        graph = MarginalComputeGraph(5, 3, [3, 4], dtype=torch.float64)
+        _, marginal = graph.compute(unitary, input_state)
+        groups = torch.tensor([sum(key) for key in graph.keys])
+
+        _, grouped = graph.compute(
+            unitary, input_state, graph.compose_readout_indices(groups), 4
+        )
+
+        expected = marginal.new_zeros(4).index_add_(0, groups, marginal)
+        assert torch.allclose(grouped, expected)
+
+    def test_invalid_watched_modes(self):
+        with pytest.raises(ValueError):
+            MarginalComputeGraph(4, 2, [1, 1])
+        with pytest.raises(ValueError):
+            MarginalComputeGraph(4, 2, [4])
+
+
+class TestMarginalLayer:
+    """Tests for layers watching a subset of modes."""
+
+    def test_process_rejects_no_bunching(self):
+        circuit, _ = ML.CircuitGenerator.generate_circuit(ML.CircuitType.SERIES, 4, 2)
+        process = ComputationProcessFactory.create(
+            circuit=circuit,
+            input_state=[1, 0, 1, 0],
+            trainable_parameters=["phi_"],
+            input_parameters=["pl"],
+            no_bunching=True,
+            watched_modes=[3],
+        )
+
+        with pytest.raises(ValueError):
+            _ = process.simulation_graph
+
+    @pytest.mark.parametrize(
+        "call",
+        [
+            lambda process: process.state_space_reduction(),
+            lambda process: process.compute_approximate([], threshold=1e-3),
+            lambda process: process.compute_sectors([], efficiency=0.9),
+        ],
+        ids=["state_space_reduction", "compute_approximate", "compute_sectors"],
+    )
+    def test_process_rejects_full_space_methods(self, call):
+        circuit, _ = ML.CircuitGenerator.generate_circuit(ML.CircuitType.SERIES, 5, 2)
+        process = ComputationProcessFactory.create(
+            circuit=circuit,
+            input_state=[1, 1, 0, 1, 0],
+            trainable_parameters=["phi_"],
+            input_parameters=["pl"],
+            no_bunching=False,
+            watched_modes=[3, 4],
+        )
+
+        with pytest.raises(ValueError, match="marginals"):
+            call(process)
+
+    def test_layer_watching_last_modes(self):
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.SERIES, n_modes=30, n_photons=4
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment, input_size=2, output_size=3
+        )
+        layer = ML.QuantumLayer(
+            input_size=2,
+            ansatz=ansatz,
+            no_bunching=False,
+            watched_modes=[27, 28, 29],
+        )
+
+        output = layer(torch.rand(5, 2))
+        output.sum().backward()
+
+        graph = layer.computation_process.simulation_graph
+        assert isinstance(graph, MarginalComputeGraph)
+        # 3 watched modes and 4 photons: C(7, 4) patterns instead of C(33, 4) states
+        assert len(graph.keys) == 35
+        assert all(reduced.m <= 7 for reduced, _ in graph._graphs.values())
+        assert output.shape == (5, 3)
+        assert any(p.grad is not None for p in layer.parameters())
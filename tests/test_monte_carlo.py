@@ -0,0 +1,143 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for the Monte Carlo permanent and probability estimators.
+"""
+
+import perceval as pcvl
+import pytest
+import torch
+from helpers import random_unitary
+
+from merlin.core import MonteCarloComputationProcess
+from merlin.pcvl_pytorch import (
+    estimate_output_probabilities,
+    estimate_permanent,
+    permanent,
+)
+from merlin.pcvl_pytorch.slos_torchscript import build_slos_distribution_computegraph
+
+
+def _process(**kwargs):
+    circuit = pcvl.GenericInterferometer(
+        5,
+        lambda i: pcvl.BS(theta=pcvl.P(f"theta_{i}")),
+    )
+    process = MonteCarloComputationProcess(
+        circuit=circuit,
+        input_state=[1, 0, 1, 0, 1],
+        trainable_parameters=["theta"],
+        input_parameters=[],
+        dtype=torch.float64,
+        no_bunching=False,
+        **kwargs,
+    )
+    n_params = len(process.converter.spec_mappings["theta"])
+    return process, [torch.rand(n_params, dtype=torch.float64, requires_grad=True)]
+
+
+class TestEstimators:
+    """Tests for the Gurvits estimators."""
+
+    def test_permanent_within_standard_errors(self):
+        generator = torch.Generator().manual_seed(0)
+        matrix = random_unitary(6, batch_size=4)[..., :4, :4]
+
+        estimate, error = estimate_permanent(matrix, samples=20000, generator=generator)
+
+        assert torch.all((estimate - permanent(matrix)).abs() < 5 * error)
+
+    def test_single_photon_is_exact(self):
+        unitary = random_unitary(3)
+
+        estimate, error = estimate_output_probabilities(
+            unitary, [0, 1, 0], [(1, 0, 0), (0, 0, 1)], samples=16
+        )
+
+        assert torch.allclose(estimate, unitary[[0, 2], 1].abs().square())
+        assert torch.allclose(error, torch.zeros(2, dtype=error.dtype))
+
+    def test_probabilities_match_slos(self):
+        generator = torch.Generator().manual_seed(1)
+        unitary = random_unitary(5, batch_size=2)
+        input_state = [2, 0, 1, 0, 0]
+        graph = build_slos_distribution_computegraph(
+            5, 3, no_bunching=False, dtype=torch.float64
+        )
+        keys, exact = graph.compute(unitary, input_state)
+        states = list(keys)[::5]
+
+        estimate, error = estimate_output_probabilities(
+            unitary, input_state, states, samples=40000, generator=generator
+        )
+
+        assert estimate.shape == error.shape == (2, len(states))
+        expected = exact[:, graph.state_to_index(states)]
+        assert torch.all((estimate - expected).abs() < 5 * error + 1e-9)
+
+    def test_rejects_wrong_photon_number(self):
+        with pytest.raises(ValueError):
+            estimate_output_probabilities(
+                random_unitary(3), [1, 1, 0], [(1, 0, 0)], samples=10
+            )
+
+
+class TestMonteCarloComputationProcess:
+    """Tests for the Monte Carlo computation process."""
+
+    def test_compute_is_differentiable(self):
+        process, parameters = _process(
+            output_states=[(1, 1, 1, 0, 0), (0, 0, 1, 1, 1)], samples=2000
+        )
+
+        estimates = process.compute(parameters)
+        estimates.sum().backward()
+
+        assert estimates.shape == (2,)
+        assert process.standard_errors.shape == (2,)
+        assert parameters[0].grad is not None
+        assert process._simulation_graph is None
+
+    def test_compute_grouped_readout(self):
+        process, parameters = _process(
+            output_states=[(1, 1, 1, 0, 0), (0, 0, 1, 1, 1), (1, 0, 1, 0, 1)]
+        )
+        generator_state = torch.get_rng_state()
+        estimates = process.compute(parameters)
+        torch.set_rng_state(generator_state)
+        grouped = process.compute(parameters, torch.tensor([1, 0, 1]), 2)
+
+        assert grouped.shape == (2,)
+        torch.testing.assert_close(grouped[0], estimates[1])
+        torch.testing.assert_close(grouped[1], estimates[0] + estimates[2])
+
+    def test_estimate_observable(self):
+        process, parameters = _process()
+
+        frequencies, errors = process.estimate_observable(
+            parameters, lambda state: state[0], n_outcomes=4, shots=500
+        )
+
+        assert frequencies.shape == errors.shape == (4,)
+        assert torch.isclose(frequencies.sum(), torch.tensor(1.0))
+        assert torch.all(errors >= 0)
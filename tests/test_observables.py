@@ -0,0 +1,123 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the polynomial-time mode-occupation observables."""
+
+import perceval as pcvl
+import torch
+from helpers import random_unitary
+
+import merlin as ML
+from merlin.core.process import ComputationProcessFactory
+from merlin.pcvl_pytorch import mode_correlations, mode_occupations
+from merlin.pcvl_pytorch.slos_torchscript import build_slos_distribution_computegraph
+
+
+class TestModeObservables:
+    """Tests for mode_occupations and mode_correlations."""
+
+    def test_matches_slos_moments(self):
+        input_state = [2, 0, 1, 1, 0]
+        unitary = random_unitary(5, batch_size=3)
+        graph = build_slos_distribution_computegraph(
+            5, 4, no_bunching=False, dtype=torch.float64
+        )
+        keys, distribution = graph.compute(unitary, input_state)
+        states = torch.tensor(list(keys), dtype=torch.float64)
+
+        means = distribution @ states
+        second = torch.einsum("bk,ki,kj->bij", distribution, states, states)
+
+        assert torch.allclose(mode_occupations(unitary, input_state), means)
+        assert torch.allclose(mode_correlations(unitary, input_state), second)
+
+    def test_hong_ou_mandel(self):
+        unitary = torch.tensor([[1, 1], [1, -1]], dtype=torch.cdouble) / 2**0.5
+
+        correlations = mode_correlations(unitary, [1, 1])
+
+        # photons always leave together: no coincidence, <n^2> = 2 in each mode
+        assert torch.isclose(correlations[0, 1], torch.tensor(0.0, dtype=torch.float64))
+        assert torch.allclose(
+            correlations.diagonal(), torch.tensor([2.0, 2.0], dtype=torch.float64)
+        )
+
+    def test_gradients(self):
+        unitary = random_unitary(4).requires_grad_()
+
+        mode_correlations(unitary, [1, 1, 0, 1])[0, 2].backward()
+
+        assert unitary.grad is not None
+        assert torch.isfinite(unitary.grad).all()
+
+
+class TestObservableReadout:
+    """Tests for the observable output strategies."""
+
+    def test_process_does_not_build_graph(self):
+        circuit = pcvl.GenericInterferometer(
+            5, lambda i: pcvl.BS(theta=pcvl.P(f"theta_{i}"))
+        )
+        process = ComputationProcessFactory.create(
+            circuit=circuit,
+            input_state=[1, 0, 1, 0, 1],
+            trainable_parameters=["theta"],
+            input_parameters=[],
+            no_bunching=False,
+            dtype=torch.float64,
+        )
+        n_params = len(process.converter.spec_mappings["theta"])
+        parameters = [torch.rand(n_params, dtype=torch.float64)]
+
+        features = process.compute_observables(parameters, correlations=True)
+
+        assert process._simulation_graph is None
+        assert features.shape == (5 + 15,)
+        keys, distribution = process.simulation_graph.compute(
+            process.converter.to_tensor(*parameters), [1, 0, 1, 0, 1]
+        )
+        states = torch.tensor(list(keys), dtype=torch.float64)
+        assert torch.allclose(features[:5], distribution @ states)
+        assert torch.allclose(
+            features[5 + 1], distribution @ (states[:, 0] * states[:, 1])
+        )
+
+    def test_layer_with_many_modes(self):
+        # ~8e8 bunched output states: the distribution could not be simulated
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.SERIES, n_modes=24, n_photons=12
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment,
+            input_size=2,
+            output_mapping_strategy=ML.OutputMappingStrategy.CORRELATIONS,
+        )
+        layer = ML.QuantumLayer(input_size=2, ansatz=ansatz, no_bunching=False)
+
+        output = layer(torch.rand(4, 2))
+        output.sum().backward()
+
+        assert layer.computation_process._simulation_graph is None
+        assert output.shape == (4, 24 + 300)
+        photons = output[:, :24].sum(dim=-1)
+        assert torch.allclose(photons, torch.full((4,), 12.0), atol=1e-3)
+        assert any(p.grad is not None for p in layer.parameters())
@@ -166,6 +166,16 @@ class TestLexGroupingMapper:
         assert input_dist.grad is not None
         assert not torch.allclose(input_dist.grad, torch.zeros_like(input_dist.grad))
 
+    def test_lexgrouping_sparse_input(self):
+        """Test that sparse distributions are grouped like their dense version."""
+        mapper = ML.LexGroupingMapper(input_size=7, output_size=3)
+
+        dist = torch.tensor([[0.2, 0.0, 0.0, 0.5, 0.0, 0.3, 0.0], [0.0] * 6 + [1.0]])
+        output = mapper(dist.to_sparse())
+
+        assert not output.is_sparse
+        assert torch.allclose(output, mapper(dist))
+
 
 class TestModGroupingMapper:
     """Test suite for ModGroupingMapper."""
@@ -496,3 +506,32 @@ class TestOutputMappingIntegration:
             assert torch.allclose(outputs[0], outputs[i], atol=1e-6), (
                 f"Output {i} differs from output 0"
             )
+
+    def test_fused_grouping_readout_matches_mapper(self):
+        """Test that the grouping fused into the SLOS readout matches the mapper."""
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.PARALLEL_COLUMNS, n_modes=5, n_photons=2
+        )
+
+        for strategy in [
+            ML.OutputMappingStrategy.LEXGROUPING,
+            ML.OutputMappingStrategy.MODGROUPING,
+        ]:
+            ansatz = ML.AnsatzFactory.create(
+                PhotonicBackend=experiment,
+                input_size=2,
+                output_size=3,
+                output_mapping_strategy=strategy,
+                dtype=torch.float64,
+            )
+            layer = ML.QuantumLayer(input_size=2, ansatz=ansatz, dtype=torch.float64)
+            assert layer.readout_indices is not None
+
+            x = torch.rand(4, 2, dtype=torch.float64)
+            fused = layer(x)
+
+            params = layer.prepare_parameters([x])
+            distribution = layer.computation_process.compute(params)
+            expected = layer.output_mapping(distribution)
+
+            assert torch.allclose(fused, expected, atol=1e-10)
@@ -30,6 +30,9 @@ import pytest
 import torch
 
 import merlin as ML
+from merlin.sampling.alias import AliasTable
+from merlin.sampling.process import multinomial_counts
+from merlin.sampling.sparse import discarded_mass, sparsify_distribution
 
 
 class TestSamplingProcess:
@@ -134,8 +137,234 @@ class TestSamplingProcess:
         assert torch.all(result >= 0)
         assert torch.allclose(result.sum(), torch.tensor(1.0), atol=1e-6)
 
+    def test_multinomial_counts_output(self):
+        """Test integer count output of the multinomial sampler."""
+        sampler = ML.SamplingProcess()
+
+        dist = torch.rand(3, 6)
+        dist = dist / dist.sum(dim=1, keepdim=True)
+
+        counts = sampler.pcvl_sampler(dist, shots=4, return_counts=True)
+        assert counts.dtype == torch.long
+        assert torch.all(counts.sum(dim=1) == 4)
+
+        counts = sampler.pcvl_sampler(dist, shots=10**7, return_counts=True)
+        assert counts.dtype == torch.long
+        assert torch.all(counts.sum(dim=1) == 10**7)
+        assert torch.allclose(counts / 10**7, dist, atol=1e-3)
+
+    def test_multinomial_counts_zero_shots(self):
+        """Test that drawing no shots gives zero counts."""
+        dist = torch.tensor([[0.25, 0.75], [1.0, 0.0]])
+        counts = multinomial_counts(dist, 0)
+        assert counts.dtype == torch.long
+        assert torch.equal(counts, torch.zeros(2, 2, dtype=torch.long))
+        assert torch.equal(multinomial_counts(dist[0], 0), torch.zeros(2).long())
+
+    def test_multinomial_zero_probability_states(self):
+        """Test that states with zero probability are never sampled."""
+        sampler = ML.SamplingProcess()
+
+        dist = torch.tensor([[0.0, 0.5, 0.0, 0.5, 0.0], [1.0, 0.0, 0.0, 0.0, 0.0]])
+        for shots in [3, 1000]:
+            counts = sampler.pcvl_sampler(dist, shots=shots, return_counts=True)
+            assert torch.all(counts[dist == 0] == 0)
+            assert counts[1, 0] == shots
+
+    @pytest.mark.parametrize("method", ["multinomial", "binomial", "gaussian"])
+    @pytest.mark.parametrize("shots", [5, 5000])
+    def test_sampling_reproducible_with_generator(self, method, shots):
+        """Test that a seeded generator makes sampling reproducible."""
+        sampler = ML.SamplingProcess()
+
+        dist = torch.tensor([[0.1, 0.2, 0.3, 0.4], [0.25, 0.25, 0.25, 0.25]])
+        first = sampler.pcvl_sampler(
+            dist, shots, method=method, generator=torch.Generator().manual_seed(7)
+        )
+        second = sampler.pcvl_sampler(
+            dist, shots, method=method, generator=torch.Generator().manual_seed(7)
+        )
+
+        assert torch.equal(first, second)
+
+
+class TestAliasSampling:
+    """Test suite for alias-table sampling."""
+
+    def test_alias_table_matches_distribution(self):
+        """Test that alias tables encode exactly the input distribution."""
+        dist = torch.rand(4, 50, dtype=torch.float64) ** 3
+        dist[:, :5] = 0
+        table = AliasTable(dist)
+
+        implied = torch.zeros_like(dist)
+        implied.scatter_add_(1, table.own_states, table.prob / 50)
+        implied.scatter_add_(1, table.alias_states, (1 - table.prob) / 50)
+
+        assert torch.allclose(implied, dist / dist.sum(dim=1, keepdim=True))
+
+    def test_alias_sampling_counts(self):
+        """Test alias-table sampling through SamplingProcess."""
+        sampler = ML.SamplingProcess(use_alias_tables=True)
+
+        dist = torch.tensor([[0.1, 0.2, 0.3, 0.4], [0.0, 0.0, 1.0, 0.0]])
+        counts = sampler.pcvl_sampler(dist, shots=100000, return_counts=True)
+
+        assert torch.all(counts.sum(dim=1) == 100000)
+        assert counts[1, 2] == 100000
+        assert torch.allclose(counts[0] / 100000, dist[0], atol=1e-2)
+
+    def test_alias_cache_reuse_and_invalidation(self):
+        """Test that alias tables are cached per content and rebuilt after changes."""
+        sampler = ML.SamplingProcess(use_alias_tables=True)
+
+        dist = torch.tensor([0.5, 0.5, 0.0])
+        table = sampler.alias_table(dist)
+        assert sampler.alias_table(dist) is table
+
+        # an equal but distinct tensor shares the tables
+        assert sampler.alias_table(dist.clone()) is table
+        assert sampler.alias_table(dist.double()) is not table
+
+        # in-place modification invalidates the cached tables
+        dist.copy_(torch.tensor([0.0, 0.0, 1.0]))
+        counts = sampler.pcvl_sampler(dist, shots=100, return_counts=True)
+        assert counts[2] == 100
+
+    def test_alias_cache_hits_through_layer(self, monkeypatch):
+        """Test that repeated eval forward passes of a layer reuse the alias tables."""
+        builds = []
+
+        class CountingAliasTable(AliasTable):
+            def __init__(self, distribution):
+                builds.append(distribution.shape)
+                super().__init__(distribution)
+
+        monkeypatch.setattr("merlin.sampling.process.AliasTable", CountingAliasTable)
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.PARALLEL_COLUMNS, n_modes=4, n_photons=2
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment, input_size=2, output_size=3
+        )
+        layer = ML.QuantumLayer(
+            input_size=2, ansatz=ansatz, shots=1000, use_alias_tables=True
+        )
+        layer.eval()
+        x = torch.rand(5, 2)
+
+        with torch.no_grad():
+            first = layer(x, apply_sampling=True)
+            second = layer(x, apply_sampling=True)
+            assert len(builds) == 1
+            layer(torch.rand(5, 2), apply_sampling=True)
+            assert len(builds) == 2
+
+            layer.set_sampling_config(use_alias_tables=False)
+            layer(x, apply_sampling=True)
+            assert len(builds) == 2
+
+        assert first.shape == second.shape
+        assert not torch.equal(first, second)
+
+    def test_alias_cache_size(self):
+        """Test that the cache keeps at most alias_cache_size entries."""
+        sampler = ML.SamplingProcess(use_alias_tables=True, alias_cache_size=2)
+
+        dists = [torch.rand(5) for _ in range(4)]
+        for dist in dists:
+            sampler.pcvl_sampler(dist, shots=10)
+
+        assert len(sampler._alias_cache) == 2
+        sampler.clear_alias_cache()
+        assert len(sampler._alias_cache) == 0
+
+
+class TestSparseDistributions:
+    """Test suite for sparse distribution outputs."""
+
+    def test_sparsify_threshold(self):
+        """Test truncation of a distribution with a probability threshold."""
+        dist = torch.tensor([[0.5, 0.01, 0.29, 0.2], [0.0, 0.0, 0.9, 0.1]])
+        sparse = sparsify_distribution(dist, threshold=0.05)
+
+        assert sparse.is_sparse
+        assert sparse._nnz() == 5
+        expected = torch.where(dist > 0.05, dist, torch.zeros_like(dist))
+        assert torch.allclose(sparse.to_dense(), expected)
+
+    def test_sparsify_mass_budget(self):
+        """Test truncation keeping the most probable states up to a mass budget."""
+        dist = torch.tensor([0.1, 0.4, 0.05, 0.3, 0.15])
+        sparse = sparsify_distribution(dist, mass=0.8)
+
+        assert torch.equal(sparse.indices()[0], torch.tensor([1, 3, 4]))
+        assert torch.allclose(discarded_mass(dist, sparse), torch.tensor(0.15))
+
+    def test_sparse_values_keep_gradients(self):
+        """Test that the kept probabilities remain differentiable."""
+        logits = torch.randn(2, 6, requires_grad=True)
+        sparse = sparsify_distribution(torch.softmax(logits, dim=-1), mass=0.9)
+        torch.sparse.sum(sparse).backward()
+        assert logits.grad is not None
+
+    @pytest.mark.parametrize("method", ["multinomial", "binomial", "gaussian"])
+    def test_sampling_sparse_distribution(self, method):
+        """Test that sampling a sparse distribution only touches stored states."""
+        sampler = ML.SamplingProcess()
+
+        dist = torch.tensor([[0.6, 0.0, 0.3, 0.1], [0.0, 0.5, 0.0, 0.5]])
+        sparse = sparsify_distribution(dist)
+        result = sampler.pcvl_sampler(sparse, shots=1000, method=method)
+
+        assert result.is_sparse
+        assert torch.equal(result.indices(), sparse.indices())
+        assert torch.all(result.to_dense()[dist == 0] == 0)
+
+    def test_sparse_output_through_layer(self):
+        """Test a layer producing truncated distributions mapped linearly."""
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.SERIES, n_modes=5, n_photons=2
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment,
+            input_size=2,
+            output_size=3,
+            output_mapping_strategy=ML.OutputMappingStrategy.LINEAR,
+        )
+        layer = ML.QuantumLayer(
+            input_size=2, ansatz=ansatz, no_bunching=False, sparse_mass=0.99
+        )
+        x = torch.rand(4, 2)
+        output = layer(x)
+        output.sum().backward()
+
+        assert output.shape == (4, 3)
+        assert layer.phi_.grad is not None
+
+    def test_sparse_threshold_with_grouping(self):
+        """Test that grouping strategies are applied to the truncated distribution."""
+        experiment = ML.PhotonicBackend(
+            circuit_type=ML.CircuitType.SERIES, n_modes=5, n_photons=2
+        )
+        ansatz = ML.AnsatzFactory.create(
+            PhotonicBackend=experiment,
+            input_size=2,
+            output_size=3,
+            output_mapping_strategy=ML.OutputMappingStrategy.LEXGROUPING,
+        )
+        layer = ML.QuantumLayer(
+            input_size=2, ansatz=ansatz, no_bunching=False, sparse_threshold=0.05
+        )
+        x = torch.rand(4, 2)
+        output = layer(x)
+
+        params = layer.prepare_parameters([x])
+        distribution = sparsify_distribution(
+            layer.computation_process.compute(params), threshold=0.05
+        )
+        torch.testing.assert_close(output, layer.output_mapping(distribution))
 
-class TestAutoDiffProcess:
     """Test suite for AutoDiffProcess."""
 
     def test_autodiff_no_gradients_no_sampling(self):
@@ -0,0 +1,178 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Tests for the batch-sharded execution of a QuantumLayer."""
+
+import perceval as pcvl
+import pytest
+import torch
+
+import merlin as ML
+
+
+def make_layer(strategy: ML.OutputMappingStrategy) -> ML.QuantumLayer:
+    circuit = (
+        pcvl.Circuit(4)
+        // pcvl.BS()
+        // (2, pcvl.BS())
+        // (0, pcvl.PS(pcvl.P("in_0")))
+        // (2, pcvl.PS(pcvl.P("in_1")))
+        // (1, pcvl.BS.Ry(pcvl.P("theta_0")))
+        // (0, pcvl.PS(pcvl.P("theta_1")))
+        // (2, pcvl.BS.H(pcvl.P("theta_2"), phi_tr=pcvl.P("theta_3")))
+    )
+    torch.manual_seed(0)
+    return ML.QuantumLayer(
+        input_size=2,
+        output_size=3,
+        circuit=circuit,
+        input_state=[1, 0, 1, 0],
+        trainable_parameters=["theta"],
+        input_parameters=["in"],
+        output_mapping_strategy=strategy,
+        no_bunching=False,
+        dtype=torch.float64,
+    )
+
+
+class TestBatchSharding:
+    """Tests for QuantumLayer.shard_batches."""
+
+    @pytest.mark.parametrize(
+        "strategy",
+        [ML.OutputMappingStrategy.LINEAR, ML.OutputMappingStrategy.LEXGROUPING],
+    )
+    def test_sharded_layer_matches(self, strategy):
+        layer = make_layer(strategy)
+        sharded = make_layer(strategy)
+        sharded.load_state_dict(layer.state_dict())
+        sharded.shard_batches(2)
+        try:
+            for batch_size in (5, 1):
+                x = torch.rand(batch_size, 2, dtype=torch.float64, requires_grad=True)
+                expected = layer(x)
+                output = sharded(x)
+                (expected_grad,) = torch.autograd.grad(
+                    expected.square().sum(), x, retain_graph=True
+                )
+                (grad,) = torch.autograd.grad(output.square().sum(), x)
+
+                assert torch.allclose(output, expected, atol=1e-10)
+                assert torch.allclose(grad, expected_grad, atol=1e-10)
+
+            layer.zero_grad()
+            layer(x.detach()).sum().backward()
+            sharded(x.detach()).sum().backward()
+            for name, param in layer.named_parameters():
+                sharded_grad = sharded.get_parameter(name).grad
+                assert torch.allclose(sharded_grad, param.grad, atol=1e-10)
+
+            with torch.no_grad():
+                assert torch.allclose(sharded(x), layer(x), atol=1e-10)
+        finally:
+            sharded.shard_batches(0)
+
+        assert sharded._shard_executor is None
+
+    def test_several_calls_in_one_loss(self):
+        layer = make_layer(ML.OutputMappingStrategy.LINEAR)
+        sharded = make_layer(ML.OutputMappingStrategy.LINEAR)
+        sharded.load_state_dict(layer.state_dict())
+        sharded.shard_batches(2)
+        try:
+            first = torch.rand(4, 2, dtype=torch.float64)
+            for second_size in (6, 4):
+                second = torch.rand(second_size, 2, dtype=torch.float64)
+                layer.zero_grad()
+                sharded.zero_grad()
+                (layer(first).sum() + layer(second).square().sum()).backward()
+
+                loss = sharded(first).sum()
+                with torch.no_grad():
+                    sharded(second)
+                # a call whose output is dropped before any backward pass
+                sharded(second)
+                loss = loss + sharded(second).square().sum()
+                loss.backward()
+
+                for name, param in layer.named_parameters():
+                    sharded_grad = sharded.get_parameter(name).grad
+                    assert torch.allclose(sharded_grad, param.grad, atol=1e-10)
+        finally:
+            sharded.shard_batches(0)
+
+    def test_to_restarts_workers(self):
+        layer = make_layer(ML.OutputMappingStrategy.LINEAR)
+        sharded = make_layer(ML.OutputMappingStrategy.LINEAR)
+        sharded.load_state_dict(layer.state_dict())
+        sharded.shard_batches(2)
+        try:
+            layer.to(torch.float32)
+            sharded.to(torch.float32)
+            x = torch.rand(5, 2)
+            output = sharded(x)
+
+            assert sharded._shard_executor.dtype == torch.float32
+            assert output.dtype == torch.float32
+            assert torch.allclose(output, layer(x), atol=1e-6)
+
+            # a configuration changed behind the layer's back is not run silently
+            sharded.computation_process.converter.to(torch.float64, "cpu")
+            with pytest.raises(ValueError, match="shard_batches"):
+                sharded(x)
+        finally:
+            sharded.shard_batches(0)
+
+    def test_real_circuit_matches(self):
+        circuit = (
+            pcvl.Circuit(3)
+            // (0, pcvl.BS.Ry(pcvl.P("in_0")))
+            // (1, pcvl.BS.Ry(pcvl.P("theta_0")))
+            // (0, pcvl.BS.Ry(pcvl.P("theta_1")))
+        )
+        torch.manual_seed(0)
+        layer = ML.QuantumLayer(
+            input_size=1,
+            output_size=2,
+            circuit=circuit,
+            input_state=[1, 1, 0],
+            trainable_parameters=["theta"],
+            input_parameters=["in"],
+            no_bunching=False,
+            dtype=torch.float64,
+        )
+        assert layer.computation_process.converter.is_real
+        x = torch.rand(4, 1, dtype=torch.float64)
+        expected = layer(x)
+        layer.shard_batches(2)
+        try:
+            assert torch.allclose(layer(x), expected, atol=1e-10)
+        finally:
+            layer.shard_batches(0)
+
+    def test_worker_errors_are_raised(self):
+        layer = make_layer(ML.OutputMappingStrategy.LINEAR).shard_batches(1)
+        try:
+            with pytest.raises(RuntimeError, match="worker failed"):
+                layer._shard_executor([torch.rand(3, 2)])
+        finally:
+            layer.shard_batches(0)
@@ -19,3 +19,664 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
+
+import itertools
+
+import numpy as np
+import perceval as pcvl
+import pytest
+import torch
+from helpers import random_unitary
+from perceval.backends import SLOSBackend
+
+from merlin.core.process import ComputationProcessFactory
+from merlin.pcvl_pytorch import slos_torchscript
+from merlin.pcvl_pytorch.constraints import PhotonCountConstraint, herald
+from merlin.pcvl_pytorch.fock_keys import (
+    FockStateKeys,
+    fock_state_rank,
+    fock_state_unrank,
+    to_state_vector,
+)
+from merlin.pcvl_pytorch.light_cone import mode_light_cones
+from merlin.pcvl_pytorch.slos_torchscript import (
+    _SPLIT_KERNEL_IS_FASTER,
+    build_slos_distribution_computegraph,
+    load_slos_distribution_computegraph,
+    partition_layer,
+)
+
+
+class TestFusedReadout:
+    """Test suite for output groupings fused into the SLOS readout."""
+
+    def test_fused_grouping_matches_post_grouping(self):
+        """Fused readout must equal grouping the full distribution afterwards."""
+        graph = build_slos_distribution_computegraph(4, 2, dtype=torch.float64)
+        unitary = random_unitary(4, batch_size=3)
+
+        _, distribution = graph.compute(unitary, [1, 1, 0, 0])
+        group_indices = torch.arange(distribution.shape[-1]) % 4
+        expected = torch.zeros(3, 4, dtype=torch.float64).index_add_(
+            1, group_indices, distribution
+        )
+
+        readout = graph.compose_readout_indices(group_indices)
+        keys, grouped = graph.compute(unitary, [1, 1, 0, 0], readout, 4)
+
+        assert keys is None
+        assert torch.allclose(grouped, expected, atol=1e-12)
+
+    def test_fused_grouping_composes_with_output_map_func(self):
+        """Grouping indices are composed with the output_map_func reduction."""
+
+        def photons_in_first_mode(state):
+            return (state[0],)
+
+        graph = build_slos_distribution_computegraph(
+            3, 2, output_map_func=photons_in_first_mode, dtype=torch.float64
+        )
+        unitary = random_unitary(3)
+
+        _, mapped = graph.compute(unitary, [1, 1, 0])
+        group_indices = torch.tensor([0, 1, 1])[: mapped.shape[-1]]
+        expected = torch.zeros(2, dtype=torch.float64).index_add_(
+            0, group_indices, mapped
+        )
+
+        readout = graph.compose_readout_indices(group_indices)
+        _, grouped = graph.compute(unitary, [1, 1, 0], readout, 2)
+
+        assert torch.allclose(grouped, expected, atol=1e-12)
+
+
+class TestFockStateKeys:
+    """Tests for the rank-encoded output keys."""
+
+    def test_rank_is_lexicographic_position(self):
+        m, n = 4, 3
+        states = sorted(
+            s for s in itertools.product(range(n + 1), repeat=m) if sum(s) == n
+        )
+        ranks = fock_state_rank(torch.tensor(states), n)
+
+        assert ranks.tolist() == list(range(len(states)))
+        assert torch.equal(fock_state_unrank(ranks, m, n), torch.tensor(states))
+        assert fock_state_rank(torch.tensor([2, 0, 0, 0]), n).item() == -1
+
+    def test_graph_keys_behave_like_tuple_list(self):
+        graph = build_slos_distribution_computegraph(5, 3, no_bunching=False)
+        keys = graph.final_keys
+
+        assert isinstance(keys, FockStateKeys)
+        states = list(keys)
+        assert len(states) == len(keys) == 35
+        assert len(set(states)) == 35
+        assert keys[-1] == states[-1]
+        assert keys[2:5] == states[2:5]
+        assert keys == states
+        assert states[7] in keys
+        assert (1, 1, 1, 1, 0) not in keys
+        assert keys.index(states[11]) == 11
+
+    def test_state_to_index_round_trip(self):
+        graph = build_slos_distribution_computegraph(6, 3, no_bunching=True)
+        indices = torch.arange(len(graph.final_keys)).flip(0)
+
+        states = graph.index_to_state(indices)
+        assert torch.equal(graph.state_to_index(states), indices)
+        assert graph.state_to_index([[3, 0, 0, 0, 0, 0]]).tolist() == [-1]
+
+    def test_save_and_load_keep_keys(self, tmp_path):
+        graph = build_slos_distribution_computegraph(4, 2, dtype=torch.float64)
+        path = tmp_path / "graph.pt"
+        graph.save(str(path))
+        loaded = load_slos_distribution_computegraph(str(path))
+        unitary = random_unitary(4)
+
+        keys, probs = graph.compute(unitary, [1, 0, 1, 0])
+        loaded_keys, loaded_probs = loaded.compute(unitary, [1, 0, 1, 0])
+
+        assert loaded_keys == keys
+        assert torch.allclose(loaded_probs, probs)
+
+    def test_states_in_order_of_first_appearance(self):
+        # states of a layer are numbered as they are first reached, source by source
+        m, n = 4, 3
+        states = {(0,) * m: 0}
+        for _ in range(n):
+            reached = {}
+            for state in states:
+                for mode in range(m):
+                    new = list(state)
+                    new[mode] += 1
+                    reached.setdefault(tuple(new), len(reached))
+            states = reached
+
+        graph = build_slos_distribution_computegraph(m, n)
+        assert list(graph.final_keys) == list(states)
+
+    def test_process_without_keys(self):
+        process = ComputationProcessFactory.create(
+            circuit=pcvl.Circuit(3) // pcvl.BS() // (1, pcvl.BS()),
+            input_state=[1, 1, 0],
+            trainable_parameters=[],
+            input_parameters=[],
+            keep_keys=False,
+        )
+        assert process.simulation_graph.final_keys is None
+        assert process.compute([]).shape == (6,)
+
+
+class TestApproximateCompute:
+    """Tests for the amplitude-pruned approximate computation."""
+
+    def test_no_pruning_is_exact(self):
+        graph = build_slos_distribution_computegraph(
+            6, 3, no_bunching=False, dtype=torch.float64
+        )
+        unitary = random_unitary(6, batch_size=2)
+
+        keys, exact = graph.compute(unitary, [1, 0, 1, 0, 1, 0])
+        approx_keys, approx, error = graph.compute_approximate(
+            unitary, [1, 0, 1, 0, 1, 0], threshold=0.0
+        )
+
+        assert approx_keys == keys
+        assert torch.allclose(approx, exact)
+        assert torch.all(error == 0)
+
+    def test_error_bound_holds(self):
+        graph = build_slos_distribution_computegraph(
+            10, 4, no_bunching=False, dtype=torch.float64
+        )
+        generator = torch.manual_seed(1)
+        hermitian = 0.3 * torch.randn(10, 10, dtype=torch.cdouble, generator=generator)
+        unitary = torch.linalg.matrix_exp(1j * (hermitian + hermitian.mH) / 2)
+        input_state = [1, 0, 1, 0, 1, 0, 1, 0, 0, 0]
+
+        _, exact = graph.compute(unitary, input_state)
+        for threshold, budget in ((1e-6, None), (None, 30), (1e-4, 100)):
+            _, approx, error = graph.compute_approximate(
+                unitary, input_state, threshold=threshold, budget=budget
+            )
+            assert 0 < error <= 2
+            assert (approx - exact).abs().sum() <= error + 1e-12
+
+
+class TestPhotonLossSectors:
+    """Tests for the lossy photon-number sectors."""
+
+    def test_matches_loss_mode_dilation(self):
+        m, input_state = 3, [1, 1, 1]
+        efficiency = torch.tensor([0.9, 0.6, 0.3], dtype=torch.float64)
+        unitary = random_unitary(m)
+        graph = build_slos_distribution_computegraph(
+            m, 3, no_bunching=False, dtype=torch.float64
+        )
+        sectors = graph.compute_sectors(unitary, input_state, efficiency)
+
+        # couple every mode to a virtual loss mode after the interferometer
+        transmission, reflection = efficiency.sqrt(), (1 - efficiency).sqrt()
+        coupler = torch.zeros(2 * m, 2 * m, dtype=torch.cdouble)
+        for i in range(m):
+            coupler[i, i] = coupler[m + i, m + i] = transmission[i]
+            coupler[i, m + i] = -reflection[i]
+            coupler[m + i, i] = reflection[i]
+        dilated = torch.eye(2 * m, dtype=torch.cdouble)
+        dilated[:m, :m] = unitary
+        dilated_graph = build_slos_distribution_computegraph(
+            2 * m, 3, no_bunching=False, dtype=torch.float64
+        )
+        keys, probs = dilated_graph.compute(coupler @ dilated, input_state + [0] * m)
+
+        assert sorted(sectors) == [0, 1, 2, 3]
+        for k, (sector_keys, distribution) in sectors.items():
+            expected = torch.zeros_like(distribution)
+            for state, prob in zip(keys, probs, strict=True):
+                if sum(state[:m]) == k:
+                    expected[sector_keys.index(state[:m])] += prob
+            assert torch.allclose(distribution, expected)
+
+    def test_selected_sectors_and_gradient(self):
+        graph = build_slos_distribution_computegraph(
+            4, 2, no_bunching=False, dtype=torch.float64
+        )
+        efficiency = torch.tensor(0.8, dtype=torch.float64, requires_grad=True)
+
+        sectors = graph.compute_sectors(
+            random_unitary(4, batch_size=3), [1, 0, 1, 0], efficiency, sectors=[2, 1]
+        )
+        sectors[1][1].sum().backward()
+
+        assert sorted(sectors) == [1, 2]
+        assert sectors[1][1].shape == (3, 4)
+        assert torch.allclose(
+            sectors[2][1].sum(dim=-1), torch.full((3,), 0.64, dtype=torch.float64)
+        )
+        assert torch.isclose(
+            efficiency.grad, torch.tensor(3 * 2 * (1 - 2 * 0.8), dtype=torch.float64)
+        )
+
+    def test_requires_bunched_graph(self):
+        graph = build_slos_distribution_computegraph(4, 2, no_bunching=True)
+
+        with pytest.raises(ValueError):
+            graph.compute_sectors(random_unitary(4).to(torch.cfloat), [1, 1, 0, 0], 0.5)
+
+
+class TestThresholdDetection:
+    """Tests for click-pattern outputs and occupation caps."""
+
+    def test_click_distribution_matches_fock_distribution(self):
+        unitary = random_unitary(4, batch_size=2)
+        input_state = [1, 1, 1, 0]
+        graph = build_slos_distribution_computegraph(
+            4, 3, no_bunching=False, dtype=torch.float64
+        )
+        click_graph = build_slos_distribution_computegraph(
+            4, 3, no_bunching=False, dtype=torch.float64, threshold_detection=True
+        )
+
+        keys, probs = graph.compute(unitary, input_state)
+        patterns, click_probs = click_graph.compute(unitary, input_state)
+
+        expected = torch.zeros_like(click_probs)
+        for state, prob in zip(keys, probs.T, strict=True):
+            pattern = tuple(int(n > 0) for n in state)
+            expected[:, patterns.index(pattern)] += prob
+        assert len(patterns) == 14
+        assert all(set(pattern) <= {0, 1} for pattern in patterns)
+        assert torch.allclose(click_probs, expected)
+
+    def test_threshold_detection_rejects_output_map_func(self):
+        with pytest.raises(ValueError):
+            build_slos_distribution_computegraph(
+                3, 2, output_map_func=lambda s: s, threshold_detection=True
+            )
+
+    def test_max_occupation_prunes_states(self):
+        graph = build_slos_distribution_computegraph(
+            4, 3, no_bunching=False, dtype=torch.float64, max_occupation=2
+        )
+
+        keys, probs = graph.compute(random_unitary(4), [1, 1, 1, 0])
+
+        assert len(keys) == 16
+        assert all(max(state) <= 2 for state in keys)
+        assert torch.isclose(probs.sum(), torch.tensor(1.0, dtype=torch.float64))
+
+    def test_per_mode_caps_and_truncated_mass(self):
+        unitary = random_unitary(3, batch_size=2)
+        input_state = [2, 1, 0]
+        graph = build_slos_distribution_computegraph(
+            3, 3, no_bunching=False, dtype=torch.float64
+        )
+        capped = build_slos_distribution_computegraph(
+            3, 3, no_bunching=False, dtype=torch.float64, max_occupation=[3, 1, 1]
+        )
+
+        keys, probs = graph.compute(unitary, input_state)
+        capped_keys, capped_probs = capped.compute(unitary, input_state)
+
+        kept = [keys.index(state) for state in capped_keys]
+        assert all(state[1] <= 1 and state[2] <= 1 for state in capped_keys)
+        assert graph.truncated_mass is None
+        assert torch.allclose(capped.truncated_mass, 1 - probs[:, kept].sum(dim=1))
+        assert torch.allclose(
+            capped_probs, probs[:, kept] / probs[:, kept].sum(dim=1, keepdim=True)
+        )
+
+
+class TestConstraints:
+    """Tests for heralding and post-selection constraints."""
+
+    def test_matches_post_selected_distribution(self):
+        unitary = random_unitary(6, batch_size=2)
+        input_state = [1, 1, 1, 1, 0, 0]
+        constraints = herald({4: 1, 5: 0}) + [PhotonCountConstraint((0, 1), parity=1)]
+        graph = build_slos_distribution_computegraph(
+            6, 4, no_bunching=False, dtype=torch.float64
+        )
+        constrained = build_slos_distribution_computegraph(
+            6, 4, no_bunching=False, dtype=torch.float64, constraints=constraints
+        )
+
+        keys, probs = graph.compute(unitary, input_state)
+        constrained_keys, constrained_probs = constrained.compute(unitary, input_state)
+
+        selected = [
+            i
+            for i, s in enumerate(keys)
+            if s[4] == 1 and s[5] == 0 and (s[0] + s[1]) % 2 == 1
+        ]
+        accepted = probs[:, selected]
+        assert list(constrained_keys) == [keys[i] for i in selected]
+        assert torch.allclose(
+            constrained_probs, accepted / accepted.sum(dim=1, keepdim=True)
+        )
+        assert torch.allclose(constrained.truncated_mass, 1 - accepted.sum(dim=1))
+
+    def test_intermediate_layers_are_pruned(self):
+        graph = build_slos_distribution_computegraph(6, 4, no_bunching=False)
+        heralded = build_slos_distribution_computegraph(
+            6, 4, no_bunching=False, constraints=herald({4: 1, 5: 0})
+        )
+
+        for full, pruned in zip(
+            graph.layer_norm_factors, heralded.layer_norm_factors, strict=True
+        ):
+            assert pruned.shape[0] < full.shape[0]
+
+    def test_unsatisfiable_constraints(self):
+        with pytest.raises(ValueError):
+            build_slos_distribution_computegraph(
+                4, 2, constraints=[PhotonCountConstraint((0, 1), min_photons=3)]
+            )
+
+
+class TestLightCone:
+    """Tests for light-cone restricted photon layers."""
+
+    @staticmethod
+    def _block_circuit():
+        circuit = pcvl.Circuit(6)
+        for offset, name in ((0, "a"), (3, "b")):
+            circuit.add(
+                offset,
+                pcvl.GenericInterferometer(
+                    3, lambda i, name=name: pcvl.BS(theta=pcvl.P(f"{name}_{i}"))
+                ),
+            )
+        circuit.add(2, pcvl.PERM([1, 0]))
+        return circuit
+
+    def test_mode_light_cones_match_unitary_support(self):
+        circuit = self._block_circuit()
+        for i, parameter in enumerate(circuit.get_parameters()):
+            parameter.set_value(0.3 + i)
+        unitary = torch.tensor(circuit.compute_unitary())
+
+        cones = mode_light_cones(circuit)
+
+        for mode, cone in enumerate(cones):
+            support = torch.nonzero(unitary[:, mode].abs() > 1e-9).flatten().tolist()
+            assert cone == frozenset(support)
+
+    def test_process_builds_reduced_graph(self):
+        circuit = self._block_circuit()
+        kwargs = {
+            "circuit": circuit,
+            "input_state": [1, 1, 0, 1, 0, 0],
+            "trainable_parameters": ["a", "b"],
+            "input_parameters": [],
+            "no_bunching": False,
+            "dtype": torch.float64,
+        }
+        process = ComputationProcessFactory.create(**kwargs)
+        reduced = ComputationProcessFactory.create(light_cone=True, **kwargs)
+        parameters = [
+            torch.rand(len(process.converter.spec_mappings[name]), dtype=torch.float64)
+            for name in ("a", "b")
+        ]
+
+        keys, probs = process.compute_with_keys(parameters)
+        reduced_keys, reduced_probs = reduced.compute_with_keys(parameters)
+
+        report = reduced.state_space_reduction()
+        assert report["full_states"] == 56
+        assert report["reduced_states"] == len(reduced_keys) == 18
+        assert report["photon_modes"] == [(0, 1, 3), (0, 1, 3), (2, 4, 5)]
+        expected = probs[[keys.index(state) for state in reduced_keys]]
+        assert torch.allclose(reduced_probs, expected)
+        assert torch.isclose(
+            reduced_probs.sum(), torch.tensor(1.0, dtype=torch.float64)
+        )
+
+
+class TestAmplitudes:
+    """Tests for amplitude-level outputs."""
+
+    @pytest.mark.parametrize("no_bunching", [False, True])
+    def test_matches_perceval_slos(self, no_bunching):
+        input_state = [1, 1, 0, 1]
+        matrix = pcvl.Matrix.random_unitary(4)
+        backend = SLOSBackend()
+        backend.set_circuit(pcvl.Unitary(matrix))
+        backend.set_input_state(pcvl.BasicState(input_state))
+        graph = build_slos_distribution_computegraph(
+            4, 3, no_bunching=no_bunching, dtype=torch.float64
+        )
+        unitary = torch.tensor(np.array(matrix), dtype=torch.cdouble)
+
+        keys, amplitudes = graph.compute_amplitudes(unitary, input_state)
+        _, raw = graph.compute_amplitudes(unitary, input_state, normalized=False)
+
+        expected = [backend.prob_amplitude(state) for state in keys.to_perceval()]
+        assert np.allclose(amplitudes.numpy(), expected)
+        # perceval enumerates states by decreasing lexicographic order
+        assert list(keys) == sorted(keys, reverse=True)
+        # raw SLOS coefficients, without the Fock normalization of perceval
+        scale = [np.sqrt(state.prodnfact()) for state in keys.to_perceval()]
+        assert np.allclose(raw.numpy() * scale, expected)
+
+    def test_state_vector_and_gradient(self):
+        unitary = random_unitary(3).requires_grad_()
+        graph = build_slos_distribution_computegraph(
+            3, 2, no_bunching=False, dtype=torch.float64
+        )
+
+        keys, amplitudes = graph.compute_amplitudes(unitary, [1, 1, 0])
+        amplitudes.abs().square()[0].backward()
+        state_vector = to_state_vector(keys, amplitudes)
+
+        assert unitary.grad is not None
+        for state, amplitude in zip(keys, amplitudes.tolist(), strict=True):
+            assert np.isclose(state_vector[pcvl.BasicState(list(state))], amplitude)
+
+
+class TestLowPrecision:
+    """Tests for float16 and bfloat16 graphs."""
+
+    @pytest.mark.parametrize(
+        "dtype, tolerance", [(torch.float16, 5e-3), (torch.bfloat16, 3e-2)]
+    )
+    @pytest.mark.parametrize("no_bunching", [False, True])
+    def test_matches_float64_baseline(self, dtype, tolerance, no_bunching):
+        input_state = [1, 0, 1, 0, 1, 0, 1, 0, 1]
+        unitary = random_unitary(9, batch_size=4)
+        reference = build_slos_distribution_computegraph(
+            9, 5, no_bunching=no_bunching, dtype=torch.float64
+        )
+        graph = build_slos_distribution_computegraph(
+            9, 5, no_bunching=no_bunching, dtype=dtype
+        )
+
+        _, expected = reference.compute(unitary, input_state)
+        _, probabilities = graph.compute(unitary.to(torch.cfloat), input_state)
+
+        assert probabilities.dtype == dtype
+        # amplitudes are stored as split real/imag pairs in the low-precision dtype
+        assert graph.prev_amplitudes.dtype == dtype
+        assert graph.prev_amplitudes.shape[0] == 2
+        l1_error = (probabilities.double() - expected).abs().sum(dim=-1)
+        assert torch.all(l1_error < tolerance)
+
+    def test_gradients_and_amplitudes(self):
+        unitary = random_unitary(5).to(torch.cfloat).requires_grad_()
+        graph = build_slos_distribution_computegraph(
+            5, 3, no_bunching=False, dtype=torch.bfloat16
+        )
+        reference = build_slos_distribution_computegraph(
+            5, 3, no_bunching=False, dtype=torch.float32
+        )
+
+        _, probabilities = graph.compute(unitary, [1, 1, 0, 1, 0])
+        (grad,) = torch.autograd.grad(probabilities[0].float(), unitary)
+        _, expected = reference.compute(unitary, [1, 1, 0, 1, 0])
+        (expected_grad,) = torch.autograd.grad(expected[0], unitary)
+        _, amplitudes = graph.compute_amplitudes(unitary.detach(), [1, 1, 0, 1, 0])
+        _, expected_amplitudes = reference.compute_amplitudes(
+            unitary.detach(), [1, 1, 0, 1, 0]
+        )
+
+        assert torch.allclose(grad, expected_grad, atol=2e-2)
+        assert amplitudes.dtype == torch.cfloat
+        assert torch.allclose(amplitudes, expected_amplitudes, atol=2e-2)
+
+    def test_to_switches_dtype(self):
+        graph = build_slos_distribution_computegraph(4, 2, dtype=torch.float32)
+        unitary = random_unitary(4).to(torch.cfloat)
+
+        graph.to(torch.float16, "cpu")
+        _, probabilities = graph.compute(unitary, [1, 1, 0, 0])
+
+        assert probabilities.dtype == torch.float16
+        assert graph.norm_factor_output.dtype == torch.float32
+
+
+class TestSplitKernel:
+    """Tests for the split real/imaginary layer kernel."""
+
+    @pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+    @pytest.mark.parametrize("no_bunching", [False, True])
+    def test_matches_complex_kernel(self, dtype, no_bunching):
+        input_state = [1, 0, 1, 1, 0, 1, 0]
+        unitary = random_unitary(7, batch_size=3)
+        if dtype == torch.float32:
+            unitary = unitary.to(torch.cfloat)
+        graphs = [
+            build_slos_distribution_computegraph(
+                7, 4, no_bunching=no_bunching, dtype=dtype, kernel=kernel
+            )
+            for kernel in ("complex", "split")
+        ]
+
+        (_, expected), (_, probabilities) = (
+            graph.compute(unitary, input_state) for graph in graphs
+        )
+        _, expected_amplitudes = graphs[0].compute_amplitudes(unitary, input_state)
+        _, amplitudes = graphs[1].compute_amplitudes(unitary, input_state)
+
+        assert graphs[1].prev_amplitudes.shape[0] == 2
+        assert not graphs[1].prev_amplitudes.is_complex()
+        atol = 1e-6 if dtype == torch.float32 else 1e-12
+        assert torch.allclose(probabilities, expected, atol=atol)
+        assert torch.allclose(amplitudes, expected_amplitudes, atol=atol)
+
+    def test_gradients_match(self):
+        unitary = random_unitary(5).requires_grad_()
+        gradients = []
+        for kernel in ("complex", "split"):
+            graph = build_slos_distribution_computegraph(
+                5, 3, dtype=torch.float64, kernel=kernel
+            )
+            _, probabilities = graph.compute(unitary, [1, 0, 1, 1, 0])
+            gradients.append(torch.autograd.grad(probabilities[1], unitary)[0])
+
+        assert torch.allclose(gradients[0], gradients[1], atol=1e-12)
+
+    def test_auto_selection_is_measured_once(self):
+        graph = build_slos_distribution_computegraph(4, 2, dtype=torch.float64)
+
+        uses_split = graph._uses_split_kernel(torch.device("cpu"))
+
+        assert graph.kernel == "auto"
+        assert _SPLIT_KERNEL_IS_FASTER[("cpu", torch.cdouble)] == uses_split
+        _, probabilities = graph.compute(random_unitary(4), [1, 1, 0, 0])
+        assert torch.isclose(probabilities.sum(), probabilities.new_tensor(1.0))
+
+    def test_invalid_kernel(self):
+        with pytest.raises(ValueError, match="kernel"):
+            build_slos_distribution_computegraph(4, 2, kernel="fast")
+
+
+class TestRealOrthogonal:
+    """Tests for the real-arithmetic simulation of real-orthogonal circuits."""
+
+    def test_real_unitary_matches_complex(self):
+        generator = torch.Generator().manual_seed(0)
+        matrix = torch.randn(3, 6, 6, dtype=torch.float64, generator=generator)
+        unitary = torch.linalg.qr(matrix)[0].requires_grad_()
+        graph = build_slos_distribution_computegraph(6, 3, dtype=torch.float64)
+
+        _, expected = graph.compute(unitary.to(torch.cdouble), [1, 1, 0, 1, 0, 0])
+        _, probabilities = graph.compute(unitary, [1, 1, 0, 1, 0, 0])
+        (expected_grad,) = torch.autograd.grad(expected[:, 2].sum(), unitary)
+        (grad,) = torch.autograd.grad(probabilities[:, 2].sum(), unitary)
+
+        assert not graph.prev_amplitudes.is_complex()
+        assert torch.allclose(probabilities, expected, atol=1e-12)
+        assert torch.allclose(grad, expected_grad, atol=1e-12)
+
+    def test_process_uses_real_unitary(self):
+        circuit = pcvl.Circuit(4)
+        for idx, mode in enumerate((0, 2, 1, 0, 2)):
+            circuit.add(mode, pcvl.BS.Ry(pcvl.P(f"theta{idx}")))
+        process = ComputationProcessFactory.create(
+            circuit, [1, 0, 1, 0], ["theta"], [], dtype=torch.float64
+        )
+        params = [torch.rand(5, dtype=torch.float64)]
+
+        distribution = process.compute(params)
+        amplitudes = process.simulation_graph.prev_amplitudes
+        unitary = process.converter.to_tensor(*params)
+        _, expected = process.simulation_graph.compute(unitary, [1, 0, 1, 0])
+
+        assert process.converter.is_real
+        assert amplitudes.dtype == torch.float64
+        assert torch.allclose(distribution, expected, atol=1e-12)
+
+
+class TestThreadPartition:
+    """Tests for layers partitioned across threads."""
+
+    def test_partition_covers_layer(self):
+        graph = build_slos_distribution_computegraph(6, 4, no_bunching=False)
+        sources, destinations, modes = graph.vectorized_operations[-1]
+
+        chunks = partition_layer(sources, destinations, modes, 3)
+
+        assert len(chunks) == 3
+        assert sum(chunk[0].shape[0] for chunk in chunks) == sources.shape[0]
+        offset, operations = 0, set()
+        for chunk_sources, chunk_destinations, chunk_modes in chunks:
+            assert chunk_destinations.min() == 0
+            operations |= set(
+                zip(
+                    chunk_sources.tolist(),
+                    (chunk_destinations + offset).tolist(),
+                    chunk_modes.tolist(),
+                    strict=True,
+                )
+            )
+            offset += int(chunk_destinations.max()) + 1
+        assert offset == int(destinations.max()) + 1
+        assert operations == set(
+            zip(sources.tolist(), destinations.tolist(), modes.tolist(), strict=True)
+        )
+
+    @pytest.mark.parametrize("kernel", ["complex", "split"])
+    def test_threaded_graph_matches(self, kernel, monkeypatch):
+        monkeypatch.setattr(slos_torchscript, "_PARALLEL_MIN_OPS", 1)
+        unitary = random_unitary(6, batch_size=2).requires_grad_()
+        input_state = [1, 1, 0, 1, 0, 1]
+        reference = build_slos_distribution_computegraph(
+            6, 4, no_bunching=False, dtype=torch.float64, kernel=kernel
+        )
+        graph = build_slos_distribution_computegraph(
+            6, 4, no_bunching=False, dtype=torch.float64, kernel=kernel, num_threads=3
+        )
+
+        _, expected = reference.compute(unitary, input_state)
+        _, probabilities = graph.compute(unitary, input_state)
+        (expected_grad,) = torch.autograd.grad(expected[:, 7].sum(), unitary)
+        (grad,) = torch.autograd.grad(probabilities[:, 7].sum(), unitary)
+        with torch.no_grad():
+            _, no_grad = graph.compute(unitary, input_state)
+
+        assert torch.allclose(probabilities, expected, atol=1e-12)
+        assert torch.allclose(grad, expected_grad, atol=1e-12)
+        assert not no_grad.requires_grad
+        graph.set_num_threads(1)
+        assert torch.allclose(graph.compute(unitary, input_state)[1], expected)
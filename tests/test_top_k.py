@@ -0,0 +1,102 @@
+# MIT License
+#
+# Copyright (c) 2025 Quandela
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+Tests for the beam search of the most probable output states.
+"""
+
+import perceval as pcvl
+import torch
+from helpers import random_unitary
+
+from merlin.core.process import ComputationProcessFactory
+from merlin.pcvl_pytorch import top_k_states
+from merlin.pcvl_pytorch.slos_torchscript import build_slos_distribution_computegraph
+
+
+class TestTopKStates:
+    """Tests for top_k_states."""
+
+    def test_exact_without_pruning(self):
+        input_state = [1, 1, 0, 1, 0, 1]
+        unitary = random_unitary(6, batch_size=3)
+        graph = build_slos_distribution_computegraph(
+            6, 4, no_bunching=False, dtype=torch.float64
+        )
+        _, distribution = graph.compute(unitary, input_state)
+
+        states, probabilities, error = top_k_states(unitary, input_state, 5)
+
+        assert states.shape == (3, 5, 6)
+        assert torch.all(error == 0)
+        assert torch.allclose(probabilities, distribution.topk(5).values)
+        assert torch.allclose(
+            distribution.gather(1, graph.state_to_index(states)), probabilities
+        )
+
+    def test_error_bound_holds_with_pruning(self):
+        input_state = [2, 0, 1, 0, 1, 0, 0]
+        unitary = random_unitary(7, batch_size=2)
+        graph = build_slos_distribution_computegraph(
+            7, 4, no_bunching=False, dtype=torch.float64
+        )
+        _, distribution = graph.compute(unitary, input_state)
+
+        states, probabilities, error = top_k_states(
+            unitary, input_state, 4, beam_width=6
+        )
+        exact = distribution.gather(1, graph.state_to_index(states))
+
+        assert torch.all(error > 0)
+        deviation = (exact.sqrt() - probabilities.sqrt()).abs()
+        assert torch.all(deviation <= error.unsqueeze(-1) + 1e-12)
+
+    def test_no_bunching(self):
+        input_state = [1, 0, 1, 0, 1]
+        unitary = random_unitary(5)
+
+        states, probabilities, _ = top_k_states(
+            unitary, input_state, 10, no_bunching=True
+        )
+
+        assert states.shape == (10, 5)
+        assert torch.all(states <= 1)
+        assert torch.all(probabilities[:-1] >= probabilities[1:])
+
+    def test_process_top_k_does_not_build_graph(self):
+        circuit = pcvl.GenericInterferometer(
+            6,
+            lambda i: pcvl.BS(theta=pcvl.P(f"theta_{i}")),
+        )
+        process = ComputationProcessFactory.create(
+            circuit=circuit,
+            input_state=[1, 0, 1, 0, 1, 0],
+            trainable_parameters=["theta"],
+            input_parameters=[],
+            no_bunching=False,
+        )
+        n_params = len(process.converter.spec_mappings["theta"])
+        states, probabilities, _ = process.top_k([torch.rand(n_params)], k=3)
+
+        assert process._simulation_graph is None
+        assert states.shape == (3, 6)
+        assert torch.all(states.sum(dim=-1) == 3)